@@ -0,0 +1,92 @@
+"""
+Бенчмарк группировки табличек мобов: прежний цикл, group_mobs_simple и group_mobs_grid (пространственный хеш).
+Табличка моба часто распадается на несколько областей, поэтому области генерируются кластерами по 1-4.
+Печатает точку пересечения: с какого количества областей сетка быстрее плотной версии
+(по ней выбирается MOB_GROUP_GRID_MIN_BLOBS в config.py).
+Запуск из корня проекта: python -m benchmarks.bench_grouping
+"""
+import time
+
+import numpy as np
+
+import config as cfg
+from lib.blobs import as_blobs
+from lib.mobtracker import group_mobs_grid, group_mobs_simple
+
+
+def legacy_group_mobs(detected_mobs, group_distance=30):
+    """
+    Прежняя реализация group_mobs_simple: двойной цикл Python со скалярным np.sqrt.
+    """
+    grouped = []
+    used = set()
+    for i, (x1, y1, w1, h1) in enumerate(detected_mobs):
+        if i in used:
+            continue
+        group = [(x1, y1, w1, h1)]
+        used.add(i)
+        for j, (x2, y2, w2, h2) in enumerate(detected_mobs):
+            if j in used:
+                continue
+            center1 = (x1 + w1 // 2, y1 + h1 // 2)
+            center2 = (x2 + w2 // 2, y2 + h2 // 2)
+            distance = np.sqrt((center1[0] - center2[0]) ** 2 + (center1[1] - center2[1]) ** 2)
+            if distance < group_distance:
+                group.append((x2, y2, w2, h2))
+                used.add(j)
+        avg_x = int(np.mean([mob[0] for mob in group]))
+        avg_y = int(np.mean([mob[1] for mob in group]))
+        avg_w = int(np.mean([mob[2] for mob in group]))
+        avg_h = int(np.mean([mob[3] for mob in group]))
+        grouped.append((avg_x, avg_y, avg_w, avg_h))
+    return grouped
+
+
+def make_blobs(count, rng, width=978, height=540):
+    """
+    count областей: кластеры из 1-4 фрагментов табличек вокруг случайных центров игрового поля.
+    """
+    rects = []
+    while len(rects) < count:
+        cx, cy = rng.integers(0, width), rng.integers(0, height)
+        for _ in range(rng.integers(1, 5)):
+            w, h = rng.integers(8, 40), rng.integers(4, 12)
+            rects.append((int(cx + rng.integers(-20, 20)), int(cy + rng.integers(-6, 6)), int(w), int(h)))
+    return rects[:count]
+
+
+def measure(func, repeats):
+    func()  # Прогрев
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    rng = np.random.default_rng(0)
+    group_distance = 30
+    print(f"group_distance {group_distance}, median ms per call")
+    print(f"{'blobs':>6} {'legacy':>10} {'simple':>10} {'grid':>10} {'same':>6}")
+    crossover = None
+    for count in (10, 30, 50, 100, 200, 300, 500, 1000):
+        rects = make_blobs(count, rng)
+        blobs = as_blobs(rects)
+        repeats = 5 if count >= 300 else 20
+        expected = legacy_group_mobs(rects, group_distance)
+        same = group_mobs_grid(blobs, group_distance) == expected == group_mobs_simple(blobs, group_distance)
+        legacy = measure(lambda: legacy_group_mobs(rects, group_distance), repeats)
+        simple = measure(lambda: group_mobs_simple(blobs, group_distance), repeats)
+        grid = measure(lambda: group_mobs_grid(blobs, group_distance), repeats)
+        if grid < simple and crossover is None:
+            crossover = count
+        elif grid >= simple:
+            crossover = None
+        print(f"{count:>6} {legacy * 1e3:>10.3f} {simple * 1e3:>10.3f} {grid * 1e3:>10.3f} {str(same):>6}")
+    print(f"grid faster from {crossover} blobs; MOB_GROUP_GRID_MIN_BLOBS = {cfg.MOB_GROUP_GRID_MIN_BLOBS}")
+
+
+if __name__ == "__main__":
+    main()
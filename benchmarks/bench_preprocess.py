@@ -0,0 +1,68 @@
+"""
+Микробенчмарк предобработки кадра: уменьшение разрешения + постеризация.
+Запуск из корня проекта: python -m benchmarks.bench_preprocess [ширина высота]
+"""
+import sys
+import time
+
+import cv2 as cv
+import numpy as np
+
+from lib.preprocess import FramePreprocessor
+
+
+def legacy_pipeline(src, scale, levels=4):
+    """
+    Прежний путь WindowCapture.get_screenshot: срез альфы, resize, ascontiguousarray и две временные копии.
+    """
+    img = src[..., :3]
+    img = cv.resize(img, None, fx=scale, fy=scale, interpolation=cv.INTER_AREA)
+    img = np.ascontiguousarray(img)
+    shift = 8 - int(np.log2(levels))
+    img = (img >> shift) << shift
+    img += (1 << (shift - 1))
+    return img
+
+
+def measure(func, repeats):
+    """
+    Возвращает медианное время одного вызова в секундах.
+    """
+    func()  # Прогрев
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    w, h = (int(sys.argv[1]), int(sys.argv[2])) if len(sys.argv) > 2 else (1956, 2060)
+    scale = 0.5
+    repeats = 50
+    src = np.random.randint(0, 256, (h, w, 4), dtype=np.uint8)
+    pixels = h * w
+
+    variants = {"legacy": lambda: legacy_pipeline(src, scale)}
+    for quantizer in ("lut", "shift", "off"):
+        preprocessor = FramePreprocessor(scale=scale, levels=4, quantizer=quantizer)
+        dst = np.empty(preprocessor.output_shape(h, w), dtype=np.uint8)
+        variants[f"fused-{quantizer}"] = lambda p=preprocessor, d=dst: p.process(src, d)
+
+    # Проверяем, что варианты дают одинаковый результат
+    reference = legacy_pipeline(src, scale)
+    for quantizer in ("lut", "shift"):
+        check = FramePreprocessor(scale=scale, levels=4, quantizer=quantizer)
+        out = np.empty_like(reference)
+        check.process(src, out)
+        print(f"{quantizer} == legacy: {np.array_equal(out, reference)}")
+
+    print(f"Input {w}x{h} BGRA, scale {scale}, {repeats} repeats")
+    for name, func in variants.items():
+        seconds = measure(func, repeats)
+        print(f"{name:>12}: {seconds * 1e3:8.3f} ms/frame  {seconds * 1e9 / pixels:7.3f} ns/pixel")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Сравнение сегментации мобов: полный путь ("full") против двухуровневого ("coarse") на записанных кадрах.
+Точность считается относительно полного пути: прямоугольники сопоставляются по IoU.
+Запуск из корня проекта: python -m benchmarks.bench_segmentation [запись [кадров]]
+Запись - любой источник ReplayFrameSource (каталог SessionRecorder, каталог кадров, видео, .npy).
+"""
+import sys
+import time
+
+import numpy as np
+
+import config as cfg
+from lib.blobs import blob_rects
+from lib.detection import Detection
+from lib.framesource import ReplayFrameSource
+from lib.preprocess import create_preprocessor
+
+
+def load_frames(path, limit):
+    """
+    Читает до limit кадров и приводит их к виду, в котором их получает детектор.
+    """
+    source = ReplayFrameSource(path, mode="max", preprocessed=cfg.REPLAY_PREPROCESSED)
+    preprocessor = create_preprocessor(source.preprocessed)
+    frames = []
+    while len(frames) < limit:
+        raw = source.grab()
+        if raw is None:
+            break
+        dst = np.empty(preprocessor.output_shape(*raw.shape[:2]), dtype=np.uint8)
+        frames.append(preprocessor.process(raw, dst))
+    source.close()
+    return frames
+
+
+def iou(a, b):
+    ax0, ay0, aw, ah = a
+    bx0, by0, bw, bh = b
+    w = min(ax0 + aw, bx0 + bw) - max(ax0, bx0)
+    h = min(ay0 + ah, by0 + bh) - max(ay0, by0)
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / (aw * ah + bw * bh - inter)
+
+
+def compare(reference, candidate, min_iou=0.5):
+    """
+    Жадное сопоставление прямоугольников.
+    :return: (совпало, всего в reference, всего в candidate, сумма отклонений сторон в пикселях).
+    """
+    unmatched = list(candidate)
+    matched = 0
+    error = 0
+    for rect in reference:
+        best = max(unmatched, key=lambda other: iou(rect, other), default=None)
+        if best is not None and iou(rect, best) >= min_iou:
+            unmatched.remove(best)
+            matched += 1
+            error += sum(abs(p - q) for p, q in zip(rect, best))
+    return matched, len(reference), len(candidate), error
+
+
+def run_variant(detector, frames, mode, factor):
+    """
+    :return: (медианное время кадра в секундах, прямоугольники по кадрам).
+    """
+    detector.segmentation_mode = mode
+    detector.pyramid_factor = factor
+    detector.segment_mobs(frames[0])  # Прогрев кэшей масок
+    times = []
+    rects = []
+    for frame in frames:
+        start = time.perf_counter()
+        _, found = detector.segment_mobs(frame)
+        times.append(time.perf_counter() - start)
+        rects.append(blob_rects(found))
+    return float(np.median(times)), rects
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else cfg.REPLAY_PATH
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    frames = load_frames(path, limit)
+    if not frames:
+        print(f"No frames in {path}")
+        return
+
+    detector = Detection(renderer=None)
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} frames {w}x{h} from {path}, refine margin {detector.refine_margin}")
+
+    full_time, full_rects = run_variant(detector, frames, "full", 1)
+    total = sum(len(found) for found in full_rects)
+    print(f"{'full':>10}: {full_time * 1e3:8.3f} ms/frame  {total} blobs")
+
+    for factor in (2, 3, 4):
+        seconds, rects = run_variant(detector, frames, "coarse", factor)
+        matched = reference = found = error = 0
+        for expected, actual in zip(full_rects, rects):
+            m, r, f, e = compare(expected, actual)
+            matched, reference, found, error = matched + m, reference + r, found + f, error + e
+        recall = matched / reference if reference else 1.0
+        precision = matched / found if found else 1.0
+        mean_error = error / (4 * matched) if matched else 0.0
+        print(f"{f'coarse x{factor}':>10}: {seconds * 1e3:8.3f} ms/frame  speedup {full_time / seconds:5.2f}  "
+              f"recall {recall:.3f}  precision {precision:.3f}  bbox error {mean_error:.2f} px")
+
+
+if __name__ == "__main__":
+    main()
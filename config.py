@@ -62,9 +62,15 @@ RADAR_AREA = [[847, 222], [966, 350]]  # Область радара
 TOP_AREA = [[0, 0], [978, 230]]
 BOTTOM_AREA = [[0, 769], [968, 1030]]
 
+# Области интерфейса, исключаемые из поиска мобов
+UI_EXCLUDED_AREAS = [CHAR_PANEL_AREA, HP_BAR_AREA, CHAT_AREA, BUFFS_AREA, RADAR_AREA, TOP_AREA, BOTTOM_AREA]
+FARM_AREA = [[0, 230], [978, 769]]  # Игровое поле, где ищутся мобы
 
 
 RADAR_DOT = [911, 290]
+RADAR_RADIUS = 8  # Радиус круга радара, в котором ищутся мобы
+RADAR_YELLOW_LOWER = [20, 100, 100]  # Нижняя граница желтого (HSV) на радаре
+RADAR_YELLOW_UPPER = [30, 255, 255]  # Верхняя граница желтого (HSV) на радаре
 MYMP_DOT = [88, 256]
 MYMP_DOT_COLOR = [200, 41, 41]
 MYHP_DOT = [71, 247]
@@ -84,9 +90,149 @@ SKILL_DOT_COLOR = [160, 96, 96]
 BATTLE_MODE_DOT = [37,247]
 BATTLE_MODE_DOT_COLOR = [27, 14, 181]
 
+# Контрольные точки детекции: {имя: (точка, эталонный цвет BGR, допуск по каналу)}
+PROBES = {
+    "myhp": (MYHP_DOT, MYHP_DOT_COLOR, 25),
+    "mymp": (MYMP_DOT, MYMP_DOT_COLOR, 25),
+    "animus_hp": (ANIMUS_HP_DOT, ANIMUS_HP_DOT_COLOR, 25),
+    "animus_exit": (ANIMUS_EXIT_DOT, ANIMUS_EXIT_DOT_COLOR, 25),
+    "skill": (SKILL_DOT, SKILL_DOT_COLOR, 10),
+    "target_dot1": (TARGET_DOT1, TARGET_DOT1_COLOR, 55),
+    "target_dot2": (TARGET_DOT2, TARGET_DOT2_COLOR, 55),
+    "target_max_hp": (TARGET_MAX_HP_DOT, TARGET_MAX_HP_DOT_COLOR, 25),
+}
+
 # Интервалы проверки состояний
 RECTANGLE_THICKNESS = 2  # Толщина линий прямоугольников
 LOAD_LIMIT_FRAMETIME = 0.2  # Интервал в секундах
+# Регулятор частоты захвата (RateGovernor): интервалы захвата в секундах по профилям
+GOVERNOR_PROFILES = {
+    "fast": 0.05,  # Поиск и атака цели: минимальная задержка
+    "normal": LOAD_LIMIT_FRAMETIME,
+    "idle": 1.0,  # Лут, поворот камеры, ожидание старта
+}
+GOVERNOR_STATE_PROFILES = {
+    "AttackState": "fast",
+    "SearchState": "fast",
+    "LootState": "idle",
+    "RotateState": "idle",
+}
+GOVERNOR_LAG_RATIO = 0.8  # Отставание: время детекции больше этой доли интервала захвата
+GOVERNOR_BACKOFF_FACTOR = 1.5  # Интервал при отставании = время детекции * коэффициент
+GOVERNOR_RECOVERY_FACTOR = 0.9  # Скорость возврата к интервалу профиля
+GOVERNOR_EMA_ALPHA = 0.2  # Сглаживание времени детекции
+GOVERNOR_MAX_INTERVAL = 2.0
+# Сглаживание флагов детекции: {флаг: (политика, параметры...)}
+# ("consecutive", k) - k одинаковых подряд; ("n_of_m", n, m) - n из последних m;
+# ("hysteresis", rise_k, fall_k) - разное число кадров для включения и выключения
+SIGNAL_DEBOUNCE_DEFAULT = ("consecutive", 3)
+SIGNAL_DEBOUNCE = {
+    "have_target": ("consecutive", 3),
+    "target_full_hp": ("consecutive", 3),
+    "have_animus": ("consecutive", 3),
+    "skill_is_pressed": ("consecutive", 3),
+    "enough_mana": ("consecutive", 3),
+    "enough_hp": ("consecutive", 3),
+    "have_targets_left": ("consecutive", 3),
+    "have_buffs": ("consecutive", 3),
+}
+# Шаблоны интерфейса: {имя: (файл, область поиска, порог TM_CCOEFF_NORMED)}
+# Шаблоны сняты в исходном размере окна и масштабируются под кадр (RESIZE_SCALE)
+TEMPLATES = {
+    "target": ("data/target.jpg", TARGET_AREA, 0.8),
+    "target_marker": ("data/target_templaet.jpg", TARGET_AREA, 0.8),
+    "buff": ("data/buff.jpg", BUFFS_AREA, 0.8),
+    "buff1": ("data/buff1.jpg", BUFFS_AREA, 0.8),
+    "animus": ("data/animus.jpg", ANIMUS_AREA, 0.8),
+    "atk_skill": ("data/atk_skill.jpg", CHAR_PANEL_AREA, 0.8),
+}
+BUFF_TEMPLATES = ["buff", "buff1"]  # have_buffs - найден любой из шаблонов
+TEMPLATE_SCALES = (1.0, 0.9, 1.1)  # Перебираемые масштабы шаблона относительно масштаба кадра
+TEMPLATE_SEARCH_MARGIN = 4  # Расширение области поиска (пикселей)
+TEMPLATE_COARSE_SLACK = 0.15  # Допуск грубого уровня пирамиды ниже порога
+TEMPLATE_MIN_COARSE_SCORE = 0.9  # Грубый уровень - только для шаблонов, которые узнаются после уменьшения вдвое
+# Режим детекции: "thread" - в потоке основного процесса, "process" - извлечение признаков в пуле процессов
+# (кадры передаются через общую память, трекер и сглаживание остаются в основном процессе)
+DETECTION_MODE = "thread"
+DETECTION_WORKERS = 2
+DETECTION_POOL_POLL_SECONDS = 0.01  # Ожидание кадра, пока процессы пула заняты
+BLOB_ASPECT_RANGE = None  # (мин, макс) отношения ширины к высоте таблички моба, None - без фильтра
+# Сегментация мобов: "full" - по всему игровому полю, "coarse" - кандидаты на уменьшенном в
+# SEGMENTATION_PYRAMID_FACTOR раз кадре и уточнение их окон (с запасом SEGMENTATION_REFINE_MARGIN пикселей)
+# Сравнение точности и времени: python -m benchmarks.bench_segmentation <запись>
+SEGMENTATION_MODE = "full"
+SEGMENTATION_PYRAMID_FACTOR = 2  # 2-4
+SEGMENTATION_REFINE_MARGIN = 4
+# Замер времени этапов детекции: p50/p95/p99 на оверлее, сохранение в файл клавишей "p" и при выходе
+STAGE_TIMING = True
+STAGE_TIMING_WINDOW = 256  # Последних замеров на этап
+STAGE_TIMING_DUMP = "stage_timing.json"
+# Трекинг мобов: фильтр Калмана с постоянной скоростью для центра таблички (пиксели, секунды)
+MOB_KALMAN_PROCESS_NOISE = 2000.0  # Спектральная плотность случайного ускорения (пикс^2/с^3)
+MOB_KALMAN_MEASUREMENT_NOISE = 4.0  # Дисперсия измерения центра (пикс^2)
+MOB_KALMAN_INITIAL_VELOCITY_VAR = 10000.0  # Начальная дисперсия скорости нового трека (пикс^2/с^2)
+MOB_PREDICT_MAX_SECONDS = 0.3  # Максимальная экстраполяция положения от последнего измерения
+MOB_MAX_FAILED_SELECTIONS = 2  # Неудачных выборов целью, после которых моб игнорируется
+MOB_IGNORE_DURATION_SECONDS = 300  # Сколько игнорировать моба после неудач или сброса неубиваемой цели
+# Система координат трекинга мобов: "screen" - экранная, "rotate" - мировая по известным поворотам бота
+# (длительность нажатия * CAMERA_ROTATE_DEGREES_PER_SECOND), "flow" - мировая по повороту картинки игрового поля
+MOB_TRACKING_FRAME = "screen"
+CAMERA_ROTATE_DEGREES_PER_SECOND = 90.0  # Знак - так, чтобы неподвижные мобы сохраняли мировые координаты
+CAMERA_FLOW_RADIUS_RANGE = (80, 400)  # Кольцо вокруг персонажа для оценки поворота (пикселей)
+CAMERA_FLOW_ANGLE_BINS = 360  # Разрешение по углу (строк на оборот)
+CAMERA_FLOW_MIN_RESPONSE = 0.1  # Минимальный отклик фазовой корреляции
+MOB_STORE_CAPACITY = 64  # Начальное количество слотов хранилища треков (удваивается при нехватке)
+MOB_ID_LIMIT = 1 << 16  # Номера мобов выдаются по кругу от 1 до MOB_ID_LIMIT - 1
+# Группировка областей сеткой (group_mobs_grid) только начиная с этого количества областей:
+# при десятках областей плотная group_mobs_simple быстрее (точка пересечения - benchmarks/bench_grouping.py)
+MOB_GROUP_GRID_MIN_BLOBS = 300
+BOT_INPUT_LATENCY_SECONDS = 0.05  # Задержка от решения до клика: клик по положению моба в этот момент
+FRAME_WAIT_TIMEOUT_SECONDS = 0.5  # Максимальное ожидание нового кадра/результатов детекции
+CHANGE_TILE_SIZE = 32  # Размер плитки детектора изменений кадра (пикселей)
+CHANGE_THRESHOLD = 0  # Допустимая сумма модулей разности пикселей плитки, 0 - любое изменение считается изменением
 
 REDUCE_RESOLUTION = True  # Включить уменьшение разрешения
+POSTERIZE_LEVELS = 4  # Уровней цвета на канал при постеризации (степень двойки), 0 - выключить
+POSTERIZE_QUANTIZER = "shift"  # "shift" (сдвиги NumPy, быстрее), "lut" (таблица cv.LUT) или "off"
+# Цветовая классификация пикселей (мобы, радар): "lut" - таблица классов по палитре постеризованного кадра
+# (без перевода в HSV, только при POSTERIZE_LEVELS 2 или 4), "hsv" - cvtColor + inRange
+COLOR_CLASSIFIER = "lut"
+# Режим захвата: "full" - весь кадр, "roi" - только области CAPTURE_ROIS и точки CAPTURE_ROI_DOTS
+# (остальная часть кадра остается черной, система координат не меняется)
+CAPTURE_MODE = "full"
+CAPTURE_ROIS = {
+    "farm": FARM_AREA,
+    "radar": RADAR_AREA,
+    "target": TARGET_AREA,
+    "buffs": BUFFS_AREA,
+    "animus": ANIMUS_AREA,
+}
+CAPTURE_ROI_DOTS = {
+    "myhp": MYHP_DOT,
+    "mymp": MYMP_DOT,
+    "target_dot1": TARGET_DOT1,
+    "target_dot2": TARGET_DOT2,
+    "target_max_hp": TARGET_MAX_HP_DOT,
+    "animus_hp": ANIMUS_HP_DOT,
+    "animus_exit": ANIMUS_EXIT_DOT,
+    "skill": SKILL_DOT,
+    "battle_mode": BATTLE_MODE_DOT,
+}
+CAPTURE_ROI_DOT_RADIUS = 2  # Полуразмер квадрата вокруг контрольной точки
+FRAME_BUFFER_SLOTS = 4  # Слотов в кольцевом буфере кадров (захват -> детекция -> рендер)
+
+# Источник кадров: "gdi" - захват окна Windows, "replay" - воспроизведение записи
+CAPTURE_SOURCE = "gdi"
+REPLAY_PATH = "recordings/session"  # Каталог с кадрами, видеофайл или стек .npy
+REPLAY_MODE = "realtime"  # "realtime", "fixed" (REPLAY_FPS) или "max" (без задержек)
+REPLAY_FPS = 5
+REPLAY_LOOP = False
+REPLAY_PREPROCESSED = False  # Кадры записи уже уменьшены и постеризованы (записи SessionRecorder - всегда)
+
+# Запись сессии (кадры + результаты детекции) для последующего анализа и воспроизведения
+RECORD_SESSION = False
+RECORD_DIR = "recordings"  # Каждая запись - подкаталог с датой и временем старта
+RECORD_FRAME_STRIDE = 1  # Записывать каждый N-й кадр
+RECORD_PNG_COMPRESSION = 1  # 0-9, постеризованные кадры хорошо сжимаются и при низком уровне
+RECORDER_QUEUE_SIZE = 64
 
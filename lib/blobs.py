@@ -0,0 +1,72 @@
+import cv2 as cv
+import numpy as np
+
+
+# Найденная область маски: ограничивающий прямоугольник, площадь (пикселей) и центр масс
+BLOB_DTYPE = np.dtype([
+    ("x", "<i4"),
+    ("y", "<i4"),
+    ("w", "<i4"),
+    ("h", "<i4"),
+    ("area", "<i4"),
+    ("cx", "<f4"),
+    ("cy", "<f4"),
+])
+
+
+def empty_blobs():
+    return np.empty(0, dtype=BLOB_DTYPE)
+
+
+def extract_blobs(mask, offset=(0, 0), min_area=0, aspect_range=None):
+    """
+    Области маски по статистике связных компонент (8-связность) без обхода контуров в Python.
+    :param mask: Бинарная маска uint8.
+    :param offset: Смещение маски относительно кадра (x, y).
+    :param min_area: Отбрасываются области площадью не больше min_area пикселей.
+    :param aspect_range: (мин, макс) отношения w/h или None - без фильтра.
+    :return: Массив BLOB_DTYPE.
+    """
+    count, _, stats, centroids = cv.connectedComponentsWithStats(mask, connectivity=8, ltype=cv.CV_32S)
+    stats = stats[1:count]
+    centroids = centroids[1:count]
+
+    keep = stats[:, cv.CC_STAT_AREA] > min_area
+    if aspect_range is not None:
+        aspect = stats[:, cv.CC_STAT_WIDTH] / stats[:, cv.CC_STAT_HEIGHT]
+        keep &= (aspect >= aspect_range[0]) & (aspect <= aspect_range[1])
+    stats = stats[keep]
+    centroids = centroids[keep]
+
+    blobs = np.empty(len(stats), dtype=BLOB_DTYPE)
+    blobs["x"] = stats[:, cv.CC_STAT_LEFT] + offset[0]
+    blobs["y"] = stats[:, cv.CC_STAT_TOP] + offset[1]
+    blobs["w"] = stats[:, cv.CC_STAT_WIDTH]
+    blobs["h"] = stats[:, cv.CC_STAT_HEIGHT]
+    blobs["area"] = stats[:, cv.CC_STAT_AREA]
+    blobs["cx"] = centroids[:, 0] + offset[0]
+    blobs["cy"] = centroids[:, 1] + offset[1]
+    return blobs
+
+
+def as_blobs(rects):
+    """
+    Приводит прямоугольники [(x, y, w, h)] или массив BLOB_DTYPE к массиву BLOB_DTYPE.
+    Площадь и центр для прямоугольников берутся по самому прямоугольнику.
+    """
+    if isinstance(rects, np.ndarray) and rects.dtype == BLOB_DTYPE:
+        return rects
+    rects = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+    blobs = np.empty(len(rects), dtype=BLOB_DTYPE)
+    blobs["x"], blobs["y"], blobs["w"], blobs["h"] = rects.T
+    blobs["area"] = rects[:, 2] * rects[:, 3]
+    blobs["cx"] = rects[:, 0] + rects[:, 2] / 2
+    blobs["cy"] = rects[:, 1] + rects[:, 3] / 2
+    return blobs
+
+
+def blob_rects(blobs):
+    """
+    Прямоугольники областей [(x, y, w, h)] (для отладки и сериализации).
+    """
+    return list(zip(*(blobs[field].tolist() for field in ("x", "y", "w", "h"))))
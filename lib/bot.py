@@ -1,11 +1,14 @@
 import time
 import math
+
+import numpy as np
 from pynput.mouse import Controller, Button
 from pynput.keyboard import Controller as Keyboard, Key
-from threading import Thread, Lock
+from threading import Condition, Thread, Lock
 from time import sleep
 import config as cfg
 from lib.botstatemanager import BotStateManager
+from lib.snapshot import EMPTY_SNAPSHOT, predict_centers
 from lib.states.states import *
 
 
@@ -13,6 +16,11 @@ class RFBot:
     def __init__(self, renderer=None):
         self.stopping = False
         self.lock = Lock()
+        self.data_ready = Condition(self.lock)  # Уведомление о новых данных детекции
+        self.data_id = 0  # Номер кадра последних данных детекции
+        # Последний снимок результатов детекции (DetectionSnapshot). Состояния читают его один раз за тик
+        # (snapshot = bot.snapshot), поэтому решение не смешивает флаги разных кадров
+        self.snapshot = EMPTY_SNAPSHOT
         self.renderer = renderer
         self.mouse = Controller()
         self.keyboard = Keyboard()
@@ -21,27 +29,28 @@ class RFBot:
         self.state_manager = BotStateManager(StartState())
 
         # Остальные атрибуты
-        self.have_target = False
-        self.have_animus = False
-        self.target_full_hp = True
-        self.skill_is_pressed = False
-        self.enough_mana = True
-        self.enough_hp = True
-        self.battle_mode = False
-        self.have_close_targets_left = False
         self.current_weapon =  'main'
-        self.mobs = []
         self.screenshot = None
         self.prev_attack = False
         self.aggro_counter = 0
         self.kill_counter = 0
         self.stopped = True
-        self.frame_delay = cfg.LOAD_LIMIT_FRAMETIME + 0.04
+        self.frame_delay = 0  # Минимальный интервал между тиками (0 - по событию новых данных)
         self.stop_time = time.time() + cfg.BOT_RUNTIME_LIMIT_HOURS * 3600
         self.rebuff_time = time.time()
         self.potion_time = time.time()
         self.animus_last_see_time = time.time()
         self.mob_ignore_timeout = time.time()
+        self.governor = None
+        self.mob_tracker = None  # MobTracker детектора: отчеты о целях для игнорирования отдельных мобов
+        self.target_id = None  # Номер моба, выбранного целью
+
+    def set_governor(self, governor):
+        """
+        Подключает RateGovernor: частота захвата следует за состоянием бота.
+        """
+        self.governor = governor
+        self.state_manager.listener = governor.on_state_change
 
     def get_current_state(self):
         if self.state_manager.current_state:
@@ -52,17 +61,19 @@ class RFBot:
         timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
         print(f"[{timestamp}] {msg}")
 
-    def update_char_data(self, args):
-        with self.lock:
-            self.have_target = args[0]
-            self.target_full_hp = args[1]
-            self.have_animus = args[2]
-            self.mobs = list(args[3])
-            self.skill_is_pressed = args[4]
-            self.enough_mana = args[5]
-            self.enough_hp = args[6]
-            self.battle_mode = args[7]
-            self.have_close_targets_left = args[8]
+    def update_snapshot(self, snapshot):
+        """
+        Принимает снимок результатов детекции заменой одной ссылки. Снимок по уже полученному кадру пропускается.
+        Мобы не копируются: массив снимка доступен только для чтения.
+        :return: True, если снимок новый.
+        """
+        with self.data_ready:
+            if snapshot.frame_id <= self.snapshot.frame_id:
+                return False
+            self.snapshot = snapshot
+            self.data_id = snapshot.frame_id
+            self.data_ready.notify_all()
+        return True
 
     def update_screenshot(self, screenshot):
         with self.lock:
@@ -72,7 +83,11 @@ class RFBot:
         self.stopped = False
         sleep(3)
         self.log(f"Bot start in {cfg.BOT_START_DELAY_HOURS} hours")
+        if self.governor and cfg.BOT_START_DELAY_HOURS:
+            self.governor.set_profile("idle")
         sleep(60 * cfg.BOT_START_DELAY_HOURS)
+        if self.governor:
+            self.governor.set_profile("normal")
         self.log("Bot Started")
         Thread(target=self.run, daemon=True).start()
 
@@ -80,9 +95,21 @@ class RFBot:
         self.stopped = True
         self.log("Бот остановлен")
 
+    def wait_for_data(self, last_data_id, timeout):
+        """
+        Ожидает данные детекции по кадру новее last_data_id.
+        :return: Номер кадра последних данных.
+        """
+        with self.data_ready:
+            self.data_ready.wait_for(lambda: self.data_id > last_data_id, timeout)
+            return self.data_id
+
     def run(self):
+        last_data_id = 0
         while not self.stopped and not cfg.DETECTION_DEBUG_MODE:
+            # Решения принимаем только по свежим данным детекции
             start_time = time.time()
+            last_data_id = self.wait_for_data(last_data_id, cfg.FRAME_WAIT_TIMEOUT_SECONDS)
 
             if time.time() > self.stop_time:
                 self.log("Время работы истекло, останавливаем бота")
@@ -95,13 +122,17 @@ class RFBot:
                 self.log(f"Ошибка в состоянии: {e}. Сбрасываем в BuffingState.")
                 self.state_manager.set_state(BuffingState())
 
-            elapsed_time = time.time() - start_time
-            sleep_time = max(0, self.frame_delay - elapsed_time)
-            time.sleep(sleep_time)
+            if self.frame_delay > 0:
+                elapsed_time = time.time() - start_time
+                time.sleep(max(0, self.frame_delay - elapsed_time))
 
     def rotate(self, time_to_rotate="Short"):
+        duration = 0.25 if time_to_rotate == "Short" else 0.4
+        # Трекер заранее узнает о повороте и переносит треки мобов вместе с камерой
+        if self.mob_tracker:
+            self.mob_tracker.report_rotation(time.time(), duration)
         self.keyboard.press(Key.left)
-        sleep(0.25 if time_to_rotate == "Short" else 0.4)
+        sleep(duration)
         self.keyboard.release(Key.left)
         sleep(2)
 
@@ -117,18 +148,17 @@ class RFBot:
             self.keyboard.press(Key.f5)
             self.keyboard.release(Key.f5)
             sleep(2)
-            while self.skill_is_pressed:
+            while self.snapshot.skill_is_pressed:
                 sleep(1)
             self.rebuff_time = time.time() + cfg.REBUFF_TIMEOUT_SECODS
 
     def summon_animus(self):
-        if not self.have_animus and self.animus_last_see_time < time.time():
+        if not self.snapshot.have_animus and self.animus_last_see_time < time.time():
             self.log("Призываем анимус (F6)")
             self.keyboard.press(Key.f6)
             sleep(0.1)
             self.keyboard.release(Key.f6)
             sleep(1)
-            self.have_animus = True
 
     def select_target_by_coordinates(self, position):
         x, y = position
@@ -138,19 +168,43 @@ class RFBot:
         self.mouse.release(Button.left)
         sleep(1)
 
+    def candidate_mobs(self, mobs=None):
+        """
+        Мобы, которых можно выбрать целью: без игнорируемых (неудачные выборы, неубиваемые цели).
+        :param mobs: Массив MOB_DTYPE (по умолчанию мобы последнего снимка).
+        """
+        mobs = self.snapshot.mobs if mobs is None else mobs
+        return mobs[mobs["ignored_until"] <= time.time()]
+
+    def report_target(self, mob_id):
+        self.target_id = mob_id
+        if self.mob_tracker:
+            self.mob_tracker.report_target(mob_id)
+
     def select_target(self):
         if self.screenshot is None:
             self.log("Скриншот отсутствует, не можем выбрать цель.")
             return False
-        if len(self.mobs) == 0:
+        if len(self.candidate_mobs()) == 0:
             self.log("Список мобов пуст, некого выбирать.")
             return False
 
         retry_select_count = 0
-        while not self.have_target and retry_select_count <= 5:
+        mob_id = None
+        while retry_select_count <= 5:
+            # Каждая попытка - по свежему снимку: цель могла выбраться после предыдущего клика
+            snapshot = self.snapshot
+            if snapshot.have_target:
+                break
+            mobs = self.candidate_mobs(snapshot.mobs)
+            if len(mobs) == 0:
+                break
 
-            self.mobs.sort(key=lambda mob: mob.distance_to_character, reverse=True)
-            x, y = self.mobs[0].get_center()
+            # Клик по положению, которое моб займёт к моменту клика (с учётом задержки кадра и ввода)
+            mob = mobs[np.argmax(mobs["distance"])]
+            mob_id = int(mob["id"])
+            x, y = predict_centers(mob, time.time() + cfg.BOT_INPUT_LATENCY_SECONDS)
+            x, y = int(x), int(y)
 
             # Проверка границ
             h, w = self.screenshot.shape[:2]
@@ -182,21 +236,34 @@ class RFBot:
                 sleep(1)
 
             retry_select_count += 1
-        return self.have_target
+
+        have_target = self.snapshot.have_target
+        if have_target:
+            self.report_target(mob_id)
+        elif mob_id is not None and self.mob_tracker:
+            self.mob_tracker.report_selection_failed(mob_id)
+        return have_target
 
     def attack_target(self):
-        if self.mob_ignore_timeout < time.time() and self.target_full_hp:
+        snapshot = self.snapshot
+        if self.mob_ignore_timeout < time.time() and snapshot.target_full_hp:
             self.log("Цель не умирает. Сбрасываем.")
             self.keyboard.press(Key.esc)
             self.keyboard.release(Key.esc)
+            if self.mob_tracker and self.target_id is not None:
+                self.mob_tracker.report_unkillable(self.target_id)
+            self.report_target(None)
             sleep(1)
             return
 
-        if self.have_target:
-            if cfg.BOT_ANIMUS_CAREFUL and  self.have_animus and self.target_full_hp:
+        if snapshot.have_target:
+            if cfg.BOT_ANIMUS_CAREFUL and  snapshot.have_animus and snapshot.target_full_hp:
                 self.log("Цель полна HP. Спамим клавиши (space + ',') для атаки анимусом.")
-                # Спамим клавиши, пока цель full_hp и не истечет время игнорирования
-                while self.have_target and self.target_full_hp and self.mob_ignore_timeout > time.time():
+                # Спамим клавиши, пока цель full_hp и не истечет время игнорирования (каждый раз по свежему снимку)
+                while self.mob_ignore_timeout > time.time():
+                    snapshot = self.snapshot
+                    if not (snapshot.have_target and snapshot.target_full_hp):
+                        break
                     self.keyboard.press(',')
                     self.keyboard.release(',')
                     sleep(0.1)  # Небольшая пауза между нажатиями
@@ -204,13 +271,13 @@ class RFBot:
                     self.keyboard.release(Key.space)
                     sleep(0.1)  # Пауза между комбо-нажатием
 
-            if not self.skill_is_pressed:
+            if not snapshot.skill_is_pressed:
                 self.keyboard.press(Key.f4)
                 self.keyboard.release(Key.f4)
-                self.skill_is_pressed = True
                 sleep(1)
 
     def loot_mobs(self):
+        self.report_target(None)
         self.kill_counter += 1
         self.log(f"Лутаем. Убито мобов: {self.kill_counter}")
         for _ in range(cfg.BOT_LOOT_TIME):
@@ -2,8 +2,9 @@ from time import sleep
 
 
 class BotStateManager:
-    def __init__(self, initial_state):
+    def __init__(self, initial_state, listener=None):
         self.current_state = initial_state
+        self.listener = listener  # Вызывается при смене состояния (например, RateGovernor)
 
     def handle(self, bot):
         if self.current_state:
@@ -11,4 +12,6 @@ class BotStateManager:
 
     def set_state(self, new_state):
         self.current_state = new_state
+        if self.listener:
+            self.listener(new_state)
         sleep(0.2)
\ No newline at end of file
@@ -0,0 +1,121 @@
+from collections import deque
+
+import cv2 as cv
+import numpy as np
+
+import config as cfg
+
+
+class RotationYawEstimator:
+    """
+    Рыскание камеры по известным поворотам бота: поворот клавишей длится известное время
+    с постоянной угловой скоростью (CAMERA_ROTATE_DEGREES_PER_SECOND).
+    Бот сообщает о повороте до нажатия клавиши, поэтому кадры, снятые во время поворота, уже учитывают его.
+    """
+
+    def __init__(self, rate):
+        """
+        :param rate: Изменение рыскания в градусах за секунду удержания клавиши поворота.
+        """
+        self.rate = rate
+        self.base = 0.0  # Рыскание после завершенных поворотов
+        # Повороты (начало, длительность, направление); append из потока бота, popleft из потока детекции
+        self.rotations = deque()
+
+    def report_rotation(self, start, duration, direction=1):
+        self.rotations.append((start, duration, direction))
+
+    def observe(self, frame, timestamp):
+        pass
+
+    def yaw_at(self, t):
+        """
+        Рыскание камеры (градусы) в момент t. Моменты запросов не убывают (время кадров),
+        поэтому завершенные повороты сворачиваются в base.
+        """
+        while self.rotations and self.rotations[0][0] + self.rotations[0][1] <= t:
+            start, duration, direction = self.rotations.popleft()
+            self.base += direction * self.rate * duration
+        yaw = self.base
+        for start, duration, direction in list(self.rotations):
+            yaw += direction * self.rate * min(max(t - start, 0.0), duration)
+        return yaw
+
+
+class FlowYawEstimator:
+    """
+    Рыскание камеры по изображению игрового поля: кольцо вокруг персонажа переводится в полярные
+    координаты (cv.warpPolar), где поворот вокруг центра становится сдвигом по оси угла,
+    а сдвиг между соседними кадрами находится фазовой корреляцией (cv.phaseCorrelate).
+    """
+
+    def __init__(self, center, radius_range, angle_bins, min_response):
+        """
+        :param center: Центр поворота (позиция персонажа на кадре).
+        :param radius_range: (внутренний, внешний) радиус кольца в пикселях; внутренний круг с персонажем не учитывается.
+        :param angle_bins: Строк полярного изображения на полный оборот.
+        :param min_response: Минимальный отклик фазовой корреляции; менее надежные оценки пропускаются.
+        """
+        self.center = center
+        self.radius_range = radius_range
+        self.angle_bins = angle_bins
+        self.min_response = min_response
+        self.previous = None
+        self.yaw = 0.0
+        self.samples = deque(maxlen=64)  # (время кадра, рыскание)
+
+    def report_rotation(self, start, duration, direction=1):
+        pass
+
+    def polar(self, frame):
+        """
+        Кольцо вокруг центра в полярных координатах (строки - угол, столбцы - радиус, шаг 2 пикселя), float32.
+        """
+        gray = cv.cvtColor(frame, cv.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv.COLOR_BGR2GRAY)
+        inner, outer = self.radius_range
+        polar = cv.warpPolar(
+            gray, (outer // 2, self.angle_bins), self.center, outer, cv.INTER_LINEAR + cv.WARP_POLAR_LINEAR
+        )
+        return np.float32(polar[:, inner // 2:])
+
+    def observe(self, frame, timestamp):
+        """
+        Оценивает поворот относительно предыдущего кадра.
+        """
+        polar = self.polar(frame)
+        if self.previous is not None and self.previous.shape == polar.shape:
+            (_, shift), response = cv.phaseCorrelate(self.previous, polar)
+            if response >= self.min_response:
+                # Картинка повернулась на +угол, значит камера - на -угол
+                self.yaw -= shift * 360.0 / self.angle_bins
+        self.previous = polar
+        self.samples.append((timestamp, self.yaw))
+
+    def yaw_at(self, t):
+        """
+        Рыскание камеры по последнему кадру, снятому не позже t.
+        """
+        for timestamp, yaw in reversed(self.samples):
+            if timestamp <= t:
+                return yaw
+        return self.samples[0][1] if self.samples else 0.0
+
+
+def create_yaw_estimator(mode=None):
+    """
+    Оценка рыскания камеры для трекинга мобов в мировой системе координат.
+    :param mode: "screen" (None - без учета поворотов), "rotate" или "flow"; по умолчанию MOB_TRACKING_FRAME.
+    """
+    mode = cfg.MOB_TRACKING_FRAME if mode is None else mode
+    if mode == "screen":
+        return None
+    if mode == "rotate":
+        return RotationYawEstimator(cfg.CAMERA_ROTATE_DEGREES_PER_SECOND)
+    if mode == "flow":
+        return FlowYawEstimator(
+            (cfg.SCREEN_CENTER_X, cfg.SCREEN_CENTER_Y),
+            cfg.CAMERA_FLOW_RADIUS_RANGE,
+            cfg.CAMERA_FLOW_ANGLE_BINS,
+            cfg.CAMERA_FLOW_MIN_RESPONSE,
+        )
+    raise Exception(f"Unknown mob tracking frame: {mode}")
@@ -0,0 +1,111 @@
+from functools import lru_cache
+
+import cv2 as cv
+import numpy as np
+
+import config as cfg
+
+
+class ColorClassifier:
+    """
+    Классификация пикселей постеризованного кадра по цветовым классам без перевода в HSV.
+    Постеризованный кадр содержит только levels^3 разных цветов, поэтому номер цвета
+    (b * levels^2 + g * levels + r по уровням каналов) вычисляется одним cv.transform,
+    а маска класса получается одним cv.LUT по таблице из 256 значений.
+    Таблицы строятся заранее: цвета палитры переводятся в HSV и проверяются диапазонами классов.
+    """
+
+    def __init__(self, levels, classes):
+        """
+        :param levels: Уровней на канал в постеризованном кадре (2 или 4).
+        :param classes: Последовательность (имя, нижняя граница HSV, верхняя граница HSV).
+        """
+        if not self.supports(levels):
+            raise Exception(f"Color LUT requires 2 or 4 posterize levels, got {levels}")
+        self.levels = levels
+        shift = 8 - int(np.log2(levels))
+        step = 1 << shift
+
+        # Палитра в порядке номеров цветов: значения уровней такие же, как после постеризации
+        values = np.arange(levels) * step + step // 2
+        b, g, r = np.meshgrid(values, values, values, indexing="ij")
+        palette = np.stack([b.ravel(), g.ravel(), r.ravel()], axis=1).astype(np.uint8).reshape(-1, 1, 3)
+        hsv_palette = cv.cvtColor(palette, cv.COLOR_BGR2HSV)
+
+        self.names = []
+        self.bits = {}
+        self.luts = {}  # имя класса -> таблица 256 значений (255 - цвет относится к классу)
+        self.class_lut = np.zeros(256, dtype=np.uint8)  # номер цвета -> битовая маска классов
+        for bit, (name, lower, upper) in enumerate(classes):
+            inside = cv.inRange(hsv_palette, np.array(lower), np.array(upper)).ravel() > 0
+            lut = np.zeros(256, dtype=np.uint8)
+            lut[:len(inside)][inside] = 255
+            self.names.append(name)
+            self.bits[name] = 1 << bit
+            self.luts[name] = lut
+            self.class_lut[:len(inside)][inside] |= 1 << bit
+
+        # Номер цвета как линейная функция значений каналов: (v - step/2) / step для каждого уровня
+        weights = np.array([levels * levels, levels, 1], dtype=np.float32) / step
+        offset = -float(weights.sum()) * (step // 2)
+        self.matrix_bgr = np.append(weights, offset).reshape(1, 4).astype(np.float32)
+        self.matrix_bgra = np.array([[*weights, 0.0, offset]], dtype=np.float32)
+
+    @staticmethod
+    def supports(levels):
+        """
+        Номер цвета помещается в uint8 только при 2 или 4 уровнях на канал.
+        """
+        return levels in (2, 4)
+
+    def index(self, image):
+        """
+        Номер цвета палитры для каждого пикселя (BGR или BGRA), uint8.
+        """
+        matrix = self.matrix_bgra if image.shape[2] == 4 else self.matrix_bgr
+        return cv.transform(image, matrix)
+
+    def lookup(self, index, name):
+        """
+        Маска класса name (0/255) по изображению номеров цветов.
+        """
+        return cv.LUT(index, self.luts[name])
+
+    def mask(self, image, name):
+        return self.lookup(self.index(image), name)
+
+    def classify(self, image):
+        """
+        Битовая маска классов для каждого пикселя (бит класса - self.bits[имя]).
+        """
+        return cv.LUT(self.index(image), self.class_lut)
+
+
+def color_classes_key():
+    """
+    Ключ кэша классификатора: текущие диапазоны HSV классов из config.py.
+    """
+    return (
+        ("mob", tuple(cfg.COLOR_YELLOW_LOWER), tuple(cfg.COLOR_YELLOW_UPPER)),
+        ("radar", tuple(cfg.RADAR_YELLOW_LOWER), tuple(cfg.RADAR_YELLOW_UPPER)),
+    )
+
+
+@lru_cache(maxsize=4)
+def get_color_classifier(levels, classes):
+    """
+    Классификатор для уровней постеризации и диапазонов классов.
+    Кэшируется по значениям, поэтому пересобирается автоматически при изменении диапазонов в config.py.
+    """
+    return ColorClassifier(levels, classes)
+
+
+def color_lut_enabled():
+    """
+    Таблица применима, если кадры постеризуются и число уровней поддерживается (COLOR_CLASSIFIER = "lut").
+    """
+    return (
+        cfg.COLOR_CLASSIFIER == "lut"
+        and cfg.POSTERIZE_QUANTIZER != "off"
+        and ColorClassifier.supports(cfg.POSTERIZE_LEVELS)
+    )
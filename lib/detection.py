@@ -1,14 +1,23 @@
 import datetime
 import inspect
+from functools import lru_cache
 
 import cv2
 import cv2 as cv
 import numpy as np
-from threading import Thread, Lock
+from threading import Condition, Thread, Lock
 import time
 import config as cfg
-from collections import deque
+from lib.blobs import empty_blobs, extract_blobs
+from lib.colorclasses import color_classes_key, color_lut_enabled, get_color_classifier
+from lib.detectionworker import DetectionWorkerPool
+from lib.framediff import FrameChangeDetector
 from lib.mobtracker import MobTracker
+from lib.probes import build_probe_set
+from lib.profiling import StageTimer
+from lib.signals import build_signal_registry
+from lib.snapshot import EMPTY_SNAPSHOT, DetectionSnapshot, read_only
+from lib.templates import build_template_matcher, masked_match_score, to_gray
 
 
 def is_in_dynamic_range(color, target, delta=25):
@@ -17,60 +26,115 @@ def is_in_dynamic_range(color, target, delta=25):
     return all(lower[i] <= color[i] <= upper[i] for i in range(3))
 
 
+# Контрольные точки в порядке get_dot_data (отладочный оверлей и запись сессии)
+DOT_PROBE_NAMES = ("myhp", "mymp", "animus_hp", "animus_exit", "skill", "target_dot1", "target_dot2", "target_max_hp")
+
+
+def snapshot_property(name, doc=None):
+    """
+    Свойство Detection только для чтения: поле последнего опубликованного снимка (прежний интерфейс).
+    """
+
+    def getter(detection):
+        return getattr(detection.snapshot, name)
+
+    return property(getter, doc=doc)
+
+
 class Detection:
-    def __init__(self, renderer=None):
+    # Результаты последнего кадра читаются из self.snapshot, а не дублируются в атрибутах
+    have_target = snapshot_property("have_target")
+    target_full_hp = snapshot_property("target_full_hp")
+    have_animus = snapshot_property("have_animus")
+    mobs = snapshot_property("mobs", "Массив MOB_DTYPE")
+    skill_is_pressed = snapshot_property("skill_is_pressed")
+    enough_mana = snapshot_property("enough_mana")
+    enough_hp = snapshot_property("enough_hp")
+    have_targets_left = snapshot_property("have_targets_left")
+    have_buffs = snapshot_property("have_buffs")
+
+    def __init__(self, renderer=None, wincap=None):
+        """
+        :param renderer: ScreenRenderer для отладочной визуализации (необязателен).
+        :param wincap: WindowCapture, на кадры которого подписывается детектор (необязателен).
+        """
         self.mob_tracker =  MobTracker()
         self.battle_mode = False
-        self.have_targets_left = False
         self.stopped = False
-        self.enough_hp = True
-        self.target_full_hp = True
-        self.enough_mana = False
-        self.skill_is_pressed = False
 
-        self.TARGET_MAX_HP_color = ""
         self.BATTLE_MODE_COLOR = ""
         self.lock = Lock()
         self.screenshot = None
-        self.mobs = []
-        self.have_target = False
-        self.have_buffs = False
-        self.have_animus = False
+        self.frame = None  # FrameRef текущего кадра из кольцевого буфера WindowCapture
+        self.wincap = wincap
+        self.frame_ready = Condition(self.lock)  # Уведомление о новом кадре (update/update_frame)
+        self.results_ready = Condition(self.lock)  # Уведомление о новых результатах детекции
+        self.frame_id = 0  # Номер последнего полученного кадра
+        self.processed_frame_id = 0  # Номер последнего обработанного кадра
+        self.result_id = 0  # Номер кадра, по которому опубликованы результаты
+        self.frame_timestamp = 0.0  # Время захвата текущего кадра
+        # Последние результаты: неизменяемый снимок, заменяется одной ссылкой на каждый кадр
+        self.snapshot = EMPTY_SNAPSHOT
         self.atk_pressed = False
-        self.MYHP_DOT_color = ""
-        self.MYMP_DOT_color = ""
-        self.ANIMUS_HP_DOT_color = ""
-        self.ANIMUS_EXIT_DOT_color = ""
-        self.SKILL_DOT_color = ""
-        self.TARGET_DOT1_color = ""
-        self.TARGET_DOT2_color = ""
+
+        # Контрольные точки из config.py, скомпилированные в массивы
+        self.probes = build_probe_set()
+        self.probe_colors = np.zeros((len(self.probes), 3), dtype=np.uint8)
+        self.probe_matches = np.zeros(len(self.probes), dtype=bool)
+
+        # Шаблоны интерфейса из config.py (TEMPLATES), ищутся только в своих областях
+        self.templates = build_template_matcher()
+        self.template_matches = {}
+
+        # Цветовые признаки текущего кадра (переиспользуются проверкой радара):
+        # номера цветов палитры для таблицы классов или HSV-изображение
+        self.color_image = None
+        self.color_origin = (0, 0)  # Смещение color_image относительно кадра
+        self.color_classifier = None  # ColorClassifier, если кадры постеризованы (COLOR_CLASSIFIER = "lut")
+        self.color_bounds = {
+            "mob": (np.array(cfg.COLOR_YELLOW_LOWER), np.array(cfg.COLOR_YELLOW_UPPER)),
+            "radar": (np.array(cfg.RADAR_YELLOW_LOWER), np.array(cfg.RADAR_YELLOW_UPPER)),
+        }
+        # Сегментация мобов: "full" - по всему игровому полю, "coarse" - поиск кандидатов на уменьшенном кадре
+        self.segmentation_mode = cfg.SEGMENTATION_MODE
+        self.pyramid_factor = cfg.SEGMENTATION_PYRAMID_FACTOR
+        self.refine_margin = cfg.SEGMENTATION_REFINE_MARGIN
         self.rebuff_time = datetime.datetime.now()
         self.animus_attempt_time = datetime.datetime.now()
         self.renderer = renderer
-        self.frame_delay = cfg.LOAD_LIMIT_FRAMETIME
-
-        # История изменений для параметров (буфер из 3 значений)
-        self.history_len = 3
-
-        self.hist_have_target = deque(maxlen=self.history_len)
-        self.hist_target_full_hp = deque(maxlen=self.history_len)
-        self.hist_have_animus = deque(maxlen=self.history_len)
-        self.hist_skill_is_pressed = deque(maxlen=self.history_len)
-        self.hist_enough_mana = deque(maxlen=self.history_len)
-        self.hist_enough_hp = deque(maxlen=self.history_len)
-        self.hist_mobs_coordinates = deque(maxlen=self.history_len)
-        self.hist_have_targets_left = deque(maxlen=self.history_len)
+        self.governor = None  # RateGovernor, которому сообщается время обработки кадра
+        self.frame_delay = 0  # Минимальный интервал между проходами детекции (0 - по событию кадра)
+        self.pool = None  # DetectionWorkerPool в режиме DETECTION_MODE = "process"
+        # Время этапов обработки кадра (p50/p95/p99 - timer.summary())
+        self.timer = StageTimer(cfg.STAGE_TIMING_WINDOW, cfg.STAGE_TIMING)
+        self.mob_tracker.timer = self.timer
+
+        # Сглаживание (debounce) флагов: политики задаются в config.py (SIGNAL_DEBOUNCE)
+        self.signals = build_signal_registry({
+            "have_target": self.have_target,
+            "target_full_hp": self.target_full_hp,
+            "have_animus": self.have_animus,
+            "skill_is_pressed": self.skill_is_pressed,
+            "enough_mana": self.enough_mana,
+            "enough_hp": self.enough_hp,
+            "have_targets_left": self.have_targets_left,
+            "have_buffs": self.have_buffs,
+        })
+
+        # Пропуск повторной обработки неизменившихся кадров
+        self.change_detector = FrameChangeDetector(cfg.CHANGE_TILE_SIZE, cfg.CHANGE_THRESHOLD)
+        self.changed_tiles = None  # Плитки, изменившиеся в последнем кадре
+        self.last_raw_flags = None  # "Сырые" флаги последнего обработанного кадра
 
         # Добавляем элементы для отладки в рендерер
-        for area in [
-            cfg.CHAR_PANEL_AREA,
-            cfg.HP_BAR_AREA,
-            cfg.CHAT_AREA,
-            cfg.BUFFS_AREA,
-            cfg.RADAR_AREA,
-            cfg.TOP_AREA,
-            cfg.BOTTOM_AREA
-        ]:
+        if self.renderer:
+            self.add_debug_elements()
+
+    def add_debug_elements(self):
+        """
+        Добавляет в рендерер отладочные элементы: области интерфейса и контрольные точки.
+        """
+        for area in cfg.UI_EXCLUDED_AREAS:
             self.renderer.add_element(
                 f"{area}",
                 "rectangle",
@@ -87,7 +151,7 @@ class Detection:
             "circle",
             {
                 "center": (cfg.RADAR_DOT[0], cfg.RADAR_DOT[1]),
-                "radius": 8,
+                "radius": cfg.RADAR_RADIUS,
                 "color": (255, 255, 0),
                 "thickness": 1,
             },
@@ -116,60 +180,99 @@ class Detection:
 
     def update(self, screenshot):
         with self.lock:
+            self.frame = None
             self.screenshot = screenshot
+            self.frame_id += 1
+            self.frame_ready.notify_all()
+
+    def update_frame(self, frame):
+        """
+        Передает кадр из кольцевого буфера WindowCapture без копирования.
+        :param frame: FrameRef последнего кадра.
+        """
+        with self.lock:
+            self.frame = frame
+            self.screenshot = frame.image
+            self.frame_id = frame.frame_id
+            self.frame_ready.notify_all()
+
+    def wait_for_frame(self, timeout):
+        """
+        Ожидает кадр, который еще не обрабатывался.
+        :return: True, если есть новый кадр.
+        """
+        if self.wincap is not None:
+            frame = self.wincap.wait_for_frame(self.processed_frame_id, timeout)
+            if frame is None:
+                return False
+            self.update_frame(frame)
+            return True
+
+        with self.frame_ready:
+            return self.frame_ready.wait_for(lambda: self.frame_id > self.processed_frame_id, timeout)
+
+    def wait_for_result(self, last_result_id=0, timeout=None):
+        """
+        Ожидает публикации результатов по кадру новее last_result_id.
+        :return: Номер кадра с новыми результатами или None по таймауту.
+        """
+        with self.results_ready:
+            if self.results_ready.wait_for(lambda: self.result_id > last_result_id, timeout):
+                return self.result_id
+            return None
 
     def get_char_data(self):
+        """
+        Флаги и мобы последнего опубликованного снимка списком (прежний интерфейс).
+        """
+        snapshot = self.snapshot
         return [
-            self.have_target,
-            self.target_full_hp,
-            self.have_animus,
-            self.mobs,
-            self.skill_is_pressed,
-            self.enough_mana,
-            self.enough_hp,
+            snapshot.have_target,
+            snapshot.target_full_hp,
+            snapshot.have_animus,
+            snapshot.mobs,
+            snapshot.skill_is_pressed,
+            snapshot.enough_mana,
+            snapshot.enough_hp,
             self.battle_mode,
-            self.have_targets_left
+            snapshot.have_targets_left
 
         ]
 
-    def get_dot_data(self):
+    def get_dot_data(self, snapshot=None):
+        """
+        Цвета контрольных точек DOT_PROBE_NAMES из снимка ("" - точки в снимке нет).
+        :param snapshot: DetectionSnapshot (по умолчанию последний опубликованный).
+        """
+        snapshot = self.snapshot if snapshot is None else snapshot
         return [
-            self.MYHP_DOT_color,
-            self.MYMP_DOT_color,
-            self.ANIMUS_HP_DOT_color,
-            self.ANIMUS_EXIT_DOT_color,
-            self.SKILL_DOT_color,
-            self.TARGET_DOT1_color,
-            self.TARGET_DOT2_color,
-            self.TARGET_MAX_HP_color
+            snapshot.probe_color(name) if name in snapshot.probe_names else ""
+            for name in DOT_PROBE_NAMES
         ]
 
     def update_dot_color_inf(self, screenshot):
         try:
-            if len(screenshot.shape) == 3 and screenshot.shape[2] == 3:
-                self.MYHP_DOT_color = self.get_RGB_color(screenshot, cfg.MYHP_DOT)
-                self.MYMP_DOT_color = self.get_RGB_color(screenshot, cfg.MYMP_DOT)
-                self.ANIMUS_HP_DOT_color = self.get_RGB_color(screenshot, cfg.ANIMUS_HP_DOT)
-                self.ANIMUS_EXIT_DOT_color = self.get_RGB_color(screenshot, cfg.ANIMUS_EXIT_DOT)
-                self.SKILL_DOT_color = self.get_RGB_color(screenshot, cfg.SKILL_DOT)
-                self.TARGET_DOT1_color = self.get_RGB_color(screenshot, cfg.TARGET_DOT1)
-                self.TARGET_DOT2_color = self.get_RGB_color(screenshot, cfg.TARGET_DOT2)
-                self.TARGET_MAX_HP_color = self.get_RGB_color(screenshot, cfg.TARGET_MAX_HP_DOT)
-            elif len(screenshot.shape) == 3 and screenshot.shape[2] == 4:
-                rgb_image = screenshot[..., :3]
-                self.MYHP_DOT_color = self.get_RGB_color(rgb_image, cfg.MYHP_DOT)
-                self.MYMP_DOT_color = self.get_RGB_color(rgb_image, cfg.MYMP_DOT)
-                self.ANIMUS_HP_DOT_color = self.get_RGB_color(rgb_image, cfg.ANIMUS_HP_DOT)
-                self.ANIMUS_EXIT_DOT_color = self.get_RGB_color(rgb_image, cfg.ANIMUS_EXIT_DOT)
-                self.SKILL_DOT_color = self.get_RGB_color(rgb_image, cfg.SKILL_DOT)
-                self.TARGET_DOT1_color = self.get_RGB_color(rgb_image, cfg.TARGET_DOT1)
-                self.TARGET_DOT2_color = self.get_RGB_color(rgb_image, cfg.TARGET_DOT2)
-                self.TARGET_MAX_HP_color = self.get_RGB_color(rgb_image, cfg.TARGET_MAX_HP_DOT)
+            if len(screenshot.shape) == 3 and screenshot.shape[2] in (3, 4):
+                # Все контрольные точки одной индексацией
+                self.set_probe_colors(self.probes.sample(screenshot))
             else:
                 print("Warning: Screenshot does not have 3 or 4 channels, skipping color extraction.")
         except Exception as e:
             print(f"Error in update_dot_color_inf: {e}")
 
+    def set_probe_colors(self, colors):
+        """
+        Сохраняет цвета контрольных точек и результаты их классификации.
+        """
+        self.probe_colors = colors
+        self.probe_matches = self.probes.classify(colors)
+
+    def get_skip_rate(self):
+        """
+        Доля кадров, для которых тяжелый анализ пропущен из-за отсутствия изменений.
+        """
+        return self.change_detector.skip_rate
+
     def get_RGB_color(self, screenshot, dot_coordinates):
         x, y = dot_coordinates
         bgr_color = screenshot[y, x].tolist()
@@ -178,7 +281,13 @@ class Detection:
     def start(self):
         self.stopped = False
         print(f"Detection(id={self}) starting ")
-        Thread(target=self.run, daemon=True).start()
+        if cfg.DETECTION_MODE == "process":
+            # Извлечение признаков в отдельных процессах; трекер и сглаживание остаются в этом процессе
+            self.pool = DetectionWorkerPool(Detection, cfg.DETECTION_WORKERS)
+            self.pool.start()
+            Thread(target=self.run_pool, daemon=True).start()
+        else:
+            Thread(target=self.run, daemon=True).start()
 
     def stop(self):
         print(f"Detection(id={self}) stopping ")
@@ -188,129 +297,341 @@ class Detection:
         while not self.stopped:
             start_time = time.time()
 
-            if self.screenshot is None:
-                time.sleep(self.frame_delay)
+            # Просыпаемся только при появлении нового кадра
+            last_frame_id = self.processed_frame_id
+            if not self.wait_for_frame(cfg.FRAME_WAIT_TIMEOUT_SECONDS):
                 continue
 
-            with self.lock:
-                # Создаем локальные копии, если нужно
-                pass
-
+            process_start = self.governor.begin() if self.governor else None
             self.process_frame()
 
-            elapsed_time = time.time() - start_time
-            sleep_time = max(0, self.frame_delay - elapsed_time)
-            time.sleep(sleep_time)
-
+            if self.governor:
+                skipped_frames = max(0, self.processed_frame_id - last_frame_id - 1) if last_frame_id else 0
+                self.governor.report_detection_since(process_start, skipped_frames)
 
+            if self.frame_delay > 0:
+                elapsed_time = time.time() - start_time
+                time.sleep(max(0, self.frame_delay - elapsed_time))
 
     def process_frame(self):
+        self.timer.begin()
+        try:
+            screenshot, frame, frame_id = self.take_frame()
+            self.timer.mark("frame")
+
+            # Кадр не изменился: повторно используем результаты анализа предыдущего кадра
+            if self.reuse_unchanged(screenshot, frame_id):
+                return
+
+            mask, blobs, raw_flags = self.extract(screenshot)
+
+            # Слот буфера успели перезаписать во время обработки: результаты кадра недостоверны
+            if frame is not None and not frame.is_valid():
+                self.change_detector.reset()
+                return
+
+            self.observe_camera(screenshot)
+            tracked_mobs = self.apply_extraction(blobs, raw_flags, frame_id)
+
+            if self.renderer:
+                self.visualize_debug_info(mask, tracked_mobs.views())
+                self.timer.mark("visualize")
+        finally:
+            self.timer.end()
+
+    def take_frame(self):
+        """
+        Забирает текущий кадр на обработку.
+        :return: (изображение, FrameRef или None, номер кадра).
+        """
         with self.lock:
-            screenshot = self.screenshot.copy()
-
+            # Кадр доступен только для чтения, копия не нужна
+            screenshot = self.screenshot
+            frame = self.frame
+            frame_id = self.frame_id
+        self.processed_frame_id = frame_id
+        self.frame_timestamp = frame.timestamp if frame is not None else time.time()
+        return screenshot, frame, frame_id
+
+    def reuse_unchanged(self, screenshot, frame_id, publish=True):
+        """
+        Если кадр не изменился, публикует результаты предыдущего кадра (со сглаживанием).
+        :param publish: False - только пропустить кадр (его покроют результаты кадра, который еще в обработке).
+        :return: True, если кадр не требует анализа.
+        """
+        self.changed_tiles = self.change_detector.update(screenshot)
+        self.timer.mark("change")
+        if not self.changed_tiles.any() and self.last_raw_flags is not None:
+            if publish:
+                self.debounce_and_publish(self.last_raw_flags, self.mob_tracker.store, frame_id)
+            return True
+        return False
+
+    def extract(self, screenshot):
+        """
+        Извлечение признаков кадра без состояния между кадрами (выполняется и в процессах пула):
+        цвета контрольных точек, прямоугольники мобов и "сырые" флаги.
+        :return: (маска, массив областей BLOB_DTYPE, словарь флагов).
+        """
         self.update_dot_color_inf(screenshot)
-        hsv_image = cv.cvtColor(screenshot, cv.COLOR_BGR2HSV)
-        # Фильтрация по желтому цвету (мобы)
-        lower_yellow = np.array(cfg.COLOR_YELLOW_LOWER)
-        upper_yellow = np.array(cfg.COLOR_YELLOW_UPPER)
-        mask = cv.inRange(hsv_image, lower_yellow, upper_yellow)
-
-        # Исключаем области интерфейса
-        for area in [
-            cfg.CHAR_PANEL_AREA,
-            cfg.HP_BAR_AREA,
-            cfg.CHAT_AREA,
-            cfg.BUFFS_AREA,
-            cfg.RADAR_AREA,
-            cfg.TOP_AREA,
-            cfg.BOTTOM_AREA
-        ]:
-            mask = self.filter_mask(mask, area)
-
-        min_area = cfg.MIN_AREA
-        contours, _ = cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
-        filtered_contours = [cv.boundingRect(cnt) for cnt in contours if cv.contourArea(cnt) > min_area]
-        # print(f"Tracking input: {filtered_contours}")
-
-        # Координаты персонажа
-
-        # Обновление трекера мобов
+        self.update_color_classifier()
+        self.timer.mark("probes")
+        mask, blobs = self.segment_mobs(screenshot)
+        raw_flags = self.classify_flags(screenshot)
+        return mask, blobs, raw_flags
+
+    def observe_camera(self, screenshot):
+        """
+        Передает кадр оценке поворота камеры трекера (режим MOB_TRACKING_FRAME = "flow").
+        """
+        if self.mob_tracker.camera is not None:
+            self.mob_tracker.camera.observe(screenshot, self.frame_timestamp)
+            self.timer.mark("camera")
+
+    def apply_extraction(self, blobs, raw_flags, frame_id, timestamp=None):
+        """
+        Обновляет трекер мобов и публикует сглаженные результаты кадра.
+        :param timestamp: Время захвата кадра (по умолчанию - текущего кадра).
+        """
         character_position = (cfg.SCREEN_CENTER_X, cfg.SCREEN_CENTER_Y)
-        tracked_mobs = self.mob_tracker.update(filtered_contours, character_position)
-
-        # Сохраняем координаты мобов
-        mobs_local = tracked_mobs.values()
-
-
-        # _battle_mode = is_in_dynamic_range(self.MYHP_DOT_color, cfg.MYHP_DOT_COLOR)
-        _have_target =  (is_in_dynamic_range(self.TARGET_DOT1_color, cfg.TARGET_DOT1_COLOR, delta=55) and \
-             is_in_dynamic_range(self.TARGET_DOT2_color, cfg.TARGET_DOT2_COLOR, delta = 55))
-        _target_full_hp = is_in_dynamic_range(self.TARGET_MAX_HP_color, cfg.TARGET_MAX_HP_DOT_COLOR)
-        _have_animus = is_in_dynamic_range(self.ANIMUS_HP_DOT_color, cfg.ANIMUS_HP_DOT_COLOR) and \
-            is_in_dynamic_range(self.ANIMUS_EXIT_DOT_color, cfg.ANIMUS_EXIT_DOT_COLOR)
-        _skill_is_pressed = not is_in_dynamic_range(self.SKILL_DOT_color, cfg.SKILL_DOT_COLOR, 10)
-        _enough_mana = is_in_dynamic_range(self.MYMP_DOT_color, cfg.MYMP_DOT_COLOR)
-        _enough_hp = is_in_dynamic_range(self.MYHP_DOT_color, cfg.MYHP_DOT_COLOR)
-        _have_targets_left = self.is_yellow_present_on_radar()
-
-        # Добавляем значения в историю
-        self.hist_have_target.append(_have_target)
-        self.hist_target_full_hp.append(_target_full_hp)
-        self.hist_have_animus.append(_have_animus)
-        self.hist_skill_is_pressed.append(_skill_is_pressed)
-        self.hist_enough_mana.append(_enough_mana)
-        self.hist_enough_hp.append(_enough_hp)
-        self.hist_have_targets_left.append(_have_targets_left)
-
-        # Проверяем стабилизацию значений (пример: все три последних значения должны совпадать)
-        if len(self.hist_have_target) == self.history_len and len(set(self.hist_have_target)) == 1:
-            final_have_target = self.hist_have_target[0]
-        else:
-            final_have_target = self.have_target  # Сохраняем старое значение
-
-        if len(self.hist_target_full_hp) == self.history_len and len(set(self.hist_target_full_hp)) == 1:
-            final_target_full_hp = self.hist_target_full_hp[0]
-        else:
-            final_target_full_hp = self.target_full_hp
-
-        if len(self.hist_have_animus) == self.history_len and len(set(self.hist_have_animus)) == 1:
-            final_have_animus = self.hist_have_animus[0]
-        else:
-            final_have_animus = self.have_animus
-
-        if len(self.hist_skill_is_pressed) == self.history_len and len(set(self.hist_skill_is_pressed)) == 1:
-            final_skill_is_pressed = self.hist_skill_is_pressed[0]
-        else:
-            final_skill_is_pressed = self.skill_is_pressed
-
-        if len(self.hist_enough_mana) == self.history_len and len(set(self.hist_enough_mana)) == 1:
-            final_enough_mana = self.hist_enough_mana[0]
+        timestamp = self.frame_timestamp if timestamp is None else timestamp
+        tracked_mobs = self.mob_tracker.update(blobs, character_position, timestamp)
+        self.timer.mark("tracking")
+        self.last_raw_flags = raw_flags
+
+        self.debounce_and_publish(raw_flags, tracked_mobs, frame_id, timestamp)
+        self.timer.mark("debounce")
+        return tracked_mobs
+
+    def run_pool(self):
+        """
+        Цикл детекции в режиме пула процессов: кадры раздаются свободным процессам,
+        результаты применяются в порядке номеров кадров, устаревшие отбрасываются.
+        """
+        submit_times = {}
+        try:
+            while not self.stopped:
+                timeout = 0 if self.pool.has_idle_worker() else cfg.FRAME_WAIT_TIMEOUT_SECONDS
+                for frame_id, probe_colors, rects, raw_flags, duration in self.pool.poll(timeout):
+                    submit_time, timestamp = submit_times.pop(frame_id, (None, None))
+                    # Кадры процессов, завершившихся во время обработки, результатов уже не дадут
+                    for stale_id in [stale_id for stale_id in submit_times if stale_id < frame_id]:
+                        del submit_times[stale_id]
+                    # Более новый кадр уже опубликован
+                    if frame_id <= self.result_id:
+                        continue
+                    self.timer.begin()
+                    try:
+                        self.timer.record("worker", int(duration * 1e9))
+                        self.set_probe_colors(probe_colors)
+                        tracked_mobs = self.apply_extraction(rects, raw_flags, frame_id, timestamp)
+                        if self.governor and submit_time is not None:
+                            self.governor.report_detection_since(submit_time, 0)
+                        if self.renderer:
+                            self.visualize_debug_info(None, tracked_mobs.views())
+                            self.timer.mark("visualize")
+                    finally:
+                        self.timer.end("apply_total")
+
+                if not self.pool.has_idle_worker():
+                    continue
+
+                # Пока кадры в обработке, ожидание нового кадра не должно задерживать сбор результатов
+                wait = cfg.DETECTION_POOL_POLL_SECONDS if self.pool.busy() else cfg.FRAME_WAIT_TIMEOUT_SECONDS
+                if not self.wait_for_frame(wait):
+                    continue
+
+                self.timer.begin()
+                try:
+                    self.submit_frame(submit_times)
+                finally:
+                    self.timer.end("submit_total")
+        finally:
+            self.pool.close()
+            self.pool = None
+
+    def submit_frame(self, submit_times):
+        """
+        Передает новый кадр свободному процессу пула (если кадр изменился и процесс нашелся).
+        :param submit_times: Номер кадра -> (время передачи для RateGovernor, время захвата кадра).
+        """
+        screenshot, frame, frame_id = self.take_frame()
+        self.timer.mark("frame")
+        if self.reuse_unchanged(screenshot, frame_id, publish=not self.pool.busy()):
+            return
+
+        worker, slot = self.pool.acquire(screenshot.shape, screenshot.dtype)
+        if worker is None:
+            return
+        np.copyto(slot, screenshot)
+        self.timer.mark("frame_copy")
+        if frame is not None and not frame.is_valid():
+            self.change_detector.reset()
+            self.pool.release(worker)
+            return
+        self.observe_camera(screenshot)
+        submit_time = self.governor.begin() if self.governor else None
+        submit_times[frame_id] = (submit_time, self.frame_timestamp)
+        if not self.pool.dispatch(worker, frame_id):
+            submit_times.pop(frame_id)
+
+    def update_color_classifier(self):
+        """
+        Выбирает способ цветовой классификации; таблица пересобирается при изменении диапазонов в config.py.
+        """
+        if color_lut_enabled():
+            self.color_classifier = get_color_classifier(cfg.POSTERIZE_LEVELS, color_classes_key())
         else:
-            final_enough_mana = self.enough_mana
+            self.color_classifier = None
+
+    def color_features(self, image):
+        """
+        Цветовые признаки изображения (BGR или BGRA): номера цветов палитры или HSV.
+        """
+        if self.color_classifier is not None:
+            return self.color_classifier.index(image)
+        return cv.cvtColor(image[..., :3], cv.COLOR_BGR2HSV)
+
+    def color_mask(self, features, name):
+        """
+        Маска цветового класса ("mob" или "radar") по цветовым признакам.
+        """
+        if self.color_classifier is not None:
+            return self.color_classifier.lookup(features, name)
+        lower, upper = self.color_bounds[name]
+        return cv.inRange(features, lower, upper)
+
+    def segment_mobs(self, screenshot):
+        """
+        Ищет таблички мобов (желтые области) вне областей интерфейса.
+        :return: Маска (в пределах прямоугольника игрового поля) и массив областей BLOB_DTYPE
+                 (x, y, w, h, area, cx, cy) в координатах кадра.
+        """
+        # Маска игрового поля (без областей интерфейса) кэшируется по размеру кадра и конфигурации областей
+        playfield_mask, bbox = get_playfield_mask(screenshot.shape[:2], ui_areas_key())
+        if playfield_mask is None:
+            self.color_image = None
+            return None, empty_blobs()
+        x0, y0, x1, y1 = bbox
+        if self.segmentation_mode == "coarse":
+            return self.segment_mobs_coarse(screenshot, playfield_mask, bbox)
+
+        # Сегментация только внутри ограничивающего прямоугольника игрового поля
+        color_image = self.color_features(screenshot[y0:y1, x0:x1])
+        self.color_image = color_image
+        self.color_origin = (x0, y0)
+        self.timer.mark("color")
 
-        if len(self.hist_enough_hp) == self.history_len and len(set(self.hist_enough_hp)) == 1:
-            final_enough_hp = self.hist_enough_hp[0]
-        else:
-            final_enough_hp = self.enough_hp
+        # Фильтрация по желтому цвету (мобы)
+        mask = self.color_mask(color_image, "mob")
+        self.timer.mark("mask")
+
+        # Исключаем области интерфейса одной операцией
+        cv.bitwise_and(mask, playfield_mask, dst=mask)
+        self.timer.mark("exclusion")
+
+        # Области и их статистика одним вызовом, фильтрация векторная
+        blobs = extract_blobs(mask, (x0, y0), cfg.MIN_AREA, cfg.BLOB_ASPECT_RANGE)
+        self.timer.mark("blobs")
+        return mask, blobs
+
+    def segment_mobs_coarse(self, screenshot, playfield_mask, bbox):
+        """
+        Двухуровневая сегментация: кандидаты ищутся на кадре, уменьшенном в pyramid_factor раз,
+        затем только окна кандидатов (с запасом refine_margin) сегментируются в полном разрешении.
+        :return: Маска кандидатов уменьшенного кадра и массив областей BLOB_DTYPE в координатах кадра.
+        """
+        x0, y0, x1, y1 = bbox
+        factor = self.pyramid_factor
+        crop = screenshot[y0:y1, x0:x1]
+        self.color_image = None
+
+        # Прореживание вместо интерполяции: цвета постеризованного кадра не смешиваются
+        coarse_mask = self.color_mask(self.color_features(np.ascontiguousarray(crop[::factor, ::factor])), "mob")
+        cv.bitwise_and(coarse_mask, get_coarse_playfield_mask(screenshot.shape[:2], ui_areas_key(), factor),
+                       dst=coarse_mask)
+        self.timer.mark("coarse")
+        if not cv.countNonZero(coarse_mask):
+            return coarse_mask, empty_blobs()
+
+        # Расширяем кандидатов на запас уточнения и объединяем пересекающиеся окна
+        radius = -(-self.refine_margin // factor)
+        kernel = np.ones((2 * radius + 1, 2 * radius + 1), dtype=np.uint8)
+        candidates = cv.dilate(coarse_mask, kernel)
+        count, _, stats, _ = cv.connectedComponentsWithStats(candidates, connectivity=8)
+        windows = merge_rects(
+            (x * factor, y * factor, (x + w) * factor, (y + h) * factor)
+            for x, y, w, h in stats[1:count, :4].tolist()
+        )
 
-        if len(self.hist_have_targets_left) == self.history_len and len(set(self.hist_have_targets_left)) == 1:
-            final_have_targets_left = self.hist_have_targets_left[0]
-        else:
-            final_have_targets_left = self.have_targets_left
+        height, width = crop.shape[:2]
+        blobs = []
+        for wx0, wy0, wx1, wy1 in windows:
+            wx1, wy1 = min(width, wx1), min(height, wy1)
+            mask = self.color_mask(self.color_features(crop[wy0:wy1, wx0:wx1]), "mob")
+            cv.bitwise_and(mask, playfield_mask[wy0:wy1, wx0:wx1], dst=mask)
+            blobs.append(extract_blobs(mask, (x0 + wx0, y0 + wy0), cfg.MIN_AREA, cfg.BLOB_ASPECT_RANGE))
+        self.timer.mark("refine")
+        return coarse_mask, np.concatenate(blobs) if blobs else empty_blobs()
+
+    def classify_flags(self, screenshot):
+        """
+        Вычисляет "сырые" (без сглаживания) флаги состояния по цветам контрольных точек и радару.
+        """
+        # Результаты векторной классификации контрольных точек (update_dot_color_inf)
+        match = self.probe_matches
+        probe = self.probes.index
+        self.template_matches = self.templates.match_all(screenshot, cfg.BUFF_TEMPLATES)
+        self.timer.mark("templates")
+        have_targets_left = self.is_yellow_present_on_radar(
+            screenshot, color_image=self.color_image, color_origin=self.color_origin
+        )
+        self.timer.mark("radar")
+        return {
+            "have_target": bool(match[probe("target_dot1")] and match[probe("target_dot2")]),
+            "target_full_hp": bool(match[probe("target_max_hp")]),
+            "have_animus": bool(match[probe("animus_hp")] and match[probe("animus_exit")]),
+            "skill_is_pressed": not match[probe("skill")],
+            "enough_mana": bool(match[probe("mymp")]),
+            "enough_hp": bool(match[probe("myhp")]),
+            "have_targets_left": have_targets_left,
+            "have_buffs": any(self.template_matches.values()),
+        }
+
+    def debounce_and_publish(self, raw_flags, mob_store, frame_id, timestamp=None):
+        """
+        Сглаживает флаги по истории и публикует результаты кадра неизменяемым снимком self.snapshot
+        (одна замена ссылки; прежние атрибуты и get_char_data читают его же).
+        :param mob_store: Хранилище треков трекера мобов (MobStore).
+        """
+        # Все истории обновляются одной векторной операцией
+        self.signals.update([raw_flags[name] for name in self.signals.names])
+        final = self.signals.values()
+
+        # Координаты мобов копируются из хранилища трекера одной векторной операцией
+        snapshot = DetectionSnapshot(
+            frame_id,
+            self.frame_timestamp if timestamp is None else timestamp,
+            final,
+            mob_store.to_array(),
+            self.probes.names,
+            read_only(self.probe_colors),
+        )
 
         with self.lock:
-            self.have_target = final_have_target
-            self.target_full_hp = final_target_full_hp
-            self.have_animus = final_have_animus
-            self.mobs = mobs_local
-            self.skill_is_pressed = final_skill_is_pressed
-            self.enough_mana = final_enough_mana
-            self.enough_hp = final_enough_hp
-            self.have_targets_left = final_have_targets_left
-            # self.battle_mode = final_battle_mode
-
-        if self.renderer:
-            self.visualize_debug_info(mask, tracked_mobs.values())
+            self.snapshot = snapshot
+            self.result_id = frame_id
+            self.results_ready.notify_all()
+
+    @staticmethod
+    def contains_template(screenshot, template, threshold=0.8):
+        """
+        Проверяет наличие значка на изображении (поиск по всему изображению, без кэша пирамид).
+        Шаблон - значок на черном фоне: фон прозрачен, оценка - masked_match_score из lib/templates.py.
+        Для шаблонов интерфейса из config.py используйте self.templates (TM_CCOEFF_NORMED, только в их областях).
+        """
+        score, _ = masked_match_score(to_gray(screenshot), to_gray(template))
+        return score >= threshold
 
     def filter_mask(self, mask_to_filter, filter_range):
         mask_to_filter[filter_range[0][1]:filter_range[1][1],
@@ -344,27 +665,114 @@ class Detection:
                 mob=True
             )
 
-    def is_yellow_present_on_radar(self, center = cfg.RADAR_DOT, radius = 8, yellow_threshold=1):
-        smth = self.screenshot.copy()
-        # Create a mask for the circular region
-        height, width, _ = smth.shape
-        y, x = np.ogrid[:height, :width]
-        circle_mask = (x - center[0])**2 + (y - center[1])**2 <= radius**2
-
-        # Define yellow color range in HSV
-        hsv_screenshot = cv2.cvtColor(smth, cv2.COLOR_BGR2HSV)
-        yellow_lower = np.array([20, 100, 100])  # Lower bound for yellow in HSV
-        yellow_upper = np.array([30, 255, 255])  # Upper bound for yellow in HSV
+    def is_yellow_present_on_radar(self, screenshot=None, center = cfg.RADAR_DOT, radius = cfg.RADAR_RADIUS, yellow_threshold=1, color_image=None, color_origin=(0, 0)):
+        """
+        Проверяет наличие желтых точек (мобов) в круге радара.
+        Анализируется только ограничивающий квадрат круга; маска круга кэшируется.
+        :param color_image: Уже посчитанные цветовые признаки (color_features) кадра или его части
+                            (используются вместо повторного расчета, если покрывают круг радара).
+        :param color_origin: Смещение color_image относительно кадра (x, y).
+        """
+        smth = self.screenshot if screenshot is None else screenshot
+        height, width = smth.shape[:2]
+        x0, y0 = max(0, center[0] - radius), max(0, center[1] - radius)
+        x1, y1 = min(width, center[0] + radius + 1), min(height, center[1] + radius + 1)
+        if x1 <= x0 or y1 <= y0:
+            return False
+
+        # Маска круга для ограничивающего квадрата
+        circle_mask = get_circle_mask(tuple(center), radius, (height, width))
+
+        hx, hy = color_origin
+        if color_image is not None and x0 >= hx and y0 >= hy \
+                and x1 <= hx + color_image.shape[1] and y1 <= hy + color_image.shape[0]:
+            color_roi = color_image[y0 - hy:y1 - hy, x0 - hx:x1 - hx]
+        else:
+            color_roi = self.color_features(smth[y0:y1, x0:x1])
 
         # Create a mask for yellow color
-        yellow_mask = cv2.inRange(hsv_screenshot, yellow_lower, yellow_upper)
-
-        # Apply the circular mask to the yellow mask
-        yellow_in_circle = yellow_mask & circle_mask.astype(np.uint8)
+        yellow_mask = self.color_mask(color_roi, "radar")
 
         # Count yellow pixels within the circle
-        yellow_pixel_count = np.sum(yellow_in_circle > 0)
+        yellow_pixel_count = np.count_nonzero(yellow_mask[circle_mask])
 
         # Return True if yellow pixel count exceeds the threshold
         return yellow_pixel_count >= yellow_threshold
 
+
+def merge_rects(rects):
+    """
+    Объединяет пересекающиеся прямоугольники (x0, y0, x1, y1), пока пересечения не исчезнут.
+    """
+    rects = [list(rect) for rect in rects]
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for rect in rects:
+            for other in result:
+                if rect[0] < other[2] and other[0] < rect[2] and rect[1] < other[3] and other[1] < rect[3]:
+                    other[0], other[1] = min(other[0], rect[0]), min(other[1], rect[1])
+                    other[2], other[3] = max(other[2], rect[2]), max(other[3], rect[3])
+                    merged = True
+                    break
+            else:
+                result.append(rect)
+        rects = result
+    return [tuple(rect) for rect in rects]
+
+
+def ui_areas_key():
+    """
+    Ключ кэша маски игрового поля: текущие значения областей интерфейса из config.py.
+    """
+    return tuple((area[0][0], area[0][1], area[1][0], area[1][1]) for area in cfg.UI_EXCLUDED_AREAS)
+
+
+@lru_cache(maxsize=4)
+def get_playfield_mask(frame_shape, areas):
+    """
+    Маска игрового поля: 255 везде, кроме областей интерфейса, обрезанная по ограничивающему прямоугольнику.
+    Кэшируется по размеру кадра и значениям областей, поэтому пересобирается автоматически при их изменении.
+    :return: (маска, (x0, y0, x1, y1)) или (None, None), если игровое поле пусто.
+    """
+    height, width = frame_shape
+    mask = np.full((height, width), 255, dtype=np.uint8)
+    for x0, y0, x1, y1 in areas:
+        mask[max(0, y0):max(0, y1), max(0, x0):max(0, x1)] = 0
+
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if not len(rows):
+        return None, None
+    y0, y1 = rows[0], rows[-1] + 1
+    x0, x1 = cols[0], cols[-1] + 1
+    mask = np.ascontiguousarray(mask[y0:y1, x0:x1])
+    mask.flags.writeable = False
+    return mask, (int(x0), int(y0), int(x1), int(y1))
+
+
+@lru_cache(maxsize=4)
+def get_coarse_playfield_mask(frame_shape, areas, factor):
+    """
+    Маска игрового поля из get_playfield_mask, прореженная в factor раз (для двухуровневой сегментации).
+    """
+    playfield_mask, _ = get_playfield_mask(frame_shape, areas)
+    mask = np.ascontiguousarray(playfield_mask[::factor, ::factor])
+    mask.flags.writeable = False
+    return mask
+
+
+@lru_cache(maxsize=16)
+def get_circle_mask(center, radius, frame_shape):
+    """
+    Булева маска круга в пределах его ограничивающего квадрата (обрезанного по кадру).
+    Кэшируется по (центр, радиус, размер кадра).
+    """
+    height, width = frame_shape
+    x0, y0 = max(0, center[0] - radius), max(0, center[1] - radius)
+    x1, y1 = min(width, center[0] + radius + 1), min(height, center[1] + radius + 1)
+    y, x = np.ogrid[y0:y1, x0:x1]
+    mask = (x - center[0]) ** 2 + (y - center[1]) ** 2 <= radius ** 2
+    mask.flags.writeable = False
+    return mask
@@ -0,0 +1,212 @@
+import multiprocessing as mp
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+
+def detection_worker(conn, extractor_factory):
+    """
+    Процесс-обработчик: читает кадры из общей памяти и возвращает компактные результаты извлечения.
+    Сообщение задания: (имя общей памяти, форма, dtype, номер слота, номер кадра); None - завершение.
+    Ответ: (номер кадра, цвета контрольных точек, области мобов, "сырые" флаги, время обработки).
+    """
+    extractor = extractor_factory()
+    shm = None
+    frames = None
+    try:
+        while True:
+            job = conn.recv()
+            if job is None:
+                break
+            name, shape, dtype, slot, frame_id = job
+            if shm is None or shm.name != name:
+                if shm is not None:
+                    shm.close()
+                shm = shared_memory.SharedMemory(name=name)
+                frames = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+            start = time.time()
+            screenshot = frames[slot]
+            _, blobs, raw_flags = extractor.extract(screenshot)
+            conn.send((frame_id, extractor.probe_colors.copy(), blobs, raw_flags, time.time() - start))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        frames = None
+        if shm is not None:
+            shm.close()
+
+
+class DetectionWorkerPool:
+    """
+    Пул процессов детекции.
+    Кадры передаются через multiprocessing.shared_memory: у каждого процесса свой слот, в который
+    главный процесс копирует кадр перед отправкой задания. Результаты возвращаются по каналу (Pipe).
+    Каждому процессу одновременно выдается не больше одного кадра.
+    Результаты выдаются в порядке отправки кадров; завершившийся процесс перезапускается,
+    а его кадр пропускается.
+    """
+
+    def __init__(self, extractor_factory, workers=2):
+        """
+        :param extractor_factory: Вызываемый объект верхнего уровня (передается в процессы),
+                                  создающий экстрактор с методом extract(screenshot) и атрибутом probe_colors.
+        :param workers: Количество процессов.
+        """
+        self.extractor_factory = extractor_factory
+        self.workers = workers
+        self.context = mp.get_context("spawn")
+        self.processes = []
+        self.connections = []
+        self.idle = []  # Индексы свободных процессов
+        self.pending = {}  # Индекс процесса -> номер кадра
+        self.order = deque()  # Номера кадров в обработке в порядке отправки
+        self.completed = {}  # Номер кадра -> результат, ожидающий более ранние кадры
+        self.shm = None
+        self.frames = None
+
+    def start(self):
+        self.processes = [None] * self.workers
+        self.connections = [None] * self.workers
+        for worker in range(self.workers):
+            self.spawn(worker)
+        self.idle = list(range(self.workers))
+
+    def spawn(self, worker):
+        """
+        Запускает процесс с индексом worker.
+        """
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=detection_worker, args=(child_conn, self.extractor_factory), daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self.processes[worker] = process
+        self.connections[worker] = parent_conn
+
+    def respawn(self, worker):
+        """
+        Заменяет завершившийся процесс новым; его кадр (если был) пропускается.
+        """
+        print(f"Detection worker {worker} exited, restarting")
+        frame_id = self.pending.pop(worker, None)
+        if frame_id is not None:
+            self.order.remove(frame_id)
+        self.connections[worker].close()
+        if self.processes[worker].is_alive():
+            self.processes[worker].terminate()
+        self.processes[worker].join(timeout=1)
+        self.spawn(worker)
+        self.idle.append(worker)
+
+    def busy(self):
+        """
+        Есть ли кадры в обработке.
+        """
+        return bool(self.pending)
+
+    def has_idle_worker(self):
+        return bool(self.idle)
+
+    def ensure_frames(self, shape, dtype):
+        """
+        Выделяет общую память под слоты кадров формы shape. Перевыделение возможно только без заданий в работе.
+        :return: False, если память нужно перевыделить, но процессы заняты.
+        """
+        shape = (self.workers,) + tuple(shape)
+        if self.frames is not None and self.frames.shape == shape and self.frames.dtype == dtype:
+            return True
+        if self.pending:
+            return False
+        self.release_frames()
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.frames = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+        return True
+
+    def acquire(self, shape, dtype):
+        """
+        Выделяет слот свободного процесса под кадр.
+        :return: (индекс процесса, массив слота) или (None, None), если свободных процессов нет.
+        """
+        if not self.idle or not self.ensure_frames(shape, dtype):
+            return None, None
+        worker = self.idle.pop()
+        return worker, self.frames[worker]
+
+    def release(self, worker):
+        """
+        Возвращает слот без отправки задания (например, если кадр оказался недостоверным).
+        """
+        self.idle.append(worker)
+
+    def dispatch(self, worker, frame_id):
+        """
+        Отправляет процессу кадр, скопированный в его слот.
+        :return: False, если процесс завершился (он перезапускается, кадр не обрабатывается).
+        """
+        self.pending[worker] = frame_id
+        self.order.append(frame_id)
+        try:
+            self.connections[worker].send(
+                (self.shm.name, self.frames.shape, self.frames.dtype.str, worker, frame_id)
+            )
+        except (BrokenPipeError, OSError):
+            self.respawn(worker)
+            return False
+        return True
+
+    def poll(self, timeout=0):
+        """
+        Собирает готовые результаты, ожидая не дольше timeout секунд.
+        Результат выдается, только когда выданы результаты всех кадров, отправленных раньше,
+        поэтому между вызовами порядок тоже сохраняется.
+        :return: Список результатов в порядке отправки кадров.
+        """
+        connections = [self.connections[worker] for worker in self.pending]
+        for conn in wait(connections, timeout) if connections else ():
+            worker = self.connections.index(conn)
+            try:
+                result = conn.recv()
+            except EOFError:
+                self.respawn(worker)
+                continue
+            del self.pending[worker]
+            self.completed[result[0]] = result
+            self.idle.append(worker)
+
+        results = []
+        while self.order and self.order[0] in self.completed:
+            results.append(self.completed.pop(self.order.popleft()))
+        return results
+
+    def release_frames(self):
+        self.frames = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        for conn in self.connections:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        for conn in self.connections:
+            conn.close()
+        self.processes = []
+        self.connections = []
+        self.idle = []
+        self.pending = {}
+        self.order.clear()
+        self.completed = {}
+        self.release_frames()
@@ -0,0 +1,107 @@
+from threading import Condition, Lock
+
+import numpy as np
+
+
+class FrameRef:
+    """
+    Ссылка на кадр в кольцевом буфере: read-only представление слота и номер кадра.
+    """
+
+    __slots__ = ("image", "frame_id", "timestamp", "slot", "buffer")
+
+    def __init__(self, image, frame_id, timestamp, slot, buffer):
+        self.image = image
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.slot = slot
+        self.buffer = buffer
+
+    def is_valid(self):
+        """
+        Проверка поколения: True, пока производитель не начал перезаписывать слот.
+        """
+        return self.buffer.slot_ids[self.slot] == self.frame_id
+
+
+class FrameRingBuffer:
+    """
+    Предвыделенный кольцевой буфер кадров.
+    Производитель пишет кадр прямо в свободный слот, читатели получают read-only представления
+    без копирования и проверяют актуальность через номер кадра (FrameRef.is_valid).
+    """
+
+    def __init__(self, slots=4):
+        """
+        :param slots: Количество слотов. Слот перезаписывается через slots - 1 кадров.
+        """
+        if slots < 2:
+            raise Exception("FrameRingBuffer needs at least 2 slots")
+        self.lock = Lock()
+        self.published = Condition(self.lock)  # Уведомление о новом кадре
+        self.slots = slots
+        self.buffers = []
+        self.views = []
+        self.slot_ids = [-1] * slots
+        self.shape = None
+        self.dtype = None
+        self.write_index = -1  # Последний выданный на запись слот
+        self.next_frame_id = 1
+        self.latest = None
+
+    def allocate(self, shape, dtype=np.uint8):
+        """
+        (Пере)выделяет слоты под кадры заданной формы. Все выданные ранее ссылки становятся невалидными.
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.buffers = [np.zeros(self.shape, dtype=self.dtype) for _ in range(self.slots)]
+        self.views = []
+        for buffer in self.buffers:
+            view = buffer.view()
+            view.flags.writeable = False
+            self.views.append(view)
+        self.slot_ids = [-1] * self.slots
+
+    def acquire(self, shape, dtype=np.uint8):
+        """
+        Возвращает (индекс слота, записываемый массив) для следующего кадра.
+        Слот резервируется сразу (не при publish), поэтому одновременные производители
+        получают разные слоты. Слот помечается невалидным до вызова publish.
+        """
+        with self.lock:
+            if self.shape != tuple(shape) or self.dtype != np.dtype(dtype):
+                self.allocate(shape, dtype)
+            slot = (self.write_index + 1) % self.slots
+            self.write_index = slot
+            self.slot_ids[slot] = -1
+            return slot, self.buffers[slot]
+
+    def publish(self, slot, timestamp):
+        """
+        Публикует записанный слот как последний кадр.
+        :return: FrameRef на опубликованный кадр.
+        """
+        with self.lock:
+            frame_id = self.next_frame_id
+            self.next_frame_id += 1
+            self.slot_ids[slot] = frame_id
+            self.latest = FrameRef(self.views[slot], frame_id, timestamp, slot, self)
+            self.published.notify_all()
+            return self.latest
+
+    def wait_for_frame(self, last_frame_id=0, timeout=None):
+        """
+        Блокирует до публикации кадра с номером больше last_frame_id.
+        Промежуточные кадры пропускаются: возвращается только последний.
+        :param last_frame_id: Номер последнего уже обработанного кадра.
+        :param timeout: Максимальное время ожидания в секундах.
+        :return: FrameRef нового кадра или None по таймауту.
+        """
+        with self.published:
+            self.published.wait_for(
+                lambda: self.latest is not None and self.latest.frame_id > last_frame_id, timeout
+            )
+            if self.latest is not None and self.latest.frame_id > last_frame_id:
+                return self.latest
+            return None
@@ -0,0 +1,76 @@
+import cv2 as cv
+import numpy as np
+
+
+class FrameChangeDetector:
+    """
+    Дешевое обнаружение изменений кадра по плиткам.
+    Хранится копия предыдущего кадра (uint8); модуль разности считается cv.absdiff в заранее выделенный буфер,
+    для каждой плитки считается сумма модулей разности, и плитка считается измененной, если сумма больше threshold.
+    (Сравнение одних сумм плиток пропускало изменения, сохраняющие сумму, например сдвиг объекта внутри плитки.)
+    """
+
+    def __init__(self, tile_size=32, threshold=0):
+        """
+        :param tile_size: Размер стороны плитки в пикселях.
+        :param threshold: Допустимая сумма модулей разности пикселей плитки (0 - любое изменение).
+        """
+        self.tile_size = tile_size
+        self.threshold = threshold
+        self.shape = None
+        self.rows = None
+        self.cols = None
+        self.previous = None  # Копия предыдущего кадра (uint8)
+        self.has_previous = False
+        self.diff = None  # Буфер модуля разности кадров
+        self.frames = 0
+        self.unchanged_frames = 0
+
+    def tile_sums(self, values):
+        """
+        Суммы значений по плиткам, форма (tiles_y, tiles_x).
+        """
+        sums = np.add.reduceat(values, self.rows, axis=0, dtype=np.int64)
+        sums = np.add.reduceat(sums, self.cols, axis=1)
+        if sums.ndim == 3:
+            sums = sums.sum(axis=2)
+        return sums
+
+    def reset(self):
+        """
+        Забывает предыдущий кадр: следующий кадр считается измененным целиком.
+        """
+        self.has_previous = False
+
+    def update(self, frame):
+        """
+        Сравнивает кадр с предыдущим.
+        :return: Булев массив измененных плиток (tiles_y, tiles_x). Первый кадр - все плитки изменены.
+        """
+        if self.shape != frame.shape:
+            self.shape = frame.shape
+            self.rows = np.arange(0, frame.shape[0], self.tile_size)
+            self.cols = np.arange(0, frame.shape[1], self.tile_size)
+            self.previous = np.empty(frame.shape, dtype=np.uint8)
+            self.diff = np.empty(frame.shape, dtype=np.uint8)
+            self.has_previous = False
+        if not self.has_previous:
+            changed = np.ones((len(self.rows), len(self.cols)), dtype=bool)
+        else:
+            cv.absdiff(frame, self.previous, self.diff)
+            changed = self.tile_sums(self.diff) > self.threshold
+        # Кадр может быть представлением слота буфера, который перезапишут: храним копию
+        np.copyto(self.previous, frame)
+        self.has_previous = True
+
+        self.frames += 1
+        if not changed.any():
+            self.unchanged_frames += 1
+        return changed
+
+    @property
+    def skip_rate(self):
+        """
+        Доля кадров без изменений.
+        """
+        return self.unchanged_frames / self.frames if self.frames else 0.0
@@ -0,0 +1,307 @@
+import os
+import time
+
+import cv2 as cv
+import numpy as np
+
+import config as cfg
+from lib.recorder import INDEX_FILE, SessionReader
+
+try:
+    import win32gui, win32ui, win32con
+except ImportError:  # Не Windows: доступны только источники воспроизведения
+    win32gui = win32ui = win32con = None
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov")
+
+
+class FrameSource:
+    """
+    Базовый источник кадров для WindowCapture.
+    Источник отдает "сырые" кадры; масштабирование и постеризацию выполняет WindowCapture.
+    """
+
+    # Кадры уже прошли предобработку (например, записаны после постеризации)
+    preprocessed = False
+    # Источник сам выдерживает темп выдачи кадров, WindowCapture не должен спать
+    paced = False
+
+    def __init__(self):
+        self.w = 0
+        self.h = 0
+        self.offset_x = 0
+        self.offset_y = 0
+        self.exhausted = False
+
+    def grab(self):
+        """
+        Возвращает очередной кадр (BGR или BGRA) или None, если кадр получить не удалось.
+        """
+        raise NotImplementedError
+
+    def grab_regions(self, rects):
+        """
+        Возвращает только заданные прямоугольники кадра.
+        Базовая реализация вырезает их из полного кадра.
+        :param rects: Список прямоугольников [(x0, y0, x1, y1)] в координатах источника.
+        :return: Список изображений или None.
+        """
+        frame = self.grab()
+        if frame is None:
+            return None
+        return [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in rects]
+
+    def close(self):
+        """
+        Освобождает ресурсы источника.
+        """
+        pass
+
+
+class GdiFrameSource(FrameSource):
+    """
+    Захват окна через Win32 GDI (BitBlt).
+    """
+
+    def __init__(self, window_name=None, scale=1, border_pixels=0, titlebar_pixels=0):
+        """
+        :param window_name: Название окна; если None, захватывается весь экран.
+        :param scale: Масштаб окна (WINDOW_SCALE).
+        :param border_pixels: Количество пикселей рамки окна.
+        :param titlebar_pixels: Высота заголовка окна.
+        """
+        super().__init__()
+        if win32gui is None:
+            raise Exception("GDI capture requires pywin32 (Windows only)")
+
+        # Если имя окна не указано, захватываем весь экран
+        if window_name is None:
+            self.hwnd = win32gui.GetDesktopWindow()
+        else:
+            self.hwnd = win32gui.FindWindow(None, window_name)
+            if not self.hwnd:
+                raise Exception(f"Window not found: {window_name}")
+
+        # Получение размеров окна
+        window_rect = win32gui.GetWindowRect(self.hwnd)
+        self.w = int((window_rect[2] - window_rect[0]) * scale)
+        self.h = int((window_rect[3] - window_rect[1]) * scale)
+
+        # Учет границ окна
+        self.w -= border_pixels * 2
+        self.h -= titlebar_pixels + border_pixels
+        self.cropped_x = border_pixels
+        self.cropped_y = titlebar_pixels
+
+        # Смещение для трансформации координат
+        self.offset_x = window_rect[0] + self.cropped_x
+        self.offset_y = window_rect[1] + self.cropped_y
+
+    def grab(self):
+        # Capture the screen using Win32 API
+        wDC = win32gui.GetWindowDC(self.hwnd)
+        dcObj = win32ui.CreateDCFromHandle(wDC)
+        cDC = dcObj.CreateCompatibleDC()
+        dataBitMap = win32ui.CreateBitmap()
+        dataBitMap.CreateCompatibleBitmap(dcObj, self.w, self.h)
+        cDC.SelectObject(dataBitMap)
+        cDC.BitBlt((0, 0), (self.w, self.h), dcObj, (self.cropped_x, self.cropped_y), win32con.SRCCOPY)
+
+        # Convert to OpenCV format
+        signedIntsArray = dataBitMap.GetBitmapBits(True)
+        img = np.frombuffer(signedIntsArray, dtype='uint8')
+        img = img.reshape((self.h, self.w, 4))
+
+        # Release resources
+        dcObj.DeleteDC()
+        cDC.DeleteDC()
+        win32gui.ReleaseDC(self.hwnd, wDC)
+        win32gui.DeleteObject(dataBitMap.GetHandle())
+
+        return img
+
+    def grab_regions(self, rects):
+        """
+        Передает через BitBlt только заданные прямоугольники окна.
+        :param rects: Список прямоугольников [(x0, y0, x1, y1)] в координатах окна.
+        :return: Список изображений BGRA.
+        """
+        wDC = win32gui.GetWindowDC(self.hwnd)
+        dcObj = win32ui.CreateDCFromHandle(wDC)
+        cDC = dcObj.CreateCompatibleDC()
+        regions = []
+        try:
+            for x0, y0, x1, y1 in rects:
+                w, h = x1 - x0, y1 - y0
+                dataBitMap = win32ui.CreateBitmap()
+                dataBitMap.CreateCompatibleBitmap(dcObj, w, h)
+                cDC.SelectObject(dataBitMap)
+                cDC.BitBlt((0, 0), (w, h), dcObj, (self.cropped_x + x0, self.cropped_y + y0), win32con.SRCCOPY)
+                img = np.frombuffer(dataBitMap.GetBitmapBits(True), dtype='uint8')
+                regions.append(img.reshape((h, w, 4)))
+                win32gui.DeleteObject(dataBitMap.GetHandle())
+        finally:
+            dcObj.DeleteDC()
+            cDC.DeleteDC()
+            win32gui.ReleaseDC(self.hwnd, wDC)
+        return regions
+
+    @staticmethod
+    def list_window_names():
+        """
+        Выводит список имен открытых окон. Полезно для отладки.
+        """
+
+        def winEnumHandler(hwnd, ctx):
+            if win32gui.IsWindowVisible(hwnd):
+                print(hex(hwnd), win32gui.GetWindowText(hwnd))
+
+        win32gui.EnumWindows(winEnumHandler, None)
+
+
+class ReplayFrameSource(FrameSource):
+    """
+    Воспроизведение записанных кадров: запись SessionRecorder, каталог с изображениями,
+    видеофайл или стек .npy.
+    Режимы темпа:
+    - "realtime": с исходной частотой записи (fps),
+    - "fixed": с заданной частотой fps,
+    - "max": так быстро, как успевает потребитель.
+    """
+
+    paced = True
+
+    def __init__(self, path, mode="realtime", fps=None, loop=False, preprocessed=False):
+        """
+        :param path: Каталог записи SessionRecorder, каталог с кадрами, видеофайл или файл .npy формы (N, H, W, C).
+        :param mode: Режим темпа: "realtime", "fixed" или "max".
+        :param fps: Частота кадров для "fixed" (и для "realtime", если источник ее не знает).
+        :param loop: Начинать сначала после последнего кадра.
+        :param preprocessed: Кадры уже масштабированы и постеризованы.
+        """
+        super().__init__()
+        if mode not in ("realtime", "fixed", "max"):
+            raise Exception(f"Unknown replay mode: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.loop = loop
+        self.preprocessed = preprocessed
+        self.index = 0
+        self.capture = None
+        self.frames = None
+        self.files = None
+        self.reader = None
+        native_fps = None
+
+        if os.path.isdir(path) and os.path.exists(os.path.join(path, INDEX_FILE)):
+            # Запись сессии: кадры уже предобработаны, темп берем из времени захвата
+            self.reader = SessionReader(path)
+            if not len(self.reader):
+                raise Exception(f"Empty recording: {path}")
+            self.preprocessed = True
+            timestamps = self.reader.index["timestamp"]
+            if len(timestamps) > 1:
+                native_fps = 1.0 / max(float(np.median(np.diff(timestamps))), 1e-3)
+            first = self.reader.read_at(0)
+        elif os.path.isdir(path):
+            self.files = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+            if not self.files:
+                raise Exception(f"No frames found in: {path}")
+            first = cv.imread(self.files[0])
+        elif path.lower().endswith(".npy"):
+            # mmap: стек кадров не загружается в память целиком
+            self.frames = np.load(path, mmap_mode="r")
+            first = self.frames[0]
+        elif path.lower().endswith(VIDEO_EXTENSIONS):
+            self.capture = cv.VideoCapture(path)
+            if not self.capture.isOpened():
+                raise Exception(f"Cannot open video: {path}")
+            native_fps = self.capture.get(cv.CAP_PROP_FPS) or None
+            first = None
+            self.w = int(self.capture.get(cv.CAP_PROP_FRAME_WIDTH))
+            self.h = int(self.capture.get(cv.CAP_PROP_FRAME_HEIGHT))
+        else:
+            raise Exception(f"Unsupported replay source: {path}")
+
+        if first is not None:
+            self.h, self.w = first.shape[:2]
+
+        if mode == "realtime" and native_fps:
+            fps = native_fps
+        fps = fps or 1.0 / cfg.LOAD_LIMIT_FRAMETIME
+        self.frame_interval = 0 if mode == "max" else 1.0 / fps
+        self.next_frame_time = None
+
+    def read_next(self):
+        """
+        Читает следующий кадр без учета темпа. Возвращает None, если кадры закончились.
+        """
+        if self.capture is not None:
+            ok, frame = self.capture.read()
+            if not ok and self.loop:
+                self.capture.set(cv.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = self.capture.read()
+            return frame if ok else None
+
+        if self.reader is not None:
+            count = len(self.reader)
+        else:
+            count = len(self.files) if self.files is not None else len(self.frames)
+        if self.index >= count:
+            if not self.loop:
+                return None
+            self.index = 0
+
+        if self.reader is not None:
+            frame = self.reader.read_at(self.index)
+        elif self.files is not None:
+            frame = cv.imread(self.files[self.index])
+        else:
+            frame = np.asarray(self.frames[self.index])
+        self.index += 1
+        return frame
+
+    def grab(self):
+        # Выдерживаем темп воспроизведения
+        if self.frame_interval > 0:
+            now = time.perf_counter()
+            if self.next_frame_time is None:
+                self.next_frame_time = now
+            delay = self.next_frame_time - now
+            if delay > 0:
+                time.sleep(delay)
+            self.next_frame_time = max(self.next_frame_time + self.frame_interval, now)
+
+        frame = self.read_next()
+        if frame is None:
+            self.exhausted = True
+        return frame
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+def create_frame_source(window_name=None):
+    """
+    Создает источник кадров согласно config.py (CAPTURE_SOURCE).
+    :param window_name: Название окна для GDI-захвата.
+    """
+    if cfg.CAPTURE_SOURCE == "gdi":
+        return GdiFrameSource(window_name, cfg.WINDOW_SCALE, cfg.BORDER_PIXELS, cfg.TITLEBAR_PIXELS)
+    if cfg.CAPTURE_SOURCE == "replay":
+        return ReplayFrameSource(
+            cfg.REPLAY_PATH,
+            mode=cfg.REPLAY_MODE,
+            fps=cfg.REPLAY_FPS,
+            loop=cfg.REPLAY_LOOP,
+            preprocessed=cfg.REPLAY_PREPROCESSED,
+        )
+    raise Exception(f"Unknown capture source: {cfg.CAPTURE_SOURCE}")
@@ -1,5 +1,7 @@
 import numpy as np
 
+import config as cfg
+
 
 def screen_to_world(mob_screen_x, mob_screen_y, screen_center_x, screen_center_y, camera_yaw, camera_distance):
     """
@@ -31,45 +33,51 @@ def screen_to_world(mob_screen_x, mob_screen_y, screen_center_x, screen_center_y
 
 
 
-class Mob:
-    def __init__(self, x, y, w, h, id, frames_detected=0):
-        self.x = x
-        self.y = y
-        self.w = w
-        self.h = h
-        self.id = id
-        self.frames_detected = frames_detected
-        self.missed_frames = 0  # Счётчик пропущенных кадров
-        self.distance_to_character = None
-        self.aggroed = False
-
-    def update(self, x, y, w, h):
-        self.x = x
-        self.y = y
-        self.w = w
-        self.h = h
-        self.frames_detected += 1
-        self.missed_frames = 0  # Сбрасываем, если моб был обнаружен
-
-    def increment_missed_frames(self):
-        self.missed_frames += 1
-
-
-    def calculate_distance_to_character(self, screen_center):
-        """
-        Вычисляет расстояние от моба до центра экрана (персонажа) в пикселях.
-        :param screen_center: Центр экрана (screen_x, screen_y).
-        """
-        mob_center_x = self.x + self.w // 2
-        mob_center_y = self.y + self.h // 2
-        screen_center_x, screen_center_y = screen_center
-
-        # Вычисляем расстояние до центра экрана
-        self.distance_to_character = np.sqrt(
-            (mob_center_x - screen_center_x) ** 2 +
-            (mob_center_y - screen_center_y) ** 2
-        )
-
-
-    def get_center(self):
-        return self.x + self.w // 2, self.y + self.h // 2
+def kalman_step(fx, fy, vx, vy, p00, p01, p11, zx, zy, dt):
+    """
+    Шаг фильтра Калмана с постоянной скоростью для центра таблички (оси x и y независимы,
+    ковариация у них общая: одинаковые шумы и моменты измерений).
+    Работает поэлементно и для чисел, и для массивов NumPy (все треки хранилища за один вызов).
+    :param fx, fy, vx, vy: Отфильтрованный центр и скорость (пикселей в секунду).
+    :param p00, p01, p11: Дисперсия положения, ковариация положения и скорости, дисперсия скорости.
+    :param zx, zy: Измеренный центр.
+    :param dt: Время от предыдущего измерения (> 0).
+    :return: (fx, fy, vx, vy, p00, p01, p11) после коррекции.
+    """
+    q = cfg.MOB_KALMAN_PROCESS_NOISE
+    r = cfg.MOB_KALMAN_MEASUREMENT_NOISE
+
+    # Прогноз: постоянная скорость, шум - случайное ускорение
+    fx = fx + vx * dt
+    fy = fy + vy * dt
+    p00 = p00 + 2 * dt * p01 + dt * dt * p11 + q * dt ** 3 / 3
+    p01 = p01 + dt * p11 + q * dt * dt / 2
+    p11 = p11 + q * dt
+
+    # Коррекция
+    k0 = p00 / (p00 + r)
+    k1 = p01 / (p00 + r)
+    ex, ey = zx - fx, zy - fy
+    return (
+        fx + k0 * ex,
+        fy + k0 * ey,
+        vx + k1 * ex,
+        vy + k1 * ey,
+        (1 - k0) * p00,
+        (1 - k0) * p01,
+        p11 - k1 * p01,
+    )
+
+
+def predict_position(fx, fy, vx, vy, timestamp, t, max_seconds=None):
+    """
+    Экстраполяция центра с постоянной скоростью на момент t.
+    Работает поэлементно и для чисел, и для массивов NumPy.
+    :param fx, fy, vx, vy: Отфильтрованный центр и скорость (пикселей в секунду).
+    :param timestamp: Время последнего измерения.
+    :param max_seconds: Предел экстраполяции от последнего измерения (по умолчанию MOB_PREDICT_MAX_SECONDS).
+    :return: (x, y) - округленные целочисленные координаты.
+    """
+    max_seconds = cfg.MOB_PREDICT_MAX_SECONDS if max_seconds is None else max_seconds
+    dt = np.clip(t - timestamp, 0.0, max_seconds)
+    return np.rint(fx + vx * dt).astype(np.int64), np.rint(fy + vy * dt).astype(np.int64)
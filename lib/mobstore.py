@@ -0,0 +1,273 @@
+import numpy as np
+
+import config as cfg
+from lib.mob import kalman_step, predict_position, screen_to_world
+from lib.snapshot import MOB_DTYPE
+
+
+class MobStore:
+    """
+    Треки мобов в заранее выделенных столбцах NumPy (структура массивов).
+    Трек занимает слот - одну позицию во всех столбцах; слоты удаленных треков используются повторно,
+    емкость удваивается только если свободных слотов не хватило. Номера мобов выдаются по кругу
+    из [1, id_limit) в обход занятых, поэтому за долгую сессию не растут неограниченно.
+    Объекты отдельных мобов (MobView) создаются только по запросу.
+    """
+
+    INT_COLUMNS = ("id", "x", "y", "w", "h", "frames_detected", "missed_frames", "failed_selections")
+    FLOAT_COLUMNS = (
+        "distance", "timestamp", "fx", "fy", "vx", "vy", "p00", "p01", "p11", "ignored_until", "attack_seconds",
+    )
+
+    def __init__(self, capacity=64, id_limit=1 << 16):
+        """
+        :param capacity: Начальное количество слотов.
+        :param id_limit: Граница номеров мобов (номера от 1 до id_limit - 1).
+        """
+        self.capacity = 0
+        self.id_limit = id_limit
+        self.next_id = 1
+        self.free = []  # Стек свободных слотов
+        self.active = np.zeros(0, dtype=bool)
+        self.aggroed = np.zeros(0, dtype=bool)
+        for name in self.INT_COLUMNS:
+            setattr(self, name, np.zeros(0, dtype=np.int32))
+        for name in self.FLOAT_COLUMNS:
+            setattr(self, name, np.zeros(0, dtype=np.float64))
+        self.grow(capacity)
+
+    def __len__(self):
+        return self.capacity - len(self.free)
+
+    def grow(self, capacity):
+        """
+        Увеличивает емкость до capacity слотов с сохранением данных.
+        """
+        if capacity <= self.capacity:
+            return
+        for name in ("active", "aggroed") + self.INT_COLUMNS + self.FLOAT_COLUMNS:
+            old = getattr(self, name)
+            column = np.zeros(capacity, dtype=old.dtype)
+            column[:self.capacity] = old
+            setattr(self, name, column)
+        # Младшие слоты выдаются первыми
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def slots(self):
+        """
+        Занятые слоты по возрастанию.
+        """
+        return np.flatnonzero(self.active)
+
+    def allocate_ids(self, count):
+        """
+        count свободных номеров мобов по кругу, начиная с next_id.
+        """
+        live = set(self.id[self.active].tolist())
+        if len(live) + count >= self.id_limit:
+            raise Exception(f"Mob id space exhausted: {len(live)} live tracks, limit {self.id_limit}")
+        ids = []
+        while len(ids) < count:
+            candidate = self.next_id
+            self.next_id = candidate + 1 if candidate + 1 < self.id_limit else 1
+            if candidate not in live:
+                ids.append(candidate)
+        return ids
+
+    def add(self, rects, timestamp):
+        """
+        Создает треки для прямоугольников (x, y, w, h).
+        :param timestamp: Время захвата кадра.
+        :return: Слоты новых треков.
+        """
+        rects = np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+        count = len(rects)
+        ids = self.allocate_ids(count)
+        if count > len(self.free):
+            self.grow(max(2 * self.capacity, len(self) + count))
+        slots = np.array([self.free.pop() for _ in range(count)], dtype=np.intp)
+
+        self.active[slots] = True
+        self.aggroed[slots] = False
+        self.id[slots] = ids
+        self.x[slots], self.y[slots], self.w[slots], self.h[slots] = rects.T
+        self.frames_detected[slots] = 1
+        self.missed_frames[slots] = 0
+        self.distance[slots] = np.nan
+        self.failed_selections[slots] = 0
+        self.ignored_until[slots] = 0.0
+        self.attack_seconds[slots] = 0.0
+
+        centers = self.centers(slots)
+        self.fx[slots], self.fy[slots] = centers.T
+        self.vx[slots] = self.vy[slots] = 0.0
+        self.p00[slots] = cfg.MOB_KALMAN_MEASUREMENT_NOISE
+        self.p01[slots] = 0.0
+        self.p11[slots] = cfg.MOB_KALMAN_INITIAL_VELOCITY_VAR
+        self.timestamp[slots] = timestamp
+        return slots
+
+    def update(self, slots, rects, timestamp):
+        """
+        Обновляет треки slots сопоставленными прямоугольниками и корректирует фильтр Калмана.
+        """
+        rects = np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+        self.x[slots], self.y[slots], self.w[slots], self.h[slots] = rects.T
+        self.frames_detected[slots] += 1
+        self.missed_frames[slots] = 0
+
+        dt = timestamp - self.timestamp[slots]
+        moving = slots[dt > 0]
+        dt = dt[dt > 0]
+        zx, zy = self.centers(moving).T
+        (
+            self.fx[moving], self.fy[moving], self.vx[moving], self.vy[moving],
+            self.p00[moving], self.p01[moving], self.p11[moving],
+        ) = kalman_step(
+            self.fx[moving], self.fy[moving], self.vx[moving], self.vy[moving],
+            self.p00[moving], self.p01[moving], self.p11[moving], zx, zy, dt,
+        )
+        self.timestamp[moving] = timestamp
+
+    def find(self, mob_id):
+        """
+        Слот живого трека с номером mob_id или None.
+        """
+        found = np.flatnonzero(self.active & (self.id == mob_id))
+        return int(found[0]) if len(found) else None
+
+    def release(self, slots):
+        """
+        Удаляет треки: слоты возвращаются в список свободных.
+        """
+        self.active[slots] = False
+        self.free.extend(np.asarray(slots).tolist()[::-1])
+
+    def centers(self, slots):
+        """
+        Измеренные центры табличек (N, 2).
+        """
+        return np.stack([self.x[slots] + self.w[slots] // 2, self.y[slots] + self.h[slots] // 2], axis=1)
+
+    def predict(self, slots, t, max_seconds=None):
+        """
+        Ожидаемые центры (N, 2) в момент t; экстраполяция ограничена max_seconds
+        (по умолчанию MOB_PREDICT_MAX_SECONDS) от последнего измерения.
+        """
+        x, y = predict_position(
+            self.fx[slots], self.fy[slots], self.vx[slots], self.vy[slots], self.timestamp[slots], t, max_seconds
+        )
+        return np.stack([x, y], axis=1)
+
+    def rotate(self, center, degrees):
+        """
+        Переводит все треки в систему координат камеры, повернутой относительно прежней:
+        центры и скорости поворачиваются вокруг позиции персонажа (screen_to_world с единичным масштабом).
+        :param center: Позиция персонажа (screen_x, screen_y).
+        :param degrees: Угол поворота экранных координат.
+        """
+        slots = self.slots()
+        cx, cy = center
+        fx, fy, _ = screen_to_world(self.fx[slots], self.fy[slots], cx, cy, degrees, 1.0)
+        self.fx[slots], self.fy[slots] = fx + cx, fy + cy
+        self.vx[slots], self.vy[slots], _ = screen_to_world(self.vx[slots], self.vy[slots], 0, 0, degrees, 1.0)
+
+        # Прямоугольники переносятся вместе с центром, размер сохраняется
+        centers = self.centers(slots)
+        mx, my, _ = screen_to_world(centers[:, 0], centers[:, 1], cx, cy, degrees, 1.0)
+        self.x[slots] = np.rint(mx + cx).astype(np.int64) - self.w[slots] // 2
+        self.y[slots] = np.rint(my + cy).astype(np.int64) - self.h[slots] // 2
+        self.set_distance(slots, center)
+
+    def set_distance(self, slots, position):
+        """
+        Расстояние от центров табличек до позиции персонажа (screen_x, screen_y) в пикселях.
+        """
+        centers = self.centers(slots)
+        self.distance[slots] = np.hypot(centers[:, 0] - position[0], centers[:, 1] - position[1])
+
+    def to_array(self):
+        """
+        Занятые треки в массиве MOB_DTYPE только для чтения (для снимка детекции).
+        """
+        slots = self.slots()
+        array = np.empty(len(slots), dtype=MOB_DTYPE)
+        for name in ("id", "x", "y", "w", "h", "frames_detected", "distance", "fx", "fy", "vx", "vy",
+                     "ignored_until", "failed_selections", "attack_seconds"):
+            array[name] = getattr(self, name)[slots]
+        array["cx"], array["cy"] = self.centers(slots).T
+        array["t"] = self.timestamp[slots]
+        array.flags.writeable = False
+        return array
+
+    def view(self, slot):
+        return MobView(self, slot)
+
+    def views(self):
+        """
+        Объекты MobView всех занятых треков.
+        """
+        return [MobView(self, slot) for slot in self.slots().tolist()]
+
+
+def column_property(column, doc=None):
+    """
+    Свойство MobView, читающее (и записывающее) значение слота в столбце хранилища.
+    """
+
+    def getter(view):
+        return getattr(view.store, column)[view.slot].item()
+
+    def setter(view, value):
+        getattr(view.store, column)[view.slot] = value
+
+    return property(getter, setter, doc=doc)
+
+
+class MobView:
+    """
+    Легкое представление одного трека MobStore с атрибутами моба (x, y, w, h, id, get_center...).
+    Данные не копируются: представление читает столбцы хранилища по номеру слота.
+    """
+
+    __slots__ = ("store", "slot")
+
+    x = column_property("x")
+    y = column_property("y")
+    w = column_property("w")
+    h = column_property("h")
+    frames_detected = column_property("frames_detected")
+    missed_frames = column_property("missed_frames")
+    distance_to_character = column_property("distance")
+    aggroed = column_property("aggroed")
+    timestamp = column_property("timestamp", "Время последнего измерения")
+    fx = column_property("fx", "Отфильтрованный центр")
+    fy = column_property("fy")
+    vx = column_property("vx", "Скорость, пикселей в секунду")
+    vy = column_property("vy")
+    ignored_until = column_property("ignored_until", "Не выбирать целью до этого времени")
+    failed_selections = column_property("failed_selections", "Неудачных попыток выбрать моба целью")
+    attack_seconds = column_property("attack_seconds", "Суммарное время атаки моба")
+
+    def __init__(self, store, slot):
+        self.store = store
+        self.slot = slot
+
+    @property
+    def id(self):
+        return int(self.store.id[self.slot])
+
+    def get_center(self):
+        cx, cy = self.store.centers([self.slot])[0].tolist()
+        return cx, cy
+
+    def predict(self, t):
+        x, y = self.store.predict([self.slot], t)[0].tolist()
+        return x, y
+
+    def calculate_distance_to_character(self, screen_center):
+        self.store.set_distance([self.slot], screen_center)
+
+    def __repr__(self):
+        return f"MobView(id={self.id}, x={self.x}, y={self.y}, w={self.w}, h={self.h})"
@@ -1,100 +1,282 @@
+import time
+from collections import deque
+
 import numpy as np
 
-from lib.mob import Mob
+from lib.blobs import as_blobs
+from lib.camera import create_yaw_estimator
+from lib.mobstore import MobStore
 import config as cfg
 
 class MobTracker:
-    def __init__(self, max_distance=500, group_distance=30, buffer_frames=6, max_missed_frames=7):
-        self.mobs = {}  # Хранение мобов: {id: Mob}
-        self.next_id = 1
+    def __init__(self, max_distance=500, group_distance=30, buffer_frames=6, max_missed_frames=7,
+                 capacity=cfg.MOB_STORE_CAPACITY, id_limit=cfg.MOB_ID_LIMIT):
+        self.store = MobStore(capacity, id_limit)  # Треки мобов (столбцы NumPy)
         self.max_distance = max_distance
         self.group_distance = group_distance
         self.buffer_frames = buffer_frames
         self.max_missed_frames = max_missed_frames  # Максимальное количество пропущенных кадров
+        self.timer = None  # StageTimer для замера этапа группировки (необязателен)
+
+        # Трекинг в мировой системе координат: оценка рыскания камеры (None - в экранной системе)
+        self.camera = create_yaw_estimator()
+        self.yaw = 0.0  # Рыскание камеры, в системе которой хранятся треки
+
+        # Отчеты бота о целях (из потока бота): применяются к трекам в начале update.
+        # deque.append/popleft потокобезопасны, блокировка не нужна
+        self.reports = deque()
+        self.target_id = None  # Номер моба, которого атакует бот
+        self.target_time = 0.0  # С какого момента учтено время атаки цели
+
+    @property
+    def mobs(self):
+        """
+        Текущие мобы {id: MobView}; представления создаются при каждом обращении.
+        """
+        return {view.id: view for view in self.store.views()}
+
+    def report_selection_failed(self, mob_id, timestamp=None):
+        """
+        Бот не смог выбрать моба целью. После MOB_MAX_FAILED_SELECTIONS неудач моб игнорируется
+        на MOB_IGNORE_DURATION_SECONDS.
+        """
+        self.reports.append(("failed", mob_id, time.time() if timestamp is None else timestamp))
+
+    def report_target(self, mob_id, timestamp=None):
+        """
+        Бот атакует моба mob_id (None - цели нет); время атаки копится в attack_seconds трека.
+        """
+        self.reports.append(("target", mob_id, time.time() if timestamp is None else timestamp))
+
+    def report_unkillable(self, mob_id, timestamp=None):
+        """
+        Бот сбросил цель, которая не умирает: моб игнорируется на MOB_IGNORE_DURATION_SECONDS.
+        """
+        self.reports.append(("ignore", mob_id, time.time() if timestamp is None else timestamp))
+
+    def report_rotation(self, start, duration, direction=1):
+        """
+        Бот поворачивает камеру: клавиша удерживается duration секунд начиная со start.
+        """
+        if self.camera is not None:
+            self.camera.report_rotation(start, duration, direction)
+
+    def apply_reports(self, timestamp):
+        """
+        Применяет накопленные отчеты бота и добавляет цели время атаки до timestamp.
+        """
+        store = self.store
+        while self.reports:
+            kind, mob_id, report_time = self.reports.popleft()
+            if kind == "target":
+                self.add_attack_time(report_time)
+                self.target_id = mob_id
+                self.target_time = report_time
+                continue
+            slot = store.find(mob_id)
+            if slot is None:
+                continue
+            if kind == "failed":
+                store.failed_selections[slot] += 1
+                if store.failed_selections[slot] >= cfg.MOB_MAX_FAILED_SELECTIONS:
+                    store.ignored_until[slot] = report_time + cfg.MOB_IGNORE_DURATION_SECONDS
+            elif kind == "ignore":
+                store.ignored_until[slot] = report_time + cfg.MOB_IGNORE_DURATION_SECONDS
+        self.add_attack_time(timestamp)
+
+    def add_attack_time(self, until):
+        if self.target_id is None or until <= self.target_time:
+            return
+        slot = self.store.find(self.target_id)
+        if slot is not None:
+            self.store.attack_seconds[slot] += until - self.target_time
+        self.target_time = until
+
+    def update(self, detected_mobs, character_position, timestamp=None):
+        """
+        :param timestamp: Время захвата кадра (для оценки скорости мобов), по умолчанию - текущее.
+        :return: Хранилище треков MobStore.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        self.apply_reports(timestamp)
+
+        # Камера повернулась: треки переводятся в систему координат текущего кадра
+        # (мировые координаты screen_to_world при прежнем рыскании -> экранные при текущем)
+        if self.camera is not None:
+            yaw = self.camera.yaw_at(timestamp)
+            if yaw != self.yaw:
+                self.store.rotate(character_position, self.yaw - yaw)
+                self.yaw = yaw
 
-    def update(self, detected_mobs, character_position):
         # Группируем близко расположенные мобы
-        grouped_mobs = group_mobs_simple(detected_mobs, self.group_distance)
-
-        updated_mobs = {}
-        unmatched_mobs = grouped_mobs.copy()
-
-        # Привязываем новые координаты к существующим мобам
-        for mob_id, mob in self.mobs.items():
-            mob_center = mob.get_center()
-            matched_mob = None
-            min_distance = float('inf')
-
-            for mob_coords in unmatched_mobs:
-                x, y, w, h = mob_coords
-                distance = np.sqrt((x + w // 2 - mob_center[0]) ** 2 + (y + h // 2 - mob_center[1]) ** 2)
-                if distance < self.max_distance and distance < min_distance:
-                    matched_mob = mob_coords
-                    min_distance = distance
-
-            if matched_mob:
-                x, y, w, h = matched_mob
-                mob.update(x, y, w, h)
-                mob.calculate_distance_to_character(character_position)
-                updated_mobs[mob_id] = mob
-                unmatched_mobs.remove(matched_mob)
-            else:
-                # Если моб не найден, увеличиваем missed_frames
-                mob.increment_missed_frames()
-                if mob.missed_frames < self.max_missed_frames:
-                    updated_mobs[mob_id] = mob
-
-        for mob_coords in unmatched_mobs:
-            x, y, w, h = mob_coords
-            new_mob = Mob(x, y, w, h, frames_detected=1, id =self.next_id)
-            new_mob.calculate_distance_to_character(
-                screen_center=(cfg.SCREEN_CENTER_X, cfg.SCREEN_CENTER_Y)
-            )
-            updated_mobs[self.next_id] = new_mob
-            self.next_id += 1
-
-        # Обновляем список мобов
-        self.mobs = updated_mobs
-
-        return self.mobs
+        grouped_mobs = group_mobs(detected_mobs, self.group_distance)
+        if self.timer:
+            self.timer.mark("grouping")
+
+        store = self.store
+        detections = np.array(grouped_mobs, dtype=np.int64).reshape(-1, 4)
+        detection_centers = detections[:, :2] + detections[:, 2:] // 2
+        slots = store.slots()
+        # Треки сопоставляются по центрам, предсказанным на момент кадра
+        track_centers = store.predict(slots, timestamp)
+
+        # Глобальное сопоставление треков и обнаружений по матрице расстояний
+        rows, cols = match_nearest(track_centers, detection_centers, self.max_distance)
+        matched_tracks = np.zeros(len(slots), dtype=bool)
+        matched_tracks[rows] = True
+        matched_detections = np.zeros(len(detections), dtype=bool)
+        matched_detections[cols] = True
+
+        store.update(slots[rows], detections[cols], timestamp)
+        store.set_distance(slots[rows], character_position)
+
+        # Ненайденные мобы: увеличиваем missed_frames, устаревшие удаляем
+        missed = slots[~matched_tracks]
+        store.missed_frames[missed] += 1
+        store.release(missed[store.missed_frames[missed] >= self.max_missed_frames])
+
+        # Новые мобы из несопоставленных обнаружений (в освободившихся слотах)
+        new_slots = store.add(detections[~matched_detections], timestamp)
+        store.set_distance(new_slots, character_position)
+
+        return store
+
+
+def match_nearest(track_centers, detection_centers, max_distance):
+    """
+    Глобальное жадное сопоставление треков и обнаружений: пары выбираются по возрастанию расстояния
+    (раундами взаимно ближайших пар), расстояние пары строго меньше max_distance.
+    :param track_centers: Массив центров треков (N, 2).
+    :param detection_centers: Массив центров обнаружений (M, 2).
+    :return: (индексы треков, индексы обнаружений) сопоставленных пар.
+    """
+    if not len(track_centers) or not len(detection_centers):
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    diff = track_centers[:, None, :].astype(np.float64) - detection_centers[None, :, :]
+    distance = np.sqrt((diff ** 2).sum(axis=2))
+    distance[distance >= max_distance] = np.inf
+
+    all_rows = np.arange(len(track_centers))
+    matched_rows = []
+    matched_cols = []
+    while True:
+        row_best = distance.argmin(axis=1)
+        col_best = distance.argmin(axis=0)
+        mutual = (col_best[row_best] == all_rows) & np.isfinite(distance[all_rows, row_best])
+        if not mutual.any():
+            break
+        rows = all_rows[mutual]
+        cols = row_best[mutual]
+        matched_rows.append(rows)
+        matched_cols.append(cols)
+        distance[rows, :] = np.inf
+        distance[:, cols] = np.inf
+
+    if not matched_rows:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return np.concatenate(matched_rows), np.concatenate(matched_cols)
+
+
+def group_mobs(detected_mobs, group_distance=30, grid_min_blobs=None):
+    """
+    Группирует близко расположенные мобы: group_mobs_grid для большого количества областей,
+    иначе group_mobs_simple (результаты совпадают, различается только время).
+    :param grid_min_blobs: С какого количества областей использовать сетку (по умолчанию MOB_GROUP_GRID_MIN_BLOBS).
+    :return: Группированные координаты мобов [(x, y, w, h)].
+    """
+    blobs = as_blobs(detected_mobs)
+    grid_min_blobs = cfg.MOB_GROUP_GRID_MIN_BLOBS if grid_min_blobs is None else grid_min_blobs
+    if len(blobs) >= grid_min_blobs:
+        return group_mobs_grid(blobs, group_distance)
+    return group_mobs_simple(blobs, group_distance)
 
 
 def group_mobs_simple(detected_mobs, group_distance=30):
     """
     Группирует близко расположенные мобы на основе жадного алгоритма.
-    :param detected_mobs: Список координат [(x, y, w, h)].
+    :param detected_mobs: Массив областей BLOB_DTYPE или список координат [(x, y, w, h)].
     :param group_distance: Максимальное расстояние для объединения объектов.
     :return: Группированные координаты мобов [(x, y, w, h)].
     """
+    blobs = as_blobs(detected_mobs)
+    rects = np.column_stack((blobs["x"], blobs["y"], blobs["w"], blobs["h"])).astype(np.int64)
+    centers_x = rects[:, 0] + rects[:, 2] // 2
+    centers_y = rects[:, 1] + rects[:, 3] // 2
+
     grouped = []
-    used = set()  # Индексы уже обработанных мобов
+    used = np.zeros(len(rects), dtype=bool)  # Уже обработанные мобы
 
-    for i, (x1, y1, w1, h1) in enumerate(detected_mobs):
-        if i in used:
+    for i in range(len(rects)):
+        if used[i]:
             continue
 
-        # Текущая группа
-        group = [(x1, y1, w1, h1)]
-        used.add(i)
+        # Текущая группа: сам моб и все еще не сгруппированные мобы ближе group_distance к его центру
+        distance = np.sqrt((centers_x - centers_x[i]) ** 2 + (centers_y - centers_y[i]) ** 2)
+        group = ~used & (distance < group_distance)
+        group[i] = True
+        used |= group
 
-        for j, (x2, y2, w2, h2) in enumerate(detected_mobs):
-            if j in used:
-                continue
+        # Рассчитываем средние координаты для группы
+        avg_x, avg_y, avg_w, avg_h = rects[group].mean(axis=0)
+        grouped.append((int(avg_x), int(avg_y), int(avg_w), int(avg_h)))
+
+    return grouped
+
+
+def group_mobs_grid(detected_mobs, group_distance=30):
+    """
+    Та же жадная группировка, что и group_mobs_simple (результат совпадает), но кандидаты для каждой группы
+    берутся только из соседних ячеек равномерной сетки с шагом group_distance (пространственный хеш):
+    центры ближе group_distance отличаются не больше чем на одну ячейку по каждой оси.
+    :param detected_mobs: Массив областей BLOB_DTYPE или список координат [(x, y, w, h)].
+    :param group_distance: Максимальное расстояние для объединения объектов.
+    :return: Группированные координаты мобов [(x, y, w, h)].
+    """
+    blobs = as_blobs(detected_mobs)
+    if not len(blobs):
+        return []
+    rects = np.column_stack((blobs["x"], blobs["y"], blobs["w"], blobs["h"])).astype(np.int64)
+    centers_x = rects[:, 0] + rects[:, 2] // 2
+    centers_y = rects[:, 1] + rects[:, 3] // 2
+
+    # Ячейки сетки: индексы мобов каждой ячейки по возрастанию
+    cell_size = max(group_distance, 1)
+    cells_x = np.floor_divide(centers_x, cell_size).astype(np.int64)
+    cells_y = np.floor_divide(centers_y, cell_size).astype(np.int64)
+    order = np.lexsort((np.arange(len(rects)), cells_x, cells_y))
+    keys = np.column_stack((cells_y[order], cells_x[order]))
+    starts = np.flatnonzero(np.r_[True, np.any(keys[1:] != keys[:-1], axis=1)])
+    ends = np.r_[starts[1:], len(order)]
+    cells = {
+        (int(cy), int(cx)): order[start:end]
+        for (cy, cx), start, end in zip(keys[starts].tolist(), starts.tolist(), ends.tolist())
+    }
+
+    grouped = []
+    used = np.zeros(len(rects), dtype=bool)  # Уже обработанные мобы
+    neighbourhoods = {}  # Ячейка -> мобы 3x3 соседних ячеек (собираются один раз на ячейку)
+
+    for i in range(len(rects)):
+        if used[i]:
+            continue
 
-            # Вычисляем расстояние между центрами мобов
-            center1 = (x1 + w1 // 2, y1 + h1 // 2)
-            center2 = (x2 + w2 // 2, y2 + h2 // 2)
-            distance = np.sqrt((center1[0] - center2[0]) ** 2 + (center1[1] - center2[1]) ** 2)
+        # Кандидаты - еще не сгруппированные мобы из 3x3 соседних ячеек
+        cell = (int(cells_y[i]), int(cells_x[i]))
+        candidates = neighbourhoods.get(cell)
+        if candidates is None:
+            cy, cx = cell
+            neighbours = [cells.get((cy + dy, cx + dx)) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+            candidates = neighbourhoods[cell] = np.concatenate([c for c in neighbours if c is not None])
+        candidates = candidates[~used[candidates]]
 
-            if distance < group_distance:
-                group.append((x2, y2, w2, h2))
-                used.add(j)
+        distance = np.sqrt((centers_x[candidates] - centers_x[i]) ** 2 + (centers_y[candidates] - centers_y[i]) ** 2)
+        group = candidates[(distance < group_distance) & (candidates != i)]
+        group = np.append(group, i)
+        used[group] = True
 
         # Рассчитываем средние координаты для группы
-        avg_x = int(np.mean([mob[0] for mob in group]))
-        avg_y = int(np.mean([mob[1] for mob in group]))
-        avg_w = int(np.mean([mob[2] for mob in group]))
-        avg_h = int(np.mean([mob[3] for mob in group]))
-        grouped.append((avg_x, avg_y, avg_w, avg_h))
+        avg_x, avg_y, avg_w, avg_h = rects[group].mean(axis=0)
+        grouped.append((int(avg_x), int(avg_y), int(avg_w), int(avg_h)))
 
     return grouped
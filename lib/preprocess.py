@@ -0,0 +1,99 @@
+import cv2 as cv
+import numpy as np
+
+import config as cfg
+
+
+def build_posterize_lut(levels):
+    """
+    Строит таблицу постеризации на 256 значений: старшие биты канала и середина интервала уровня.
+    :param levels: Количество уровней на канал (степень двойки) или 0/None - без постеризации.
+    :return: Таблица uint8 формы (256,) или None.
+    """
+    if not levels:
+        return None
+    shift = 8 - int(np.log2(levels))
+    values = np.arange(256, dtype=np.uint16)
+    lut = ((values >> shift) << shift) + (1 << (shift - 1)) if shift > 0 else values
+    return lut.astype(np.uint8)
+
+
+class FramePreprocessor:
+    """
+    Совмещенные уменьшение разрешения, отбрасывание альфа-канала и постеризация
+    с записью в заранее выделенный буфер (без временных массивов на каждый кадр).
+    Квантователь (результаты "lut" и "shift" совпадают):
+    - "shift": битовые сдвиги NumPy на месте (быстрее всего, см. benchmarks/bench_preprocess.py),
+    - "lut": таблица на 256 значений через cv.LUT,
+    - "off": без постеризации.
+    """
+
+    def __init__(self, scale=1.0, levels=4, quantizer="shift"):
+        """
+        :param scale: Коэффициент уменьшения разрешения (1 - без изменения).
+        :param levels: Количество уровней постеризации на канал (0 - выключено).
+        :param quantizer: "shift", "lut" или "off".
+        """
+        if quantizer not in ("lut", "shift", "off"):
+            raise Exception(f"Unknown quantizer: {quantizer}")
+        self.scale = scale
+        self.levels = levels
+        self.quantizer = quantizer if levels and levels < 256 else "off"
+        self.lut = build_posterize_lut(levels)
+        self.shift = 8 - int(np.log2(levels)) if levels else 0
+        self.tmp = None  # Промежуточный буфер BGRA уменьшенного размера
+
+    def output_shape(self, h, w):
+        """
+        Форма результата для входного кадра h x w.
+        """
+        return int(round(h * self.scale)), int(round(w * self.scale)), 3
+
+    def process(self, src, dst):
+        """
+        Преобразует кадр src (BGR или BGRA) в dst (BGR нужного размера).
+        dst может быть представлением части другого массива (например, слота кольцевого буфера).
+        :return: dst.
+        """
+        h, w = dst.shape[:2]
+        channels = src.shape[2]
+
+        if src.shape[:2] != (h, w):
+            if channels == 4:
+                # Уменьшаем BGRA без копирования в непрерывный BGR и только потом отбрасываем альфу
+                if self.tmp is None or self.tmp.shape[:2] != (h, w):
+                    self.tmp = np.empty((h, w, 4), dtype=np.uint8)
+                cv.resize(src, (w, h), dst=self.tmp, interpolation=cv.INTER_AREA)
+                cv.cvtColor(self.tmp, cv.COLOR_BGRA2BGR, dst=dst)
+            else:
+                cv.resize(src, (w, h), dst=dst, interpolation=cv.INTER_AREA)
+        elif channels == 4:
+            cv.cvtColor(src, cv.COLOR_BGRA2BGR, dst=dst)
+        else:
+            np.copyto(dst, src)
+
+        self.quantize(dst)
+        return dst
+
+    def quantize(self, image):
+        """
+        Постеризует изображение на месте выбранным квантователем.
+        """
+        if self.quantizer == "lut":
+            cv.LUT(image, self.lut, dst=image)
+        elif self.quantizer == "shift":
+            np.right_shift(image, self.shift, out=image)
+            np.left_shift(image, self.shift, out=image)
+            image += (1 << (self.shift - 1))
+        return image
+
+
+def create_preprocessor(preprocessed=False):
+    """
+    Создает предобработчик по config.py (REDUCE_RESOLUTION, POSTERIZE_LEVELS, POSTERIZE_QUANTIZER).
+    :param preprocessed: Кадры источника уже обработаны - только копирование.
+    """
+    if preprocessed:
+        return FramePreprocessor(scale=1.0, levels=0, quantizer="off")
+    scale = cfg.RESIZE_SCALE if cfg.REDUCE_RESOLUTION else 1.0
+    return FramePreprocessor(scale, cfg.POSTERIZE_LEVELS, cfg.POSTERIZE_QUANTIZER)
@@ -0,0 +1,49 @@
+import numpy as np
+
+import config as cfg
+
+
+class ProbeSet:
+    """
+    Набор контрольных точек, скомпилированный в массивы координат, эталонных цветов и допусков.
+    Все точки считываются одной индексацией и классифицируются одним векторным сравнением.
+    """
+
+    def __init__(self, probes):
+        """
+        :param probes: Словарь {имя: (точка [x, y], эталонный цвет BGR, допуск)}.
+        """
+        self.names = list(probes)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        dots = np.array([probe[0] for probe in probes.values()], dtype=np.intp).reshape(-1, 2)
+        self.xs = dots[:, 0]
+        self.ys = dots[:, 1]
+        self.colors = np.array([probe[1] for probe in probes.values()], dtype=np.int16).reshape(-1, 3)
+        self.deltas = np.array([probe[2] for probe in probes.values()], dtype=np.int16).reshape(-1, 1)
+
+    def __len__(self):
+        return len(self.names)
+
+    def index(self, name):
+        return self.positions[name]
+
+    def sample(self, frame):
+        """
+        Считывает цвета всех точек кадра (BGR или BGRA).
+        :return: Массив (N, 3) uint8.
+        """
+        return frame[self.ys, self.xs, :3]
+
+    def classify(self, colors):
+        """
+        Сравнивает цвета с эталонами: как is_in_dynamic_range, но для всех точек сразу.
+        :return: Булев вектор длины N.
+        """
+        return np.all(np.abs(colors.astype(np.int16) - self.colors) <= self.deltas, axis=1)
+
+
+def build_probe_set():
+    """
+    Компилирует контрольные точки из config.py (PROBES).
+    """
+    return ProbeSet(cfg.PROBES)
@@ -0,0 +1,125 @@
+import json
+import time
+from threading import Lock
+
+import numpy as np
+
+
+class StageTimer:
+    """
+    Замер времени этапов конвейера по монотонным часам (perf_counter_ns).
+    Этапы размечаются последовательно: begin() в начале прохода, mark(имя) в конце каждого этапа
+    (время этапа - от предыдущей отметки). Для каждого этапа хранится кольцевой буфер последних
+    window замеров, по которому считаются p50/p95/p99.
+    Замеры пишет поток детекции, сводку читает главный поток (оверлей), поэтому оба идут под self.lock.
+    """
+
+    def __init__(self, window=256, enabled=True):
+        """
+        :param window: Количество последних замеров на этап.
+        :param enabled: False - отметки и record() ничего не делают.
+        """
+        self.window = window
+        self.enabled = enabled
+        self.samples = {}  # имя этапа -> кольцевой буфер длительностей (нс)
+        self.counts = {}  # имя этапа -> всего замеров
+        self.lock = Lock()
+        self.start = 0
+        self.last = 0
+
+    def begin(self):
+        """
+        Начало прохода конвейера.
+        """
+        if self.enabled:
+            self.start = self.last = time.perf_counter_ns()
+
+    def mark(self, name):
+        """
+        Конец этапа name: записывает время от предыдущей отметки.
+        """
+        if self.enabled:
+            now = time.perf_counter_ns()
+            self.record(name, now - self.last)
+            self.last = now
+
+    def end(self, name="total"):
+        """
+        Конец прохода: записывает время от begin() как этап name.
+        """
+        if self.enabled:
+            now = time.perf_counter_ns()
+            self.record(name, now - self.start)
+            self.last = now
+
+    def record(self, name, duration_ns):
+        """
+        Записывает длительность этапа, измеренную снаружи (например, в процессе пула).
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                # Счетчик создается раньше буфера: читатель не увидит этап без счетчика
+                self.counts[name] = 0
+                samples = self.samples[name] = np.zeros(self.window, dtype=np.int64)
+            samples[self.counts[name] % self.window] = duration_ns
+            self.counts[name] += 1
+
+    def recent_samples(self):
+        """
+        Копии последних замеров (нс) по этапам в порядке их первого появления: {имя: (замеры, всего замеров)}.
+        """
+        with self.lock:
+            return {
+                name: (self.samples[name][:min(self.counts[name], self.window)].copy(), self.counts[name])
+                for name in list(self.samples)
+            }
+
+    def percentiles(self, name, q=(50, 95, 99)):
+        """
+        Перцентили времени этапа в миллисекундах по последним замерам или None, если замеров нет.
+        """
+        with self.lock:
+            count = min(self.counts.get(name, 0), self.window)
+            if not count:
+                return None
+            samples = self.samples[name][:count].copy()
+        return tuple(float(value) / 1e6 for value in np.percentile(samples, q))
+
+    def summary(self, recent=None):
+        """
+        Сводка по этапам в порядке их первого появления: {имя: {"p50", "p95", "p99" (мс), "count"}}.
+        Этапы без замеров пропускаются.
+        :param recent: Результат recent_samples() (по умолчанию снимается заново).
+        """
+        recent = self.recent_samples() if recent is None else recent
+        result = {}
+        for name, (samples, count) in recent.items():
+            if not len(samples):
+                continue
+            p50, p95, p99 = (float(value) / 1e6 for value in np.percentile(samples, (50, 95, 99)))
+            result[name] = {"p50": p50, "p95": p95, "p99": p99, "count": count}
+        return result
+
+    def format_lines(self):
+        """
+        Строки сводки для отладочного оверлея.
+        """
+        return [
+            f"{name}: {stats['p50']:.2f}/{stats['p95']:.2f}/{stats['p99']:.2f} ms"
+            for name, stats in self.summary().items()
+        ]
+
+    def dump(self, path):
+        """
+        Сохраняет сводку и последние замеры (мс) в JSON.
+        """
+        recent = self.recent_samples()
+        data = {
+            "summary": self.summary(recent),
+            "samples_ms": {name: (samples / 1e6).tolist() for name, (samples, _) in recent.items()},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
@@ -0,0 +1,89 @@
+import time
+from threading import Lock
+
+import config as cfg
+
+
+class RateGovernor:
+    """
+    Управляет частотой захвата в зависимости от состояния бота и нагрузки детекции.
+    Детекция и бот просыпаются по событию нового кадра, поэтому частота захвата задает темп всего конвейера.
+    - Профиль частоты выбирается по состоянию бота (GOVERNOR_STATE_PROFILES).
+    - Если детекция не успевает за захватом, интервал захвата увеличивается (back-off).
+    """
+
+    def __init__(self, wincap=None, clock=time.perf_counter):
+        """
+        :param wincap: WindowCapture, интервал захвата которого регулируется.
+        :param clock: Монотонные часы (секунды) для замера времени детекции.
+        """
+        self.lock = Lock()
+        self.wincap = wincap
+        self.clock = clock
+        self.profile = None
+        self.profile_interval = cfg.LOAD_LIMIT_FRAMETIME
+        self.backoff_interval = 0  # Добавочный интервал из-за отставания детекции
+        self.detection_time = 0  # Сглаженное время обработки кадра детекцией (EMA)
+        self.interval = None
+        self.set_profile("normal")
+
+    def set_profile(self, name):
+        """
+        Устанавливает профиль частоты: "fast", "normal" или "idle".
+        """
+        with self.lock:
+            if name == self.profile:
+                return
+            self.profile = name
+            self.profile_interval = cfg.GOVERNOR_PROFILES[name]
+            self.apply()
+
+    def on_state_change(self, state):
+        """
+        Обработчик смены состояния бота (BotStateManager.listener).
+        """
+        name = state.__class__.__name__
+        self.set_profile(cfg.GOVERNOR_STATE_PROFILES.get(name, "normal"))
+
+    def begin(self):
+        """
+        Начало обработки кадра детекцией: отметка времени для report_detection_since.
+        """
+        return self.clock()
+
+    def report_detection_since(self, start, skipped_frames=0):
+        """
+        Сообщает время обработки кадра, начатой в момент start (значение begin()).
+        """
+        self.report_detection(self.clock() - start, skipped_frames)
+
+    def report_detection(self, duration, skipped_frames=0):
+        """
+        Сообщает время обработки кадра детекцией и количество пропущенных кадров.
+        :param duration: Время обработки кадра в секундах.
+        :param skipped_frames: Сколько кадров захвата детекция пропустила перед этим кадром.
+        """
+        alpha = cfg.GOVERNOR_EMA_ALPHA
+        with self.lock:
+            self.detection_time = alpha * duration + (1 - alpha) * self.detection_time
+            interval = self.interval or self.profile_interval
+            if skipped_frames > 0 or self.detection_time > interval * cfg.GOVERNOR_LAG_RATIO:
+                # Детекция отстает: реже захватываем
+                self.backoff_interval = self.detection_time * cfg.GOVERNOR_BACKOFF_FACTOR
+            elif self.backoff_interval > 0:
+                # Плавно возвращаемся к интервалу профиля
+                self.backoff_interval *= cfg.GOVERNOR_RECOVERY_FACTOR
+                if self.backoff_interval < self.profile_interval:
+                    self.backoff_interval = 0
+            self.apply()
+
+    def apply(self):
+        """
+        Применяет итоговый интервал к WindowCapture. Вызывается под self.lock.
+        """
+        interval = min(max(self.profile_interval, self.backoff_interval), cfg.GOVERNOR_MAX_INTERVAL)
+        if interval == self.interval:
+            return
+        self.interval = interval
+        if self.wincap is not None:
+            self.wincap.set_capture_interval(interval)
@@ -0,0 +1,202 @@
+import json
+import os
+import queue
+import time
+from threading import Thread
+
+import cv2 as cv
+import numpy as np
+
+import config as cfg
+
+
+# Запись индекса кадра: номер кадра, время захвата, смещение и длина сжатого кадра в frames.bin
+INDEX_DTYPE = np.dtype([
+    ("frame_id", "<u8"),
+    ("timestamp", "<f8"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+])
+
+FRAMES_FILE = "frames.bin"
+INDEX_FILE = "index.bin"
+RESULTS_FILE = "results.jsonl"
+SESSION_FILE = "session.json"
+
+
+class SessionRecorder:
+    """
+    Фоновая запись сессии: сжатые кадры (PNG) в frames.bin, индекс фиксированного размера в index.bin
+    и результаты детекции по кадрам в results.jsonl.
+    Сжатие и запись выполняются в отдельном потоке; при переполнении очереди кадры и результаты
+    отбрасываются, чтобы не тормозить захват. Счетчики записанного и отброшенного сохраняются
+    в session.json при остановке.
+    """
+
+    def __init__(self, path, queue_size=64, frame_stride=1, png_compression=1):
+        """
+        :param path: Каталог записи (создается при необходимости).
+        :param queue_size: Размер очереди записи.
+        :param frame_stride: Записывать каждый N-й кадр.
+        :param png_compression: Уровень сжатия PNG (0-9).
+        """
+        self.path = path
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.frame_stride = frame_stride
+        self.png_params = [cv.IMWRITE_PNG_COMPRESSION, png_compression]
+        self.thread = None
+        self.stopped = True
+        self.dropped_frames = 0
+        self.dropped_results = 0
+        self.recorded_frames = 0
+        self.recorded_results = 0
+
+    def start(self):
+        os.makedirs(self.path, exist_ok=True)
+        self.stopped = False
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Останавливает запись, дописав все кадры из очереди.
+        """
+        if self.stopped:
+            return
+        self.stopped = True
+        self.queue.put(None)
+        self.thread.join()
+
+    def submit_frame(self, frame_id, timestamp, image):
+        """
+        Ставит кадр в очередь записи. Кадр копируется: слот кольцевого буфера будет перезаписан.
+        """
+        if self.stopped or frame_id % self.frame_stride:
+            return
+        try:
+            self.queue.put_nowait(("frame", frame_id, timestamp, image.copy()))
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def submit_result(self, frame_id, result):
+        """
+        Ставит в очередь результаты детекции по кадру (словарь, сериализуемый в JSON).
+        """
+        if self.stopped:
+            return
+        try:
+            self.queue.put_nowait(("result", frame_id, result))
+        except queue.Full:
+            self.dropped_results += 1
+
+    def run(self):
+        with open(os.path.join(self.path, FRAMES_FILE), "ab") as frames_file, \
+                open(os.path.join(self.path, INDEX_FILE), "ab") as index_file, \
+                open(os.path.join(self.path, RESULTS_FILE), "a", encoding="utf-8") as results_file:
+            offset = frames_file.tell()
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+
+                if item[0] == "frame":
+                    _, frame_id, timestamp, image = item
+                    ok, encoded = cv.imencode(".png", image, self.png_params)
+                    if not ok:
+                        self.dropped_frames += 1
+                        continue
+                    frames_file.write(encoded.tobytes())
+                    record = np.array([(frame_id, timestamp, offset, len(encoded))], dtype=INDEX_DTYPE)
+                    index_file.write(record.tobytes())
+                    offset += len(encoded)
+                    self.recorded_frames += 1
+                else:
+                    _, frame_id, result = item
+                    results_file.write(json.dumps({"frame_id": frame_id, **result}) + "\n")
+                    self.recorded_results += 1
+
+                # Индекс и кадры должны быть согласованы на диске даже при аварийном завершении
+                if self.queue.empty():
+                    frames_file.flush()
+                    index_file.flush()
+                    results_file.flush()
+
+        self.write_metadata()
+
+    def write_metadata(self):
+        """
+        Записывает в session.json счетчики записанных и отброшенных кадров и результатов:
+        без них пропуски в записи неотличимы от кадров, которые не были захвачены.
+        """
+        metadata = {
+            "frame_stride": self.frame_stride,
+            "recorded_frames": self.recorded_frames,
+            "dropped_frames": self.dropped_frames,
+            "recorded_results": self.recorded_results,
+            "dropped_results": self.dropped_results,
+        }
+        with open(os.path.join(self.path, SESSION_FILE), "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2)
+
+
+class SessionReader:
+    """
+    Чтение записи SessionRecorder: frames.bin отображается в память, кадры ищутся по номеру через индекс.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = np.fromfile(os.path.join(path, INDEX_FILE), dtype=INDEX_DTYPE)
+        frames_path = os.path.join(path, FRAMES_FILE)
+        self.frames = np.memmap(frames_path, dtype=np.uint8, mode="r") if os.path.getsize(frames_path) else None
+        self.results = {}
+        results_path = os.path.join(path, RESULTS_FILE)
+        if os.path.exists(results_path):
+            with open(results_path, encoding="utf-8") as f:
+                for line in f:
+                    result = json.loads(line)
+                    self.results[result["frame_id"]] = result
+        # Счетчики записи (session.json пишется при остановке рекордера)
+        self.metadata = {}
+        metadata_path = os.path.join(path, SESSION_FILE)
+        if os.path.exists(metadata_path):
+            with open(metadata_path, encoding="utf-8") as f:
+                self.metadata = json.load(f)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def frame_ids(self):
+        return self.index["frame_id"]
+
+    def read_at(self, position):
+        """
+        Декодирует кадр по порядковому номеру в записи.
+        """
+        record = self.index[position]
+        start = int(record["offset"])
+        return cv.imdecode(self.frames[start:start + int(record["length"])], cv.IMREAD_UNCHANGED)
+
+    def read_frame(self, frame_id):
+        """
+        Декодирует кадр по номеру кадра захвата. Возвращает None, если кадр не записан.
+        """
+        position = np.searchsorted(self.index["frame_id"], frame_id)
+        if position >= len(self.index) or self.index["frame_id"][position] != frame_id:
+            return None
+        return self.read_at(position)
+
+    def get_result(self, frame_id):
+        """
+        Результаты детекции по кадру или None.
+        """
+        return self.results.get(frame_id)
+
+
+def create_session_recorder():
+    """
+    Создает рекордер в новом каталоге RECORD_DIR/<дата-время> согласно config.py.
+    """
+    path = os.path.join(cfg.RECORD_DIR, time.strftime("%Y%m%d-%H%M%S"))
+    return SessionRecorder(path, cfg.RECORDER_QUEUE_SIZE, cfg.RECORD_FRAME_STRIDE, cfg.RECORD_PNG_COMPRESSION)
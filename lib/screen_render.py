@@ -1,7 +1,9 @@
 import cv2 as cv
+import numpy as np
 import time
 from threading import Lock, Thread
 from lib.windowcapture import WindowCapture
+import config as cfg
 import psutil  # Для мониторинга системных ресурсов
 
 class ScreenRenderer:
@@ -21,6 +23,8 @@ class ScreenRenderer:
         self.process = psutil.Process()  # Информация о текущем процессе
         self.last_system_info_time = 0  # Последнее время обновления системной информации
         self.system_info = ""  # Текущая строка системной информации
+        self.canvas = None  # Переиспользуемый буфер для отрисовки поверх кадра
+        self.last_frame_id = 0  # Номер последнего отрисованного кадра
 
     def add_element(self, identifier, element_type, params, mob=False):
         """
@@ -111,12 +115,23 @@ class ScreenRenderer:
         while not self.stopped:
             start_time = time.time()
 
-            with self.wincap.lock:
-                frame = self.wincap.screenshot
-                if frame is None:
-                    # print("Failed to capture screenshot. Retrying...")
-                    continue
-                frame = frame.copy()
+            # Ждем новый кадр вместо опроса под блокировкой захвата
+            frame_ref = self.wincap.wait_for_frame(self.last_frame_id, cfg.KEY_WAIT_MS / 1000)
+            if frame_ref is None:
+                if cv.waitKey(1) & 0xFF == ord("q"):
+                    self.stopped = True
+                continue
+            self.last_frame_id = frame_ref.frame_id
+            frame = frame_ref.image
+
+            # Кадр из кольцевого буфера доступен только для чтения: копируем в свой холст
+            if self.canvas is None or self.canvas.shape != frame.shape:
+                self.canvas = np.empty_like(frame)
+            np.copyto(self.canvas, frame)
+            # Слот начали перезаписывать во время копирования: кадр порван, ждем следующий (он уже пишется)
+            if not frame_ref.is_valid():
+                continue
+            frame = self.canvas
 
             # Рисуем элементы
             with self.lock:
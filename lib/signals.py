@@ -0,0 +1,127 @@
+import numpy as np
+
+import config as cfg
+
+
+MAX_WINDOW = 32  # История каждого сигнала хранится в битах uint32
+
+
+def consecutive(k):
+    """
+    Значение меняется после k одинаковых подряд.
+    """
+    return k, k, k, k
+
+
+def n_of_m(n, m):
+    """
+    Значение меняется, если в последних m кадрах не меньше n противоположных значений.
+    """
+    return n, m, n, m
+
+
+def hysteresis(rise_k, fall_k):
+    """
+    Асимметричное сглаживание: rise_k кадров True для включения и fall_k кадров False для выключения.
+    """
+    return rise_k, rise_k, fall_k, fall_k
+
+
+POLICIES = {
+    "consecutive": consecutive,
+    "n_of_m": n_of_m,
+    "hysteresis": hysteresis,
+}
+
+
+def popcount32(values):
+    """
+    Векторный подсчет установленных битов в массиве uint32.
+    """
+    values = values - ((values >> 1) & 0x55555555)
+    values = (values & 0x33333333) + ((values >> 2) & 0x33333333)
+    values = (values + (values >> 4)) & 0x0F0F0F0F
+    return ((values * 0x01010101) & 0xFFFFFFFF) >> 24
+
+
+class SignalRegistry:
+    """
+    Реестр сглаживаемых (debounce) сигналов.
+    История всех сигналов хранится в одном массиве битовых регистров и обновляется одной векторной операцией.
+    Политика сигнала задается четверкой (rise_n, rise_m, fall_n, fall_m):
+    сигнал включается, если среди последних rise_m значений не меньше rise_n True,
+    и выключается, если среди последних fall_m значений не меньше fall_n False.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.positions = {}
+        self.policies = []
+        self.initial = []
+        self.compiled = False
+
+    def register(self, name, policy, initial=False):
+        """
+        Регистрирует сигнал.
+        :param name: Имя сигнала.
+        :param policy: Четверка (rise_n, rise_m, fall_n, fall_m), например consecutive(3).
+        :param initial: Начальное значение.
+        """
+        rise_n, rise_m, fall_n, fall_m = policy
+        if not (0 < rise_n <= rise_m <= MAX_WINDOW and 0 < fall_n <= fall_m <= MAX_WINDOW):
+            raise Exception(f"Invalid debounce policy for {name}: {policy}")
+        self.positions[name] = len(self.names)
+        self.names.append(name)
+        self.policies.append(policy)
+        self.initial.append(initial)
+        self.compiled = False
+
+    def compile(self):
+        policies = np.array(self.policies, dtype=np.uint32).reshape(-1, 4)
+        self.rise_n, self.rise_m, self.fall_n, self.fall_m = policies.T
+        self.rise_window = ((np.uint64(1) << self.rise_m.astype(np.uint64)) - np.uint64(1)).astype(np.uint32)
+        self.fall_window = ((np.uint64(1) << self.fall_m.astype(np.uint64)) - np.uint64(1)).astype(np.uint32)
+        self.history = np.zeros(len(self.names), dtype=np.uint32)
+        self.count = 0  # Сколько значений уже накоплено (одинаково для всех сигналов)
+        self.state = np.array(self.initial, dtype=bool)
+        self.compiled = True
+
+    def update(self, raw):
+        """
+        Добавляет новые "сырые" значения всех сигналов и пересчитывает сглаженные.
+        :param raw: Последовательность bool в порядке регистрации (self.names).
+        :return: Булев массив сглаженных значений.
+        """
+        if not self.compiled:
+            self.compile()
+        raw = np.asarray(raw, dtype=np.uint32)
+        self.history = (self.history << np.uint32(1)) | raw
+        self.count = min(self.count + 1, MAX_WINDOW)
+
+        ones_rise = popcount32(self.history & self.rise_window)
+        zeros_fall = self.fall_m - popcount32(self.history & self.fall_window)
+        rise = (self.count >= self.rise_m) & (ones_rise >= self.rise_n)
+        fall = (self.count >= self.fall_m) & (zeros_fall >= self.fall_n)
+        self.state = np.where(self.state, ~fall, rise)
+        return self.state
+
+    def values(self):
+        """
+        Сглаженные значения в виде словаря {имя: bool}.
+        """
+        if not self.compiled:
+            self.compile()
+        return dict(zip(self.names, self.state.tolist()))
+
+
+def build_signal_registry(initial_values):
+    """
+    Создает реестр сигналов по config.py (SIGNAL_DEBOUNCE).
+    :param initial_values: Словарь {имя сигнала: начальное значение}.
+    """
+    registry = SignalRegistry()
+    for name, initial in initial_values.items():
+        kind, *args = cfg.SIGNAL_DEBOUNCE.get(name, cfg.SIGNAL_DEBOUNCE_DEFAULT)
+        registry.register(name, POLICIES[kind](*args), initial)
+    registry.compile()
+    return registry
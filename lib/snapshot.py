@@ -0,0 +1,109 @@
+import numpy as np
+
+from lib.mob import predict_position
+
+
+# Моб в снимке результатов: номер трека, прямоугольник, центр и расстояние до персонажа
+MOB_DTYPE = np.dtype([
+    ("id", "<i4"),
+    ("x", "<i4"),
+    ("y", "<i4"),
+    ("w", "<i4"),
+    ("h", "<i4"),
+    ("cx", "<i4"),
+    ("cy", "<i4"),
+    ("distance", "<f4"),
+    ("frames_detected", "<i4"),
+    ("fx", "<f4"),  # Отфильтрованный центр (фильтр Калмана трекера)
+    ("fy", "<f4"),
+    ("vx", "<f4"),  # Скорость, пикселей в секунду
+    ("vy", "<f4"),
+    ("t", "<f8"),  # Время последнего измерения
+    ("ignored_until", "<f8"),  # Не выбирать целью до этого времени
+    ("failed_selections", "<i4"),  # Неудачных попыток выбрать моба целью
+    ("attack_seconds", "<f4"),  # Суммарное время атаки моба
+])
+
+
+def predict_centers(mobs, t, max_seconds=None):
+    """
+    Ожидаемые центры мобов (массив MOB_DTYPE или одна запись) в момент t по модели постоянной скорости.
+    Экстраполяция ограничена max_seconds (по умолчанию MOB_PREDICT_MAX_SECONDS) от последнего измерения.
+    :return: (x, y) - целочисленные массивы (или числа для одной записи).
+    """
+    return predict_position(mobs["fx"], mobs["fy"], mobs["vx"], mobs["vy"], mobs["t"], t, max_seconds)
+
+
+def read_only(array):
+    array = np.array(array, copy=True)
+    array.flags.writeable = False
+    return array
+
+
+class DetectionSnapshot:
+    """
+    Неизменяемый снимок результатов детекции по одному кадру.
+    Детектор публикует новый снимок заменой одной ссылки; потребители читают его без блокировок
+    и пропускают, если номер кадра не изменился. Массивы снимка доступны только для чтения.
+    """
+
+    __slots__ = (
+        "frame_id",
+        "timestamp",
+        "have_target",
+        "target_full_hp",
+        "have_animus",
+        "skill_is_pressed",
+        "enough_mana",
+        "enough_hp",
+        "battle_mode",
+        "have_targets_left",
+        "have_buffs",
+        "mobs",
+        "probe_names",
+        "probe_colors",
+    )
+
+    def __init__(self, frame_id=0, timestamp=0.0, flags=None, mobs=None, probe_names=(), probe_colors=None):
+        """
+        :param frame_id: Номер кадра.
+        :param timestamp: Время захвата кадра.
+        :param flags: Словарь сглаженных флагов (отсутствующие - по умолчанию как у Detection).
+        :param mobs: Массив MOB_DTYPE.
+        :param probe_names: Имена контрольных точек в порядке probe_colors.
+        :param probe_colors: Массив цветов контрольных точек (N, 3).
+        """
+        flags = flags or {}
+        set_slot = object.__setattr__
+        set_slot(self, "frame_id", frame_id)
+        set_slot(self, "timestamp", timestamp)
+        set_slot(self, "have_target", flags.get("have_target", False))
+        set_slot(self, "target_full_hp", flags.get("target_full_hp", True))
+        set_slot(self, "have_animus", flags.get("have_animus", False))
+        set_slot(self, "skill_is_pressed", flags.get("skill_is_pressed", False))
+        set_slot(self, "enough_mana", flags.get("enough_mana", False))
+        set_slot(self, "enough_hp", flags.get("enough_hp", True))
+        set_slot(self, "battle_mode", flags.get("battle_mode", False))
+        set_slot(self, "have_targets_left", flags.get("have_targets_left", False))
+        set_slot(self, "have_buffs", flags.get("have_buffs", False))
+        set_slot(self, "mobs", mobs if mobs is not None else read_only(np.empty(0, dtype=MOB_DTYPE)))
+        set_slot(self, "probe_names", tuple(probe_names))
+        set_slot(self, "probe_colors", probe_colors if probe_colors is not None else read_only(np.empty((0, 3), np.uint8)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DetectionSnapshot is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("DetectionSnapshot is immutable")
+
+    def probe_color(self, name):
+        """
+        Цвет контрольной точки name [B, G, R].
+        """
+        return self.probe_colors[self.probe_names.index(name)].tolist()
+
+    def __repr__(self):
+        return f"DetectionSnapshot(frame_id={self.frame_id}, mobs={len(self.mobs)})"
+
+
+EMPTY_SNAPSHOT = DetectionSnapshot()
@@ -14,7 +14,8 @@ class AttackState(BotState):
         # Переключаемся на ближний бой
         # if bot.current_weapon != "main":
         #     bot.switch_weapon("main")
-        if not bot.have_target:
+        snapshot = bot.snapshot  # Одно решение - по одному кадру
+        if not snapshot.have_target:
             bot.state_manager.set_state(LootState())
         # elif not bot.have_target and bot.have_close_targets_left:
         #     bot.state_manager.set_state(SearchLeftMobsState())
@@ -23,27 +24,28 @@ class AttackState(BotState):
 
 class BuffingState(BotState):
     def handle(self, bot):
-        if  bot.have_target:
+        snapshot = bot.snapshot
+        if  snapshot.have_target:
             bot.state_manager.set_state(AttackState())
         bot.rebuff()
-        if not bot.have_animus and bot.animus_last_see_time < time.time():
+        if not snapshot.have_animus and bot.animus_last_see_time < time.time():
             bot.state_manager.set_state(SummoningState())
         else:
             bot.state_manager.set_state(SearchState())
 
 class LootState(BotState):
     def handle(self, bot):
-        if  bot.have_target:
+        snapshot = bot.snapshot
+        if  snapshot.have_target:
             bot.state_manager.set_state(AttackState())
         bot.loot_mobs()
-        bot.kill_counter += len(bot.mobs)
-        bot.mobs.clear()
+        bot.kill_counter += len(snapshot.mobs)
         bot.state_manager.set_state(BuffingState())
 
 
 class RotateState(BotState):
     def handle(self, bot):
-        if  bot.have_target:
+        if  bot.snapshot.have_target:
             bot.state_manager.set_state(AttackState())
         bot.rotate()
         bot.state_manager.set_state(SearchState())
@@ -70,11 +72,13 @@ class SearchState(BotState):
     max_retries = 5
     def handle(self, bot):
         while self.retry_count < self.max_retries:
-            if bot.have_target:
+            # Каждая попытка - по свежему снимку
+            snapshot = bot.snapshot
+            if snapshot.have_target:
                 bot.state_manager.set_state( AttackState())
                 return
 
-            elif len(bot.mobs) == 0:
+            elif len(bot.candidate_mobs(snapshot.mobs)) == 0:
                 bot.state_manager.set_state(RotateState())
                 return
 
@@ -84,7 +88,7 @@ class SearchState(BotState):
             else:
                 bot.select_target()
                 sleep(1)
-                if bot.have_target:
+                if bot.snapshot.have_target:
                     return
                 else:
                     self.retry_count += 1
@@ -99,7 +103,7 @@ class StartState(BotState):
 
 class SummoningState(BotState):
     def handle(self, bot):
-        if bot.have_target:
+        if bot.snapshot.have_target:
             bot.state_manager.set_state(AttackState())
         if cfg.USE_ANIMUS:
             bot.summon_animus()
@@ -0,0 +1,241 @@
+import cv2 as cv
+import numpy as np
+
+import config as cfg
+from lib.preprocess import build_posterize_lut
+
+
+def to_gray(image):
+    """
+    Приводит изображение (серое, BGR или BGRA) к одному каналу.
+    """
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv.cvtColor(image, cv.COLOR_BGRA2GRAY)
+    return cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+
+
+def match_score(image, template):
+    """
+    Лучшее значение TM_CCOEFF_NORMED и его положение (x, y).
+    Возвращает (0.0, None), если шаблон не помещается в изображение.
+    """
+    if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+        return 0.0, None
+    result = cv.matchTemplate(image, template, cv.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv.minMaxLoc(result)
+    return max_val, max_loc
+
+
+def masked_match_score(image, template):
+    """
+    Совпадение шаблона с прозрачным фоном: черные пиксели шаблона не сравниваются (маска template > 0).
+    Оценка - 1 - (сумма квадратов отличий по маске) / (энергия шаблона), 1.0 - точное совпадение.
+    В отличие от TM_CCOEFF_NORMED (match_score) определена и для однотонного шаблона на однотонном фоне
+    (значки и плашки интерфейса), но не инвариантна к яркости.
+    Возвращает (0.0, None), если шаблон не помещается в изображение или целиком черный.
+    """
+    if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+        return 0.0, None
+    image = np.float32(image)
+    template = np.float32(template)
+    energy = float(np.sum(template * template))
+    if energy == 0:
+        return 0.0, None
+    result = cv.matchTemplate(image, template, cv.TM_SQDIFF, mask=np.float32(template > 0))
+    min_val, _, min_loc, _ = cv.minMaxLoc(result)
+    return 1.0 - min_val / energy, min_loc
+
+
+def coarse_self_score(image, coarse, pad=4):
+    """
+    Наихудшее совпадение уменьшенного шаблона с уменьшенной областью, содержащей сам шаблон,
+    по всем четностям положения (pyrDown оставляет каждый второй пиксель).
+    У мелкоузорных шаблонов оно низкое: грубый уровень для них ничего не говорит о точном.
+    """
+    worst = 1.0
+    for dy in (0, 1):
+        for dx in (0, 1):
+            area = cv.copyMakeBorder(image, pad + dy, pad, pad + dx, pad, cv.BORDER_REPLICATE)
+            worst = min(worst, match_score(cv.pyrDown(area), coarse)[0])
+    return worst
+
+
+class TemplateLevel:
+    """
+    Шаблон в одном масштабе: полное разрешение и уменьшенная вдвое копия для грубого поиска
+    (None - грубый уровень не используется) с ее наихудшим совпадением с самим шаблоном.
+    """
+    __slots__ = ("scale", "image", "coarse", "coarse_self")
+
+    def __init__(self, scale, image, coarse, coarse_self=1.0):
+        self.scale = scale
+        self.image = image
+        self.coarse = coarse
+        self.coarse_self = coarse_self
+
+
+class TemplateMatcher:
+    """
+    Поиск шаблонов интерфейса только внутри их областей.
+    Шаблоны загружаются один раз; для каждого масштаба заранее строятся постеризованные
+    серые копии (полная и уменьшенная вдвое). Поиск идет от грубого уровня к точному:
+    если на грубом уровне совпадение заведомо ниже порога, точный уровень не считается.
+    Порог грубого уровня задается относительно совпадения уменьшенного шаблона с самим собой;
+    шаблонам, которые плохо переносят уменьшение, грубый уровень не строится.
+    Перебор масштабов прекращается на первом найденном совпадении.
+    """
+
+    def __init__(self, frame_scale=1.0, levels=0, scales=(1.0,), margin=0, coarse_slack=0.15, min_coarse_size=12,
+                 min_coarse_score=0.9):
+        """
+        :param frame_scale: Масштаб кадров относительно исходного окна (шаблоны сняты в исходном размере).
+        :param levels: Уровни постеризации кадров (0 - кадры не постеризуются).
+        :param scales: Дополнительные масштабы шаблона относительно frame_scale.
+        :param margin: Расширение области поиска в пикселях кадра.
+        :param coarse_slack: Насколько совпадение на грубом уровне может быть ниже порога.
+        :param min_coarse_size: Минимальная сторона шаблона, при которой используется грубый уровень.
+        :param min_coarse_score: Минимальное совпадение уменьшенного шаблона с самим собой,
+            при котором используется грубый уровень.
+        """
+        self.frame_scale = frame_scale
+        self.lut = build_posterize_lut(levels)
+        self.scales = scales
+        self.margin = margin
+        self.coarse_slack = coarse_slack
+        self.min_coarse_size = min_coarse_size
+        self.min_coarse_score = min_coarse_score
+        self.templates = {}  # имя -> (область, порог, [TemplateLevel])
+
+    def add_template(self, name, image, area, threshold=0.8):
+        """
+        Регистрирует шаблон и строит его пирамиду.
+        :param image: Шаблон BGR в размере исходного окна.
+        :param area: Область поиска [[x0, y0], [x1, y1]] в координатах кадра.
+        """
+        levels = []
+        for scale in self.scales:
+            factor = self.frame_scale * scale
+            h = int(round(image.shape[0] * factor))
+            w = int(round(image.shape[1] * factor))
+            if h < 2 or w < 2:
+                continue
+            scaled = cv.resize(image, (w, h), interpolation=cv.INTER_AREA) if factor != 1.0 else image.copy()
+            if self.lut is not None and scaled.ndim == 3:
+                cv.LUT(scaled, self.lut, dst=scaled)
+            gray = to_gray(scaled)
+            coarse, coarse_self = None, 1.0
+            if min(h, w) >= self.min_coarse_size:
+                coarse = cv.pyrDown(gray)
+                coarse_self = coarse_self_score(gray, coarse)
+                if coarse_self < self.min_coarse_score:
+                    coarse = None
+            levels.append(TemplateLevel(scale, gray, coarse, coarse_self))
+        self.templates[name] = (area, threshold, levels)
+
+    def load_template(self, name, path, area, threshold=0.8):
+        """
+        Загружает шаблон из файла. Возвращает False, если файл не прочитан.
+        """
+        image = cv.imread(path, cv.IMREAD_COLOR)
+        if image is None:
+            print(f"Warning: template {name} not loaded from {path}")
+            return False
+        self.add_template(name, image, area, threshold)
+        return True
+
+    def search_rect(self, area, frame_shape):
+        """
+        Прямоугольник поиска (x0, y0, x1, y1), расширенный на margin и обрезанный по кадру.
+        """
+        height, width = frame_shape[:2]
+        x0 = max(0, area[0][0] - self.margin)
+        y0 = max(0, area[0][1] - self.margin)
+        x1 = min(width, area[1][0] + self.margin)
+        y1 = min(height, area[1][1] + self.margin)
+        return x0, y0, x1, y1
+
+    def prepare_roi(self, frame, area):
+        """
+        Серая область поиска и ее уменьшенная копия.
+        """
+        x0, y0, x1, y1 = self.search_rect(area, frame.shape)
+        if x1 <= x0 or y1 <= y0:
+            return None, None
+        gray = to_gray(frame[y0:y1, x0:x1])
+        coarse = cv.pyrDown(gray) if min(gray.shape) >= 2 else None
+        return gray, coarse
+
+    def match_level(self, roi, roi_coarse, level, threshold):
+        """
+        Совпадение одного масштаба шаблона с областью поиска: сначала грубый уровень, затем уточнение
+        в окрестности найденного положения. Грубый уровень только отсекает области: порог для него -
+        порог совпадения, умноженный на совпадение уменьшенного шаблона с самим собой, минус coarse_slack.
+        """
+        template = level.image
+        th, tw = template.shape[:2]
+        if roi.shape[0] < th or roi.shape[1] < tw:
+            return 0.0
+
+        if level.coarse is not None and roi_coarse is not None:
+            coarse_score, coarse_loc = match_score(roi_coarse, level.coarse)
+            if coarse_loc is None or coarse_score < threshold * level.coarse_self - self.coarse_slack:
+                return coarse_score
+            # Уточняем в окне +-2 пикселя вокруг положения с грубого уровня
+            x, y = coarse_loc[0] * 2, coarse_loc[1] * 2
+            x0, y0 = max(0, x - 2), max(0, y - 2)
+            x1, y1 = min(roi.shape[1], x + tw + 2), min(roi.shape[0], y + th + 2)
+            return match_score(roi[y0:y1, x0:x1], template)[0]
+
+        return match_score(roi, template)[0]
+
+    def contains(self, frame, name, roi_cache=None):
+        """
+        Проверяет наличие шаблона name в его области кадра.
+        :param roi_cache: Словарь для переиспользования подготовленных областей между шаблонами одного кадра.
+        """
+        area, threshold, levels = self.templates[name]
+        key = tuple(map(tuple, area))
+        if roi_cache is not None and key in roi_cache:
+            roi, roi_coarse = roi_cache[key]
+        else:
+            roi, roi_coarse = self.prepare_roi(frame, area)
+            if roi_cache is not None:
+                roi_cache[key] = (roi, roi_coarse)
+        if roi is None:
+            return False
+
+        for level in levels:
+            if self.match_level(roi, roi_coarse, level, threshold) >= threshold:
+                return True
+        return False
+
+    def match_all(self, frame, names=None):
+        """
+        Проверяет все (или перечисленные) шаблоны на кадре. Незагруженные шаблоны пропускаются.
+        :return: Словарь {имя: bool}.
+        """
+        roi_cache = {}
+        names = [name for name in (names or self.templates) if name in self.templates]
+        return {name: self.contains(frame, name, roi_cache) for name in names}
+
+
+def build_template_matcher(frame_scale=None):
+    """
+    Создает и загружает шаблоны из config.py (TEMPLATES).
+    :param frame_scale: Масштаб кадров; по умолчанию - как у предобработки захвата.
+    """
+    if frame_scale is None:
+        frame_scale = cfg.RESIZE_SCALE if cfg.REDUCE_RESOLUTION else 1.0
+    matcher = TemplateMatcher(
+        frame_scale,
+        cfg.POSTERIZE_LEVELS,
+        cfg.TEMPLATE_SCALES,
+        cfg.TEMPLATE_SEARCH_MARGIN,
+        cfg.TEMPLATE_COARSE_SLACK,
+        min_coarse_score=cfg.TEMPLATE_MIN_COARSE_SCORE,
+    )
+    for name, (path, area, threshold) in cfg.TEMPLATES.items():
+        matcher.load_template(name, path, area, threshold)
+    return matcher
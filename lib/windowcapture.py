@@ -1,113 +1,130 @@
 import cv2
 import cv2 as cv
 import numpy as np
-import win32gui, win32ui, win32con
-from threading import Thread, Lock
-from time import sleep, time
+from threading import Event, Thread, Lock
+from time import time
 import config as cfg
+from lib.framebuffer import FrameRingBuffer
+from lib.framesource import GdiFrameSource, create_frame_source
+from lib.preprocess import create_preprocessor
 
 
 class WindowCapture:
     """
     Класс для захвата изображения окна с возможностью управления нагрузкой на CPU.
+    Кадры поставляет источник FrameSource (GDI-захват окна или воспроизведение записи).
     """
 
-    def __init__(self, window_name=None):
+    def __init__(self, window_name=None, source=None):
         """
         Инициализация объекта WindowCapture:
         - Получает параметры окна или экрана.
         :param window_name: Название окна, если требуется захват конкретного окна.
+        :param source: Источник кадров FrameSource; если None, создается по CAPTURE_SOURCE.
         """
         self.lock = Lock()
 
-        # Если имя окна не указано, захватываем весь экран
-        if window_name is None:
-            self.hwnd = win32gui.GetDesktopWindow()
-        else:
-            self.hwnd = win32gui.FindWindow(None, window_name)
-            if not self.hwnd:
-                raise Exception(f"Window not found: {window_name}")
-
-        # Получение размеров окна
-        window_rect = win32gui.GetWindowRect(self.hwnd)
-        self.w = int((window_rect[2] - window_rect[0]) * cfg.WINDOW_SCALE)
-        self.h = int((window_rect[3] - window_rect[1]) * cfg.WINDOW_SCALE)
+        if source is None:
+            source = create_frame_source(window_name)
+        self.source = source
 
-        # Учет границ окна
-        self.w -= cfg.BORDER_PIXELS * 2
-        self.h -= cfg.TITLEBAR_PIXELS + cfg.BORDER_PIXELS
-        self.cropped_x = cfg.BORDER_PIXELS
-        self.cropped_y = cfg.TITLEBAR_PIXELS
+        # Размеры кадра источника
+        self.w = source.w
+        self.h = source.h
 
         # Смещение для трансформации координат
-        self.offset_x = window_rect[0] + self.cropped_x
-        self.offset_y = window_rect[1] + self.cropped_y
+        self.offset_x = source.offset_x
+        self.offset_y = source.offset_y
 
         # Инициализация переменных захвата
         self.stopped = True
-        self.screenshot = None
+        self.thread = None
+        self.screenshot = None  # Последний кадр (read-only представление слота буфера)
+        self.frame = None  # FrameRef последнего кадра
+        self.frames = FrameRingBuffer(cfg.FRAME_BUFFER_SLOTS)
+        self.recorder = None  # SessionRecorder, получающий каждый захваченный кадр
         self.capture_interval = cfg.LOAD_LIMIT_FRAMETIME  # Интервал захвата (секунды)
-
-    def get_screenshot(self):
-        """
-        Captures the current screenshot of the window or screen and applies posterization.
-        :return: Posterized image as a Numpy array.
+        # Будит поток захвата из паузы между кадрами при смене интервала (RateGovernor) и остановке
+        self.interval_changed = Event()
+
+        # Уменьшение разрешения и постеризация в один проход
+        self.preprocessor = create_preprocessor(source.preprocessed)
+        self.scale = self.preprocessor.scale
+
+        # Режим захвата: "full" - весь кадр, "roi" - только области из CAPTURE_ROIS
+        self.frame_shape = self.preprocessor.output_shape(self.h, self.w)
+        self.rois = build_capture_rois(self.frame_shape) if cfg.CAPTURE_MODE == "roi" else None
+        if self.rois is not None:
+            # Прямоугольники в координатах источника для передачи только нужных областей
+            self.source_rects = [
+                (
+                    int(x0 / self.scale), int(y0 / self.scale),
+                    min(self.w, int(np.ceil(x1 / self.scale))), min(self.h, int(np.ceil(y1 / self.scale))),
+                )
+                for x0, y0, x1, y1 in self.rois.values()
+            ]
+
+    def capture_frame(self):
+        """
+        Captures the next frame from the frame source straight into a ring buffer slot.
+        :return: FrameRef of the published frame or None.
         """
         try:
-            # Capture the screen using Win32 API
-            wDC = win32gui.GetWindowDC(self.hwnd)
-            dcObj = win32ui.CreateDCFromHandle(wDC)
-            cDC = dcObj.CreateCompatibleDC()
-            dataBitMap = win32ui.CreateBitmap()
-            dataBitMap.CreateCompatibleBitmap(dcObj, self.w, self.h)
-            cDC.SelectObject(dataBitMap)
-            cDC.BitBlt((0, 0), (self.w, self.h), dcObj, (self.cropped_x, self.cropped_y), win32con.SRCCOPY)
-
-            # Convert to OpenCV format
-            signedIntsArray = dataBitMap.GetBitmapBits(True)
-            img = np.frombuffer(signedIntsArray, dtype='uint8')
-            img = img.reshape((self.h, self.w, 4))
-
-            # Release resources
-            dcObj.DeleteDC()
-            cDC.DeleteDC()
-            win32gui.ReleaseDC(self.hwnd, wDC)
-            win32gui.DeleteObject(dataBitMap.GetHandle())
-
-            # Remove alpha channel
-            img = img[..., :3]
-
-            # Reduce resolution if configured
-            if cfg.REDUCE_RESOLUTION:
-                img = cv2.resize(img, None, fx=cfg.RESIZE_SCALE, fy=cfg.RESIZE_SCALE, interpolation=cv2.INTER_AREA)
-
-            # Apply posterization
-            levels = 4  # You can adjust the number of levels (e.g., 4, 8, 16)
-            img = self.posterize_image(np.ascontiguousarray(img), levels)
-
-            return img
+            if self.rois is not None:
+                return self.capture_regions()
+
+            img = self.source.grab()
+            if img is None:
+                return None
+
+            # Resize, drop alpha and posterize straight into the ring buffer slot
+            slot, out = self.frames.acquire(self.preprocessor.output_shape(*img.shape[:2]))
+            self.preprocessor.process(img, out)
+
+            return self.frames.publish(slot, time())
 
         except Exception as e:
             print(f"Error in get_screenshot: {e}")
             return None
 
-    def posterize_image(self, image, levels):
+    def capture_regions(self):
         """
-        Optimized: Posterizes an image by reducing the number of color levels using bitwise operations.
-        :param image: Input image as a Numpy array (BGR format).
-        :param levels: Number of color levels for each channel (e.g., 4, 8, 16).
-        :return: Posterized image.
+        Captures only the configured regions and writes them into a sparse frame
+        with the same coordinate system as a full frame (everything else stays black).
+        :return: FrameRef of the published frame or None.
         """
-        # Calculate the bit-shift based on the number of levels
-        shift = 8 - int(np.log2(levels))  # For levels = 8 -> shift = 5 (256 >> 5 = 8 levels)
+        regions = self.source.grab_regions(self.source_rects)
+        if regions is None:
+            return None
+
+        slot, out = self.frames.acquire(self.frame_shape)
+        for (x0, y0, x1, y1), region in zip(self.rois.values(), regions):
+            self.preprocessor.process(region, out[y0:y1, x0:x1])
 
-        # Apply bitwise operations to reduce color levels
-        posterized_image = (image >> shift) << shift
+        return self.frames.publish(slot, time())
 
-        # Add an offset for better rounding to midpoints
-        posterized_image += (1 << (shift - 1))
+    def get_regions(self):
+        """
+        Возвращает захваченные области последнего кадра по именам (read-only представления).
+        В режиме "full" области вырезаются из полного кадра.
+        """
+        frame = self.frame
+        if frame is None:
+            return {}
+        rois = self.rois if self.rois is not None else build_capture_rois(frame.image.shape)
+        return {name: frame.image[y0:y1, x0:x1] for name, (x0, y0, x1, y1) in rois.items()}
 
-        return posterized_image
+    def get_screenshot(self):
+        """
+        Returns a copy of the latest frame. While the capture thread is running it is the only producer,
+        so the latest published frame is copied; otherwise a frame is captured on demand.
+        :return: Posterized image as a writable Numpy array or None.
+        """
+        if self.stopped:
+            frame = self.capture_frame()
+        else:
+            frame = self.frames.wait_for_frame(0, cfg.FRAME_WAIT_TIMEOUT_SECONDS)
+        return frame.image.copy() if frame is not None else None
 
     @staticmethod
     def list_window_names():
@@ -115,11 +132,7 @@ class WindowCapture:
         Выводит список имен открытых окон. Полезно для отладки.
         """
 
-        def winEnumHandler(hwnd, ctx):
-            if win32gui.IsWindowVisible(hwnd):
-                print(hex(hwnd), win32gui.GetWindowText(hwnd))
-
-        win32gui.EnumWindows(winEnumHandler, None)
+        GdiFrameSource.list_window_names()
 
     def get_screen_position(self, pos):
         """
@@ -129,25 +142,50 @@ class WindowCapture:
         """
         return (pos[0] + self.offset_x, pos[1] + self.offset_y)
 
+    def wait_for_frame(self, last_frame_id=0, timeout=None):
+        """
+        Ожидает новый кадр вместо опроса screenshot в цикле.
+        :param last_frame_id: Номер последнего обработанного кадра.
+        :param timeout: Максимальное время ожидания в секундах.
+        :return: FrameRef нового кадра или None по таймауту.
+        """
+        return self.frames.wait_for_frame(last_frame_id, timeout)
+
     def set_capture_interval(self, interval):
         """
-        Устанавливает интервал между захватами.
+        Устанавливает интервал между захватами. Поток захвата просыпается и пересчитывает паузу
+        по новому интервалу, а не досыпает прежнюю (например, 1 с профиля "idle" при переходе к атаке).
         :param interval: Новый интервал в секундах.
         """
         self.capture_interval = max(interval, 0.01)
+        self.interval_changed.set()
 
     def start(self):
         """
         Запускает процесс захвата изображения в отдельном потоке.
         """
         self.stopped = False
-        Thread(target=self.run).start()
+        self.thread = Thread(target=self.run)
+        self.thread.start()
 
     def stop(self):
         """
         Останавливает процесс захвата изображения.
         """
         self.stopped = True
+        self.interval_changed.set()
+
+    def wait_interval(self, start_time):
+        """
+        Пауза до следующего захвата (снижение нагрузки): capture_interval от начала захвата start_time.
+        Смена интервала будит поток, и пауза пересчитывается по новому значению.
+        """
+        while not self.stopped:
+            remaining = self.capture_interval - (time() - start_time)
+            if remaining <= 0:
+                return
+            if self.interval_changed.wait(remaining):
+                self.interval_changed.clear()
 
     def run(self):
         """
@@ -156,13 +194,46 @@ class WindowCapture:
         while not self.stopped:
             start_time = time()
 
-            screenshot = self.get_screenshot()
-            with self.lock:
-                self.screenshot = screenshot
+            frame = self.capture_frame()
+            if frame is None and self.source.exhausted:
+                # Запись закончилась: останавливаем захват
+                self.stopped = True
+                break
 
-            # Рассчитываем задержку для снижения нагрузки
-            elapsed_time = time() - start_time
-            sleep(max(0, self.capture_interval - elapsed_time))
+            if frame is not None:
+                with self.lock:
+                    self.frame = frame
+                    self.screenshot = frame.image
+                if self.recorder is not None:
+                    self.recorder.submit_frame(frame.frame_id, frame.timestamp, frame.image)
+
+            # Источник воспроизведения сам выдерживает темп
+            if self.source.paced:
+                continue
+
+            self.wait_interval(start_time)
+
+        self.source.close()
+
+
+def build_capture_rois(frame_shape):
+    """
+    Собирает именованные области захвата из config.py: CAPTURE_ROIS и окрестности
+    контрольных точек CAPTURE_ROI_DOTS. Координаты обрезаются по размеру кадра.
+    :param frame_shape: Форма итогового кадра (h, w, ...).
+    :return: Словарь {имя: (x0, y0, x1, y1)}.
+    """
+    h, w = frame_shape[:2]
+    r = cfg.CAPTURE_ROI_DOT_RADIUS
+    rois = {}
+    areas = [(name, area[0][0], area[0][1], area[1][0], area[1][1]) for name, area in cfg.CAPTURE_ROIS.items()]
+    areas += [(name, dot[0] - r, dot[1] - r, dot[0] + r + 1, dot[1] + r + 1) for name, dot in cfg.CAPTURE_ROI_DOTS.items()]
+    for name, x0, y0, x1, y1 in areas:
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(w, x1), min(h, y1)
+        if x1 > x0 and y1 > y0:
+            rois[name] = (x0, y0, x1, y1)
+    return rois
 
 
 def main():
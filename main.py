@@ -8,6 +8,8 @@ import config as cfg
 from lib.bot import RFBot
 import cv2 as cv
 from lib.detection import Detection
+from lib.rategovernor import RateGovernor
+from lib.recorder import create_session_recorder
 from lib.windowcapture import WindowCapture
 from lib.screen_render import ScreenRenderer
 
@@ -24,14 +26,25 @@ def initialize_objects():
     wincap = WindowCapture("157712709@win-sjen2colrir - Remote Desktop - RustDesk")
 
     renderer = ScreenRenderer(wincap = wincap)
-    detector = Detection(renderer)
+    detector = Detection(renderer, wincap=wincap)
     bot = RFBot(renderer)
+
+    # Частота захвата следует за состоянием бота и нагрузкой детекции
+    governor = RateGovernor(wincap)
+    detector.governor = governor
+    bot.set_governor(governor)
+    bot.mob_tracker = detector.mob_tracker
+
+    # Запись сессии: кадры пишет WindowCapture, результаты - главный цикл
+    if cfg.RECORD_SESSION:
+        wincap.recorder = create_session_recorder()
     return wincap, detector, bot, renderer
 
 
-def draw_debug_info(renderer, detector, bot):
+def draw_debug_info(renderer, detector, bot, snapshot):
     """
     Добавляет отладочную информацию и объекты в `ScreenRenderer`.
+    :param snapshot: Снимок результатов детекции, по которому показываются флаги и цвета точек.
     """
     # Получение данных от детектора и бота
     detection_state_text = ""
@@ -44,22 +57,23 @@ def draw_debug_info(renderer, detector, bot):
         mouse_position: {_position}
         mouse_color RGB: {_RGBcolor}
         mouse_color HSV: {_HSVcolor}
-        BATTLE_mode: {bot.battle_mode}
-        have_close_targets: {bot.have_close_targets_left}
+        BATTLE_mode: {snapshot.battle_mode}
+        have_close_targets: {snapshot.have_targets_left}
+        frame_skip_rate: {detector.get_skip_rate():.2f}
         """
     except:
         pass
 
     bot_state_text = f""" 
     State: {bot.get_current_state()}
-    target: {bot.have_target}
-    target full HP: {bot.target_full_hp}
-    animus: {bot.have_animus}
-    skill_pressed: {bot.skill_is_pressed}
+    target: {snapshot.have_target}
+    target full HP: {snapshot.target_full_hp}
+    animus: {snapshot.have_animus}
+    skill_pressed: {snapshot.skill_is_pressed}
     stopped: {bot.stopped}
     kill_count: {bot.kill_counter}
     """
-    dot_data = detector.get_dot_data()
+    dot_data = detector.get_dot_data(snapshot)
 
     dot_state_text = f"""
     Dot state:
@@ -115,30 +129,73 @@ def draw_debug_info(renderer, detector, bot):
     except IndexError:
         pass
 
+    # Время этапов детекции: p50/p95/p99
+    for i, line in enumerate(["Stages p50/p95/p99:"] + detector.timer.format_lines()):
+        renderer.add_element(
+            f"stage_text_line_{i}",
+            "text",
+            {
+                "text": line,
+                "position": (580, 250 + i * 20),
+                "color": (248, 248, 255),
+                "font_scale": 0.5,
+                "thickness": 1,
+            },
+        )
+
+def record_result(recorder, snapshot, detector, bot):
+    """
+    Передает в запись сессии результаты детекции по кадру (снимок) и состояние бота.
+    """
+    mobs = snapshot.mobs
+    recorder.submit_result(snapshot.frame_id, {
+        "dots": [list(map(int, color)) for color in detector.get_dot_data(snapshot)],
+        "mobs": np.column_stack((mobs["id"], mobs["x"], mobs["y"], mobs["w"], mobs["h"])).tolist(),
+        "have_target": bool(snapshot.have_target),
+        "target_full_hp": bool(snapshot.target_full_hp),
+        "have_animus": bool(snapshot.have_animus),
+        "skill_is_pressed": bool(snapshot.skill_is_pressed),
+        "enough_mana": bool(snapshot.enough_mana),
+        "enough_hp": bool(snapshot.enough_hp),
+        "have_targets_left": bool(snapshot.have_targets_left),
+        "have_buffs": bool(snapshot.have_buffs),
+        "bot_state": bot.get_current_state(),
+    })
+
+
 def main_loop(wincap, detector, bot, renderer):
     """
     Главный цикл программы.
     """
     Active = True
+    last_result_id = 0
     while Active:
-        # Пропускаем итерацию, если скриншот недоступен
-        if wincap.screenshot is None:
-            continue
+        # Ждем результаты детекции по новому кадру (детектор сам подписан на кадры захвата)
+        result_id = detector.wait_for_result(last_result_id, timeout=cfg.KEY_WAIT_MS / 1000)
+
+        if result_id is not None:
+            # Снимок публикуется одной заменой ссылки: все данные относятся к одному кадру
+            snapshot = detector.snapshot
+            last_result_id = snapshot.frame_id
+
+            # Обновляем данные бота
+            bot.update_screenshot(wincap.screenshot)
+            bot.update_snapshot(snapshot)
 
-        # Обновляем данные детектора и бота
-        detector.update(wincap.screenshot)
-        bot.update_screenshot(wincap.screenshot)
-        bot.update_char_data(detector.get_char_data())
+            if wincap.recorder is not None:
+                record_result(wincap.recorder, snapshot, detector, bot)
 
-        if DEBUG:
+            if DEBUG:
 
-            # Добавляем новые элементы в отладочном режиме
-            draw_debug_info(renderer, detector, bot)
+                # Добавляем новые элементы в отладочном режиме
+                draw_debug_info(renderer, detector, bot, snapshot)
 
         # Проверка нажатия клавиш
-        key = cv.waitKey(cfg.KEY_WAIT_MS)
+        key = cv.waitKey(1)
         if key == ord('q'):  # Завершение программы
             Active = False
+        elif key == ord('p'):  # Сохранение времени этапов детекции
+            detector.timer.dump(cfg.STAGE_TIMING_DUMP)
 
         if bot.stopped or detector.stopped or renderer.stopped or wincap.stopped:
             Active = False
@@ -157,6 +214,8 @@ def main():
     wincap, detector, bot, renderer = initialize_objects()
 
     # Запуск потоков
+    if wincap.recorder is not None:
+        wincap.recorder.start()
     wincap.start()
     sleep(1)
     renderer.start()
@@ -174,6 +233,10 @@ def main():
         detector.stop()
         wincap.stop()
         renderer.stop()
+        if wincap.recorder is not None:
+            wincap.recorder.stop()
+        if cfg.STAGE_TIMING:
+            detector.timer.dump(cfg.STAGE_TIMING_DUMP)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+import unittest
+
+import cv2 as cv
+import numpy as np
+
+from lib.blobs import as_blobs, blob_rects, extract_blobs
+from lib.mobtracker import group_mobs_simple
+
+
+class TestBlobs(unittest.TestCase):
+    def setUp(self):
+        self.mask = np.zeros((100, 200), dtype=np.uint8)
+        cv.rectangle(self.mask, (10, 20), (49, 29), 255, -1)  # 40x10
+        cv.rectangle(self.mask, (100, 50), (109, 89), 255, -1)  # 10x40
+        cv.rectangle(self.mask, (150, 5), (152, 7), 255, -1)  # 3x3, шум
+
+    def test_extract_with_offset(self):
+        """
+        Прямоугольники, площадь и центр масс берутся из статистики компонент со смещением маски.
+        """
+        blobs = extract_blobs(self.mask, offset=(5, 7), min_area=30)
+        self.assertEqual(blob_rects(blobs), [(15, 27, 40, 10), (105, 57, 10, 40)])
+        self.assertEqual(blobs["area"].tolist(), [400, 400])
+        self.assertAlmostEqual(float(blobs["cx"][0]), 15 + 19.5)
+
+    def test_aspect_filter(self):
+        """
+        Фильтр по отношению сторон оставляет только вытянутые по горизонтали области.
+        """
+        blobs = extract_blobs(self.mask, min_area=30, aspect_range=(2.0, 10.0))
+        self.assertEqual(blob_rects(blobs), [(10, 20, 40, 10)])
+
+    def test_grouping_accepts_array(self):
+        """
+        Группировка дает одинаковый результат для массива областей и списка прямоугольников.
+        """
+        rects = [(10, 10, 20, 10), (15, 12, 20, 10), (200, 200, 30, 10)]
+        self.assertEqual(group_mobs_simple(as_blobs(rects)), group_mobs_simple(rects))
+        self.assertEqual(group_mobs_simple(rects), [(12, 11, 20, 10), (200, 200, 30, 10)])
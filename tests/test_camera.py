@@ -0,0 +1,34 @@
+import unittest
+
+from lib.camera import RotationYawEstimator
+from lib.mobtracker import MobTracker
+
+
+class TestCamera(unittest.TestCase):
+    def test_rotation_yaw(self):
+        """
+        Рыскание растет равномерно во время поворота и сохраняется после него.
+        """
+        camera = RotationYawEstimator(rate=90.0)
+        camera.report_rotation(1.0, 1.0)
+        camera.report_rotation(3.0, 0.5, direction=-1)
+        self.assertEqual(camera.yaw_at(0.5), 0.0)
+        self.assertAlmostEqual(camera.yaw_at(1.5), 45.0)
+        self.assertAlmostEqual(camera.yaw_at(2.5), 90.0)
+        self.assertAlmostEqual(camera.yaw_at(4.0), 45.0)
+        self.assertEqual(len(camera.rotations), 0)
+
+    def test_tracks_survive_rotation(self):
+        """
+        Неподвижный моб после поворота камеры сопоставляется с прежним треком.
+        """
+        center = (500, 550)
+        for camera, expected in ((None, [2]), (RotationYawEstimator(rate=90.0), [1])):
+            tracker = MobTracker(max_distance=30, group_distance=5, max_missed_frames=1)
+            tracker.camera = camera
+            tracker.update([(590, 545, 20, 10)], center, timestamp=0.0)
+            tracker.report_rotation(0.0, 1.0)
+            # Смещение (100, 0) от персонажа после поворота на 90 градусов становится (0, -100)
+            tracker.update([(490, 445, 20, 10)], center, timestamp=1.0)
+            self.assertEqual(sorted(tracker.mobs), expected)
+        self.assertEqual(tracker.mobs[1].get_center(), (500, 450))
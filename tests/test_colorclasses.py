@@ -0,0 +1,38 @@
+import unittest
+
+import cv2 as cv
+import numpy as np
+
+from lib.colorclasses import ColorClassifier
+from lib.preprocess import build_posterize_lut
+
+
+class TestColorClassifier(unittest.TestCase):
+    def setUp(self):
+        self.classes = (
+            ("mob", (30, 160, 95), (30, 255, 255)),
+            ("radar", (20, 100, 100), (30, 255, 255)),
+        )
+
+    def test_matches_hsv_in_range(self):
+        """
+        На постеризованном кадре маски таблицы совпадают с cvtColor + inRange.
+        """
+        for levels in (2, 4):
+            classifier = ColorClassifier(levels, self.classes)
+            rng = np.random.default_rng(levels)
+            frame = cv.LUT(rng.integers(0, 256, (64, 80, 3), dtype=np.uint8), build_posterize_lut(levels))
+            hsv = cv.cvtColor(frame, cv.COLOR_BGR2HSV)
+            for name, lower, upper in self.classes:
+                expected = cv.inRange(hsv, np.array(lower), np.array(upper))
+                np.testing.assert_array_equal(classifier.mask(frame, name), expected)
+
+    def test_bgra_and_class_bits(self):
+        """
+        Альфа-канал не влияет на номер цвета; желтый относится к обоим классам.
+        """
+        classifier = ColorClassifier(4, self.classes)
+        yellow = np.array([[[32, 224, 224]]], dtype=np.uint8)
+        bgra = cv.cvtColor(yellow, cv.COLOR_BGR2BGRA)
+        self.assertEqual(int(classifier.index(bgra).ravel()[0]), int(classifier.index(yellow).ravel()[0]))
+        self.assertEqual(int(classifier.classify(yellow).ravel()[0]), classifier.bits["mob"] | classifier.bits["radar"])
@@ -2,8 +2,11 @@ import unittest
 import numpy as np
 import cv2 as cv
 import datetime
-from lib.detection import Detection
+from unittest import mock
+from lib.blobs import blob_rects
+from lib.detection import Detection, get_circle_mask, get_playfield_mask, ui_areas_key
 from lib.screen_render  import ScreenRenderer
+from lib.snapshot import DetectionSnapshot
 import config as cfg
 
 
@@ -48,15 +51,17 @@ class TestDetection(unittest.TestCase):
         """
         Проверяем, что get_char_data возвращает корректные данные.
         """
-        self.detection.have_target = True
-        self.detection.have_buffs = True
-        self.detection.have_animus = True
+        # Флаги читаются из опубликованного снимка
+        self.detection.snapshot = DetectionSnapshot(
+            frame_id=1, flags={"have_target": True, "have_buffs": True, "have_animus": True}
+        )
         char_data = self.detection.get_char_data()
 
         self.assertEqual(char_data[0], True)  # Проверяем цель
-        self.assertEqual(char_data[1], True)  # Проверяем баффы
+        self.assertEqual(char_data[1], True)  # Проверяем полное HP цели (значение по умолчанию)
         self.assertEqual(char_data[2], True)  # Проверяем анимус
-        self.assertIsInstance(char_data[4], list)  # Проверяем координаты мобов
+        self.assertTrue(self.detection.have_buffs)
+        self.assertIsInstance(char_data[3], np.ndarray)  # Проверяем координаты мобов
 
     def test_contains_template(self):
         """
@@ -87,6 +92,25 @@ class TestDetection(unittest.TestCase):
         # Проверяем, что остальные области не изменились
         self.assertTrue(np.all(filtered_mask[0:100, 0:100] == self.test_mask[0:100, 0:100]))
 
+    def test_coarse_segmentation_matches_full(self):
+        """
+        Двухуровневая сегментация находит те же прямоугольники, что и полная (цвет - постеризованный желтый).
+        """
+        frame = np.zeros((1030, 978, 3), dtype=np.uint8)
+        cv.rectangle(frame, (300, 400), (360, 412), (32, 224, 224), -1)
+        cv.rectangle(frame, (365, 400), (420, 411), (32, 224, 224), -1)
+        cv.rectangle(frame, (601, 505), (640, 517), (32, 224, 224), -1)
+
+        self.detection.segmentation_mode = "full"
+        _, full_blobs = self.detection.segment_mobs(frame)
+        full_rects = blob_rects(full_blobs)
+        for factor in (2, 4):
+            self.detection.segmentation_mode = "coarse"
+            self.detection.pyramid_factor = factor
+            _, coarse_blobs = self.detection.segment_mobs(frame)
+            self.assertEqual(sorted(blob_rects(coarse_blobs)), sorted(full_rects))
+        self.assertEqual(len(full_rects), 3)
+
     def test_visualize_debug_info(self):
         """
         Проверяем, что метод visualize_debug_info добавляет элементы в ScreenRenderer.
@@ -120,3 +144,66 @@ class TestDetection(unittest.TestCase):
         """
         if self.renderer:
             self.renderer.stop()
+
+
+class TestMasks(unittest.TestCase):
+    def test_circle_mask_matches_loop_mask(self):
+        """
+        Кэшированная маска круга совпадает с маской, построенной попиксельным циклом по всему кадру,
+        для разных радиусов, в том числе у краев кадра.
+        """
+        height, width = 40, 50
+        for center, radius in (((25, 20), 0), ((25, 20), 1), ((25, 20), 8), ((2, 3), 5), ((48, 38), 7), ((10, 20), 30)):
+            expected = np.zeros((height, width), dtype=bool)
+            for y in range(height):
+                for x in range(width):
+                    expected[y, x] = (x - center[0]) ** 2 + (y - center[1]) ** 2 <= radius ** 2
+
+            mask = get_circle_mask(center, radius, (height, width))
+            x0, y0 = max(0, center[0] - radius), max(0, center[1] - radius)
+            full = np.zeros((height, width), dtype=bool)
+            full[y0:y0 + mask.shape[0], x0:x0 + mask.shape[1]] = mask
+            self.assertTrue(np.array_equal(full, expected), f"center={center}, radius={radius}")
+            self.assertIs(get_circle_mask(center, radius, (height, width)), mask)
+
+    def test_playfield_mask_matches_filter_mask(self):
+        """
+        Маска игрового поля совпадает с полной маской, из которой вырезаны области интерфейса (как в filter_mask).
+        """
+        areas = [[[0, 0], [60, 10]], [[0, 10], [15, 40]], [[45, 30], [60, 40]]]
+        expected = np.full((40, 60), 255, dtype=np.uint8)
+        for (ax0, ay0), (ax1, ay1) in areas:
+            expected[ay0:ay1, ax0:ax1] = 0
+
+        with mock.patch.object(cfg, "UI_EXCLUDED_AREAS", areas):
+            mask, (x0, y0, x1, y1) = get_playfield_mask((40, 60), ui_areas_key())
+        self.assertEqual((x0, y0, x1, y1), (15, 10, 60, 40))
+        self.assertTrue(np.array_equal(mask, expected[y0:y1, x0:x1]))
+        self.assertFalse(expected[:y0].any() or expected[:, :x0].any())
+
+    def test_playfield_mask_follows_resolution_and_layout(self):
+        """
+        Другой размер кадра или другие области интерфейса (в том числе измененные на месте) дают другую маску.
+        """
+        areas = [[[0, 0], [60, 10]], [[0, 10], [15, 40]]]
+        with mock.patch.object(cfg, "UI_EXCLUDED_AREAS", areas):
+            mask, bbox = get_playfield_mask((40, 60), ui_areas_key())
+            self.assertEqual(bbox, (15, 10, 60, 40))
+
+            # Другое разрешение окна
+            resized, resized_bbox = get_playfield_mask((50, 80), ui_areas_key())
+            self.assertEqual(resized_bbox, (0, 0, 80, 50))
+            self.assertNotEqual(resized.shape, mask.shape)
+
+            # Область интерфейса изменена на месте (как в редакторе конфигурации)
+            areas[1][1][0] = 20
+            moved, moved_bbox = get_playfield_mask((40, 60), ui_areas_key())
+            self.assertEqual(moved_bbox, (20, 10, 60, 40))
+            self.assertEqual(moved.shape, (30, 40))
+
+            # Добавлена область интерфейса внутри игрового поля
+            areas.append([[30, 20], [40, 25]])
+            holed, holed_bbox = get_playfield_mask((40, 60), ui_areas_key())
+            self.assertEqual(holed_bbox, moved_bbox)
+            self.assertFalse(holed[10:15, 10:20].any())
+            self.assertTrue(moved[10:15, 10:20].all())
@@ -0,0 +1,78 @@
+import os
+import unittest
+
+import numpy as np
+
+from lib.detectionworker import DetectionWorkerPool
+
+
+class MeanExtractor:
+    """
+    Простой экстрактор для проверки пула: "цвет" - среднее по каналам, прямоугольник - размер кадра.
+    """
+
+    def __init__(self):
+        self.probe_colors = np.zeros((1, 3), dtype=np.uint8)
+
+    def extract(self, screenshot):
+        self.probe_colors = screenshot.reshape(-1, 3).mean(axis=0).astype(np.uint8).reshape(1, 3)
+        h, w = screenshot.shape[:2]
+        return None, [(0, 0, w, h)], {"bright": bool(screenshot.mean() > 127)}
+
+
+class CrashingExtractor(MeanExtractor):
+    """
+    Экстрактор, завершающий процесс на черном кадре.
+    """
+
+    def extract(self, screenshot):
+        if not screenshot.any():
+            os._exit(1)
+        return super().extract(screenshot)
+
+
+class TestDetectionWorkerPool(unittest.TestCase):
+    def test_frames_through_shared_memory(self):
+        """
+        Кадры, скопированные в слоты общей памяти, обрабатываются процессами, результаты приходят по каналу.
+        """
+        pool = DetectionWorkerPool(MeanExtractor, workers=2)
+        pool.start()
+        try:
+            for frame_id, value in ((1, 10), (2, 200)):
+                worker, slot = pool.acquire((8, 6, 3), np.uint8)
+                self.assertIsNotNone(worker)
+                slot.fill(value)
+                pool.dispatch(worker, frame_id)
+            self.assertFalse(pool.has_idle_worker())
+
+            results = []
+            while pool.busy():
+                results.extend(pool.poll(timeout=10))
+
+            self.assertEqual([result[0] for result in results], [1, 2])
+            self.assertEqual(results[0][1].tolist(), [[10, 10, 10]])
+            self.assertEqual(results[1][2], [(0, 0, 6, 8)])
+            self.assertEqual([result[3]["bright"] for result in results], [False, True])
+            self.assertTrue(pool.has_idle_worker())
+        finally:
+            pool.close()
+
+    def test_crashed_worker_is_restarted(self):
+        """
+        Процесс, завершившийся во время обработки, перезапускается; его кадр пропускается.
+        """
+        pool = DetectionWorkerPool(CrashingExtractor, workers=1)
+        pool.start()
+        try:
+            for frame_id, value in ((1, 0), (2, 50)):
+                worker, slot = pool.acquire((8, 6, 3), np.uint8)
+                slot.fill(value)
+                pool.dispatch(worker, frame_id)
+                results = []
+                while pool.busy():
+                    results.extend(pool.poll(timeout=10))
+                self.assertTrue(pool.has_idle_worker())
+                self.assertEqual([result[0] for result in results], [] if value == 0 else [frame_id])
+        finally:
+            pool.close()
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+
+from lib.framebuffer import FrameRingBuffer
+
+
+class TestFrameRingBuffer(unittest.TestCase):
+    def test_publish_read_only_view(self):
+        """
+        Опубликованный кадр доступен только для чтения и имеет растущий номер.
+        """
+        frames = FrameRingBuffer(slots=3)
+        slot, out = frames.acquire((4, 4, 3))
+        out.fill(7)
+        first = frames.publish(slot, 0.0)
+        slot, out = frames.acquire((4, 4, 3))
+        second = frames.publish(slot, 0.1)
+
+        self.assertGreater(second.frame_id, first.frame_id)
+        self.assertFalse(first.image.flags.writeable)
+        self.assertTrue(np.all(first.image == 7))
+        with self.assertRaises(ValueError):
+            first.image[0, 0, 0] = 1
+
+    def test_generation_check(self):
+        """
+        Ссылка становится невалидной, когда производитель начинает перезаписывать слот.
+        """
+        frames = FrameRingBuffer(slots=2)
+        first = frames.publish(frames.acquire((2, 2, 3))[0], 0.0)
+        frames.publish(frames.acquire((2, 2, 3))[0], 0.1)
+        self.assertTrue(first.is_valid())
+        frames.acquire((2, 2, 3))
+        self.assertFalse(first.is_valid())
+
+    def test_wait_for_frame(self):
+        """
+        Ожидание возвращает только кадры новее уже обработанного и None по таймауту.
+        """
+        frames = FrameRingBuffer(slots=2)
+        self.assertIsNone(frames.wait_for_frame(0, timeout=0.01))
+        frame = frames.publish(frames.acquire((2, 2, 3))[0], 0.0)
+        self.assertIs(frames.wait_for_frame(0, timeout=0.01), frame)
+        self.assertIsNone(frames.wait_for_frame(frame.frame_id, timeout=0.01))
+
+    def test_concurrent_producers_get_distinct_slots(self):
+        """
+        Слот резервируется при acquire: второй производитель до publish первого получает другой слот.
+        """
+        frames = FrameRingBuffer(slots=3)
+        first, _ = frames.acquire((2, 2, 3))
+        second, _ = frames.acquire((2, 2, 3))
+        self.assertNotEqual(first, second)
+        frames.publish(second, 0.1)
+        frames.publish(first, 0.2)
+        self.assertEqual(frames.acquire((2, 2, 3))[0], 3 % 3)
@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from lib.framediff import FrameChangeDetector
+
+
+class TestFrameChangeDetector(unittest.TestCase):
+    def test_detects_changed_tile(self):
+        """
+        Одинаковые кадры не дают изменений, изменение пикселя помечает его плитку.
+        """
+        detector = FrameChangeDetector(tile_size=10)
+        frame = np.zeros((30, 40, 3), dtype=np.uint8)
+
+        self.assertTrue(detector.update(frame).all())  # Первый кадр
+        self.assertFalse(detector.update(frame.copy()).any())
+
+        changed_frame = frame.copy()
+        changed_frame[15, 25] = (32, 96, 160)
+        changed = detector.update(changed_frame)
+        self.assertEqual(changed.shape, (3, 4))
+        self.assertEqual(list(zip(*np.nonzero(changed))), [(1, 2)])
+        self.assertAlmostEqual(detector.skip_rate, 1 / 3)
+
+    def test_detects_sum_preserving_change(self):
+        """
+        Сдвиг объекта внутри плитки не меняет сумму плитки, но должен считаться изменением.
+        """
+        detector = FrameChangeDetector(tile_size=10)
+        frame = np.zeros((20, 20), dtype=np.uint8)
+        frame[2:5, 2:5] = 200
+        detector.update(frame)
+
+        moved = np.zeros_like(frame)
+        moved[4:7, 4:7] = 200
+        changed = detector.update(moved)
+        self.assertEqual(list(zip(*np.nonzero(changed))), [(0, 0)])
+
+    def test_reset_marks_next_frame_changed(self):
+        """
+        После reset() следующий кадр считается измененным целиком, даже если он совпадает с предыдущим.
+        """
+        detector = FrameChangeDetector(tile_size=10)
+        frame = np.zeros((20, 30, 4), dtype=np.uint8)
+        detector.update(frame)
+        detector.reset()
+        self.assertTrue(detector.update(frame).all())
+        self.assertFalse(detector.update(frame).any())
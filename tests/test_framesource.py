@@ -0,0 +1,177 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import config as cfg
+from lib.framesource import FrameSource, ReplayFrameSource
+from lib.windowcapture import WindowCapture, build_capture_rois
+
+
+class TestReplayFrameSource(unittest.TestCase):
+    def setUp(self):
+        """
+        Записываем небольшой стек кадров в .npy.
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "frames.npy")
+        self.frames = np.random.randint(0, 255, (3, 40, 60, 3), dtype=np.uint8)
+        np.save(self.path, self.frames)
+
+    def test_replay_all_frames(self):
+        """
+        Источник отдает все кадры по порядку и помечается исчерпанным.
+        """
+        source = ReplayFrameSource(self.path, mode="max")
+        self.assertEqual((source.w, source.h), (60, 40))
+        for expected in self.frames:
+            np.testing.assert_array_equal(source.grab(), expected)
+        self.assertIsNone(source.grab())
+        self.assertTrue(source.exhausted)
+
+    def test_window_capture_with_replay(self):
+        """
+        WindowCapture работает без окна Windows, если передан источник воспроизведения.
+        """
+        wincap = WindowCapture(source=ReplayFrameSource(self.path, mode="max", preprocessed=True))
+        wincap.start()
+        wincap.thread.join(timeout=5)
+        self.assertTrue(wincap.stopped)
+        np.testing.assert_array_equal(wincap.screenshot, self.frames[-1])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+class TestCaptureRegions(unittest.TestCase):
+    ROIS = {
+        "inside": [[5, 5], [20, 15]],
+        "edge": [[50, 30], [80, 60]],  # Выходит за правый и нижний край кадра 60x40
+        "outside": [[100, 100], [120, 120]],
+    }
+    DOTS = {"corner": (1, 1)}  # Квадрат вокруг точки выходит за левый и верхний край
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "frames.npy")
+        self.frames = np.random.randint(1, 255, (2, 40, 60, 3), dtype=np.uint8)
+        np.save(self.path, self.frames)
+        self.patches = [
+            mock.patch.object(cfg, "CAPTURE_ROIS", self.ROIS),
+            mock.patch.object(cfg, "CAPTURE_ROI_DOTS", self.DOTS),
+            mock.patch.object(cfg, "CAPTURE_ROI_DOT_RADIUS", 2),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def capture(self, mode, preprocessed=True):
+        with mock.patch.object(cfg, "CAPTURE_MODE", mode):
+            wincap = WindowCapture(source=ReplayFrameSource(self.path, mode="max", preprocessed=preprocessed))
+        frame = wincap.capture_frame()
+        wincap.source.close()
+        return wincap, frame.image
+
+    def test_rois_clipped_to_frame(self):
+        """
+        Области обрезаются по краям кадра, области вне кадра отбрасываются.
+        """
+        self.assertEqual(
+            build_capture_rois((40, 60, 3)),
+            {"inside": (5, 5, 20, 15), "edge": (50, 30, 60, 40), "corner": (0, 0, 4, 4)},
+        )
+
+    def test_roi_capture_matches_full_capture(self):
+        """
+        Захват только областей дает те же пиксели внутри областей, что и полный захват; остальное - черное.
+        """
+        _, full = self.capture("full")
+        wincap, sparse = self.capture("roi")
+        covered = np.zeros(full.shape[:2], dtype=bool)
+        for x0, y0, x1, y1 in wincap.rois.values():
+            np.testing.assert_array_equal(sparse[y0:y1, x0:x1], full[y0:y1, x0:x1])
+            covered[y0:y1, x0:x1] = True
+        self.assertFalse(sparse[~covered].any())
+        self.assertEqual(set(wincap.get_regions()), {"inside", "edge", "corner"})
+
+    def test_scaled_roi_capture_matches_full_capture(self):
+        """
+        При уменьшении в 2 раза границы областей попадают на целые пиксели источника,
+        и захват областей (с постеризацией) совпадает с полным захватом точно.
+        """
+        rois = {"inside": [[3, 1], [13, 9]], "edge": [[17, 11], [40, 40]]}
+        with mock.patch.multiple(cfg, CAPTURE_ROIS=rois, REDUCE_RESOLUTION=True, RESIZE_SCALE=0.5, POSTERIZE_LEVELS=4):
+            _, full = self.capture("full", preprocessed=False)
+            wincap, sparse = self.capture("roi", preprocessed=False)
+        self.assertEqual(full.shape, (20, 30, 3))
+        self.assertEqual(wincap.rois["edge"], (17, 11, 30, 20))
+        for x0, y0, x1, y1 in wincap.rois.values():
+            np.testing.assert_array_equal(sparse[y0:y1, x0:x1], full[y0:y1, x0:x1])
+
+    def test_fractional_scale_roi_capture_within_tolerance(self):
+        """
+        При масштабе 0.4 границы областей (3 -> 7.5 пикселя источника) не попадают на сетку источника:
+        область берется с запасом (int/ceil) и растягивается в свой прямоугольник, поэтому центры пикселей
+        смещаются меньше чем на пиксель источника по каждой оси. На линейном градиенте (2 по x, 3 по y
+        на пиксель источника) без постеризации отличие от полного захвата - не больше 2 + 3 + 1 (округление).
+        """
+        ys, xs = np.mgrid[0:40, 0:60]
+        ramp = 2 * xs + 3 * ys
+        frames = np.stack([ramp, ramp + 5, ramp + 10], axis=-1).astype(np.uint8)
+        np.save(self.path, np.stack([frames, frames]))
+
+        rois = {"inside": [[3, 1], [13, 9]], "edge": [[17, 11], [40, 40]]}
+        with mock.patch.multiple(cfg, CAPTURE_ROIS=rois, REDUCE_RESOLUTION=True, RESIZE_SCALE=0.4, POSTERIZE_LEVELS=0):
+            _, full = self.capture("full", preprocessed=False)
+            wincap, sparse = self.capture("roi", preprocessed=False)
+        self.assertEqual(full.shape, (16, 24, 3))
+        self.assertEqual(wincap.rois["edge"], (17, 11, 24, 16))
+        self.assertEqual(wincap.source_rects[0], (7, 2, 33, 23))
+        for x0, y0, x1, y1 in wincap.rois.values():
+            diff = np.abs(sparse[y0:y1, x0:x1].astype(np.int16) - full[y0:y1, x0:x1])
+            self.assertLessEqual(int(diff.max()), 6)
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmpdir.cleanup()
+
+
+class StaticFrameSource(FrameSource):
+    """
+    Источник без собственного темпа: один и тот же кадр по запросу.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.h, self.w = 20, 30
+        self.frame = np.zeros((self.h, self.w, 3), dtype=np.uint8)
+
+    def grab(self):
+        return self.frame
+
+
+class TestCaptureInterval(unittest.TestCase):
+    def test_interval_change_wakes_capture_thread(self):
+        """
+        Уменьшение интервала (например, RateGovernor переходит из "idle" в "fast") действует сразу:
+        поток захвата не досыпает прежний длинный интервал.
+        """
+        with mock.patch.object(cfg, "CAPTURE_MODE", "full"):
+            wincap = WindowCapture(source=StaticFrameSource())
+        wincap.set_capture_interval(30.0)
+        wincap.start()
+        try:
+            first = wincap.wait_for_frame(0, timeout=5)
+            self.assertIsNotNone(first)
+            start = time.perf_counter()
+            wincap.set_capture_interval(0.01)
+            second = wincap.wait_for_frame(first.frame_id, timeout=5)
+            self.assertIsNotNone(second)
+            self.assertLess(time.perf_counter() - start, 2.0)
+        finally:
+            wincap.stop()
+            wincap.thread.join(timeout=5)
+        self.assertFalse(wincap.thread.is_alive())
@@ -0,0 +1,54 @@
+import unittest
+
+import numpy as np
+
+from lib.mobstore import MobStore
+
+
+class TestMobStore(unittest.TestCase):
+    def test_slot_recycling_and_growth(self):
+        """
+        Слоты удаленных треков используются повторно, емкость растет только при нехватке слотов.
+        """
+        store = MobStore(capacity=2)
+        slots = store.add([(0, 0, 10, 4), (50, 0, 10, 4)], timestamp=0.0)
+        self.assertEqual(slots.tolist(), [0, 1])
+        store.release(slots[:1])
+        self.assertEqual(store.add([(90, 0, 10, 4)], timestamp=0.0).tolist(), [0])
+        self.assertEqual(store.capacity, 2)
+
+        store.add([(10, 10, 10, 4), (20, 20, 10, 4)], timestamp=0.0)
+        self.assertEqual((len(store), store.capacity), (4, 4))
+        self.assertEqual(store.id[store.slots()].tolist(), [3, 2, 4, 5])
+
+    def test_bounded_ids(self):
+        """
+        Номера выдаются по кругу в обход занятых.
+        """
+        store = MobStore(capacity=4, id_limit=4)
+        first = store.add([(0, 0, 4, 4), (10, 0, 4, 4), (20, 0, 4, 4)], timestamp=0.0)
+        store.release(first[1:2])
+        slots = store.add([(30, 0, 4, 4)], timestamp=0.0)
+        self.assertEqual(store.id[slots].tolist(), [2])
+        with self.assertRaises(Exception):
+            store.add([(40, 0, 4, 4)], timestamp=0.0)
+
+    def test_views_and_array(self):
+        """
+        Представления и массив снимка читают те же столбцы.
+        """
+        store = MobStore()
+        slots = store.add([(100, 200, 40, 10)], timestamp=1.0)
+        store.set_distance(slots, (120, 300))
+        view = store.views()[0]
+        self.assertEqual((view.id, view.x, view.get_center()), (1, 100, (120, 205)))
+        self.assertAlmostEqual(view.distance_to_character, 95.0)
+        self.assertFalse(hasattr(view, "__dict__"))
+
+        store.update(slots, [(104, 200, 40, 10)], timestamp=1.1)
+        self.assertEqual((view.x, view.frames_detected), (104, 2))
+        array = store.to_array()
+        self.assertEqual((int(array[0]["cx"]), int(array[0]["frames_detected"])), (124, 2))
+        self.assertGreater(float(array[0]["vx"]), 0.0)
+        self.assertFalse(array.flags.writeable)
+        self.assertTrue(np.isclose(array[0]["t"], 1.1))
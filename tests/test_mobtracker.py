@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+
+import config as cfg
+from lib.mobtracker import MobTracker, group_mobs, group_mobs_grid, group_mobs_simple, match_nearest
+
+
+class TestMobTracker(unittest.TestCase):
+    def test_global_match(self):
+        """
+        Сопоставление глобальное: ближайшая пара выбирается первой, независимо от порядка треков.
+        """
+        tracks = np.array([[0, 0], [10, 0]])
+        detections = np.array([[11, 0], [30, 0]])
+        rows, cols = match_nearest(tracks, detections, max_distance=50)
+        self.assertEqual(sorted(zip(rows.tolist(), cols.tolist())), [(0, 1), (1, 0)])
+
+        rows, cols = match_nearest(tracks, detections, max_distance=25)
+        self.assertEqual(list(zip(rows.tolist(), cols.tolist())), [(1, 0)])
+
+    def test_creation_and_expiration(self):
+        """
+        Новые обнаружения получают новые номера, ненайденные треки удаляются после max_missed_frames.
+        """
+        tracker = MobTracker(max_distance=50, group_distance=5, max_missed_frames=2)
+        tracker.update([(100, 100, 20, 10), (300, 100, 20, 10)], (0, 0))
+        self.assertEqual(sorted(tracker.mobs), [1, 2])
+
+        tracker.update([(104, 100, 20, 10)], (0, 0))
+        self.assertEqual(sorted(tracker.mobs), [1, 2])
+        self.assertEqual((tracker.mobs[1].x, tracker.mobs[2].missed_frames), (104, 1))
+
+        tracker.update([(108, 100, 20, 10), (500, 300, 20, 10)], (0, 0))
+        self.assertEqual(sorted(tracker.mobs), [1, 3])
+
+    def test_grid_grouping_matches_simple(self):
+        """
+        Группировка по сетке дает те же прямоугольники, что и полный перебор.
+        """
+        rng = np.random.default_rng(1)
+        for count in (0, 1, 50, 300):
+            rects = [
+                (int(x), int(y), int(w), int(h))
+                for x, y, w, h in zip(
+                    rng.integers(-20, 500, count), rng.integers(-20, 300, count),
+                    rng.integers(5, 40, count), rng.integers(3, 12, count),
+                )
+            ]
+            for group_distance in (0, 15, 30, 47.5):
+                self.assertEqual(group_mobs_grid(rects, group_distance), group_mobs_simple(rects, group_distance))
+                # Выбор реализации по числу областей не меняет результат
+                for grid_min_blobs in (0, count + 1):
+                    self.assertEqual(
+                        group_mobs(rects, group_distance, grid_min_blobs), group_mobs_simple(rects, group_distance)
+                    )
+
+    def test_constant_velocity_prediction(self):
+        """
+        При равномерном движении фильтр сходится к истинной скорости, а прогноз - к будущему положению.
+        """
+        tracker = MobTracker(max_distance=50, group_distance=5)
+        for i in range(30):
+            tracker.update([(100 + 4 * i, 200 - 2 * i, 20, 10)], (0, 0), timestamp=i / 30)
+        mob = tracker.mobs[1]
+        self.assertAlmostEqual(mob.vx, 120.0, delta=3.0)
+        self.assertAlmostEqual(mob.vy, -60.0, delta=3.0)
+        x, y = mob.predict(29 / 30 + 0.1)
+        self.assertLessEqual(abs(x - (100 + 4 * 29 + 12 + 10)), 1)
+        self.assertLessEqual(abs(y - (200 - 2 * 29 - 6 + 5)), 1)
+
+    def test_reports_ignore_tracks(self):
+        """
+        Неудачные выборы и неубиваемые цели игнорируются по отдельности, время атаки копится в треке цели.
+        """
+        tracker = MobTracker(max_distance=50, group_distance=5)
+        rects = [(100, 100, 20, 10), (300, 100, 20, 10)]
+        tracker.update(rects, (0, 0), timestamp=1.0)
+
+        for _ in range(cfg.MOB_MAX_FAILED_SELECTIONS):
+            tracker.report_selection_failed(1, timestamp=1.0)
+        tracker.report_target(2, timestamp=1.0)
+        tracker.update(rects, (0, 0), timestamp=3.0)
+        mobs = tracker.store.to_array()
+        self.assertEqual(mobs["failed_selections"].tolist(), [cfg.MOB_MAX_FAILED_SELECTIONS, 0])
+        self.assertEqual(mobs["ignored_until"][0], 1.0 + cfg.MOB_IGNORE_DURATION_SECONDS)
+        self.assertEqual(mobs["ignored_until"][1], 0.0)
+        self.assertAlmostEqual(float(mobs["attack_seconds"][1]), 2.0)
+
+        tracker.report_unkillable(2, timestamp=3.5)
+        tracker.update(rects, (0, 0), timestamp=4.0)
+        self.assertEqual(tracker.mobs[2].ignored_until, 3.5 + cfg.MOB_IGNORE_DURATION_SECONDS)
+        self.assertAlmostEqual(tracker.mobs[2].attack_seconds, 3.0)
@@ -0,0 +1,44 @@
+import unittest
+
+import cv2 as cv
+import numpy as np
+
+from lib.preprocess import FramePreprocessor
+
+
+def legacy_posterize(image, levels):
+    """
+    Прежняя постеризация WindowCapture.posterize_image: старшие биты плюс середина интервала уровня.
+    """
+    shift = 8 - int(np.log2(levels))
+    image = (image >> shift) << shift
+    image += (1 << (shift - 1))
+    return image
+
+
+class TestFramePreprocessor(unittest.TestCase):
+    def test_quantizers_match_legacy_posterize(self):
+        """
+        Квантователи "lut" и "shift" дают ту же постеризацию, что и прежний код, на случайных кадрах.
+        """
+        rng = np.random.default_rng(0)
+        for levels in (2, 4, 8, 16):
+            frame = rng.integers(0, 256, (37, 53, 3), dtype=np.uint8)
+            expected = legacy_posterize(frame.copy(), levels)
+            for quantizer in ("lut", "shift"):
+                preprocessor = FramePreprocessor(scale=1.0, levels=levels, quantizer=quantizer)
+                dst = np.empty_like(frame)
+                self.assertTrue(np.array_equal(preprocessor.process(frame, dst), expected), (levels, quantizer))
+
+    def test_resize_bgra_matches_legacy_pipeline(self):
+        """
+        Уменьшение BGRA с отбрасыванием альфы и постеризацией совпадает с прежним путем захвата.
+        """
+        rng = np.random.default_rng(1)
+        src = rng.integers(0, 256, (120, 90, 4), dtype=np.uint8)
+        expected = cv.resize(src[..., :3], None, fx=0.5, fy=0.5, interpolation=cv.INTER_AREA)
+        expected = legacy_posterize(np.ascontiguousarray(expected), 4)
+        for quantizer in ("lut", "shift"):
+            preprocessor = FramePreprocessor(scale=0.5, levels=4, quantizer=quantizer)
+            dst = np.empty(preprocessor.output_shape(120, 90), dtype=np.uint8)
+            self.assertTrue(np.array_equal(preprocessor.process(src, dst), expected), quantizer)
@@ -0,0 +1,38 @@
+import unittest
+
+import numpy as np
+
+from lib.detection import is_in_dynamic_range
+from lib.probes import ProbeSet
+
+
+class TestProbeSet(unittest.TestCase):
+    def test_classify_matches_is_in_dynamic_range(self):
+        """
+        Векторная классификация совпадает с поточечной проверкой is_in_dynamic_range
+        на случайных точках, эталонах и допусках (включая цвета на границах допуска и у краев 0/255).
+        """
+        rng = np.random.default_rng(7)
+        for _ in range(50):
+            count = int(rng.integers(1, 12))
+            targets = rng.integers(0, 256, size=(count, 3))
+            deltas = rng.integers(0, 40, size=count)
+            probes = {
+                f"probe{i}": ([int(rng.integers(0, 64)), int(rng.integers(0, 48))], targets[i].tolist(), int(deltas[i]))
+                for i in range(count)
+            }
+            probe_set = ProbeSet(probes)
+
+            # Точки могут совпадать: тогда у них общий цвет кадра
+            frame = rng.integers(0, 256, size=(48, 64, 4), dtype=np.uint8)
+            offsets = rng.integers(-2, 3, size=(count, 3)) + rng.choice([-1, 0, 1], size=(count, 1)) * deltas[:, None]
+            frame[probe_set.ys, probe_set.xs, :3] = np.clip(targets + offsets, 0, 255)
+
+            colors = probe_set.sample(frame)
+            points = [probe[0] for probe in probes.values()]
+            self.assertEqual(colors.tolist(), [frame[y, x, :3].tolist() for x, y in points])
+            expected = [
+                is_in_dynamic_range(frame[y, x, :3].tolist(), target, delta)
+                for [x, y], target, delta in probes.values()
+            ]
+            self.assertEqual(probe_set.classify(colors).tolist(), expected)
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+from threading import Thread
+
+from lib.profiling import StageTimer
+
+
+class TestStageTimer(unittest.TestCase):
+    def test_percentiles_over_window(self):
+        """
+        Перцентили считаются по последним window замерам, в миллисекундах.
+        """
+        timer = StageTimer(window=4)
+        for ms in (100, 1, 2, 3, 4):
+            timer.record("stage", ms * 1_000_000)
+        p50, p95, p99 = timer.percentiles("stage")
+        self.assertAlmostEqual(p50, 2.5)
+        self.assertLessEqual(p99, 4.0)
+        self.assertEqual(timer.summary()["stage"]["count"], 5)
+        self.assertIsNone(timer.percentiles("missing"))
+
+    def test_marks_and_dump(self):
+        """
+        Отметки создают этапы в порядке появления; сводка сохраняется в JSON.
+        """
+        timer = StageTimer(window=8)
+        timer.begin()
+        timer.mark("first")
+        timer.mark("second")
+        timer.end()
+        self.assertEqual(list(timer.summary()), ["first", "second", "total"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "timing.json")
+            timer.dump(path)
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        self.assertEqual(set(data["summary"]), {"first", "second", "total"})
+
+    def test_disabled(self):
+        timer = StageTimer(enabled=False)
+        timer.begin()
+        timer.mark("stage")
+        timer.record("worker", 1_000_000)
+        timer.end()
+        self.assertEqual(timer.summary(), {})
+
+    def test_summary_while_recording(self):
+        """
+        Сводка читается, пока другой поток записывает замеры новых этапов.
+        """
+        timer = StageTimer(window=4)
+        done = []
+
+        def writer():
+            for i in range(2000):
+                timer.record(f"stage{i % 200}", i)
+            done.append(True)
+
+        thread = Thread(target=writer)
+        thread.start()
+        while not done:
+            for stats in timer.summary().values():
+                self.assertGreater(stats["count"], 0)
+            timer.format_lines()
+        thread.join()
+        self.assertEqual(len(timer.summary()), 200)
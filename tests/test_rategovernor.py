@@ -0,0 +1,83 @@
+import unittest
+
+import config as cfg
+from lib.rategovernor import RateGovernor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCapture:
+    def __init__(self):
+        self.intervals = []
+
+    def set_capture_interval(self, interval):
+        self.intervals.append(interval)
+
+
+class AttackState:
+    pass
+
+
+class UnknownState:
+    pass
+
+
+class TestRateGovernor(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.wincap = FakeCapture()
+        self.governor = RateGovernor(self.wincap, clock=self.clock)
+
+    def detect(self, duration, skipped_frames=0):
+        """
+        Обработка кадра длительностью duration по поддельным часам.
+        """
+        start = self.governor.begin()
+        self.clock.now += duration
+        self.governor.report_detection_since(start, skipped_frames)
+
+    def test_profile_selection(self):
+        """
+        Профиль выбирается по имени состояния бота; неизвестные состояния - "normal".
+        """
+        self.assertEqual(self.wincap.intervals, [cfg.GOVERNOR_PROFILES["normal"]])
+        self.governor.on_state_change(AttackState())
+        self.assertEqual((self.governor.profile, self.governor.interval), ("fast", cfg.GOVERNOR_PROFILES["fast"]))
+        self.governor.on_state_change(UnknownState())
+        self.assertEqual(self.governor.profile, "normal")
+        self.assertEqual(self.wincap.intervals[-1], cfg.GOVERNOR_PROFILES["normal"])
+
+    def test_backoff_and_recovery(self):
+        """
+        Детекция дольше интервала захвата увеличивает интервал; после ускорения он возвращается к профилю.
+        """
+        self.governor.set_profile("fast")
+        fast = cfg.GOVERNOR_PROFILES["fast"]
+        for _ in range(20):
+            self.detect(fast * 4)
+        backoff = self.governor.interval
+        self.assertGreater(backoff, fast * 2)
+        self.assertLessEqual(backoff, cfg.GOVERNOR_MAX_INTERVAL)
+        self.assertAlmostEqual(self.governor.detection_time, fast * 4, delta=fast * 0.1)
+
+        for _ in range(200):
+            self.detect(fast * 0.1)
+        self.assertEqual(self.governor.interval, fast)
+        self.assertEqual(self.governor.backoff_interval, 0)
+
+    def test_skipped_frames_trigger_backoff(self):
+        """
+        Пропущенные детекцией кадры - признак отставания даже при коротком времени обработки.
+        """
+        normal = cfg.GOVERNOR_PROFILES["normal"]
+        self.detect(normal * 0.5, skipped_frames=0)
+        self.assertEqual(self.governor.interval, normal)
+        for _ in range(10):
+            self.detect(normal * 0.9, skipped_frames=2)
+        self.assertGreater(self.governor.interval, normal)
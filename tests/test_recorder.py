@@ -0,0 +1,54 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from lib.framesource import ReplayFrameSource
+from lib.recorder import SESSION_FILE, SessionReader, SessionRecorder
+
+
+class TestSessionRecorder(unittest.TestCase):
+    def test_record_and_read_back(self):
+        """
+        Записанные кадры и результаты читаются по номеру кадра и воспроизводятся как источник.
+        """
+        frames = np.random.randint(0, 4, (3, 20, 30, 3), dtype=np.uint8) * 64 + 32
+        with tempfile.TemporaryDirectory() as path:
+            recorder = SessionRecorder(path)
+            recorder.start()
+            for i, frame in enumerate(frames):
+                recorder.submit_frame(10 + i, i * 0.2, frame)
+                recorder.submit_result(10 + i, {"have_target": bool(i % 2)})
+            recorder.stop()
+
+            reader = SessionReader(path)
+            self.assertEqual(len(reader), 3)
+            np.testing.assert_array_equal(reader.read_frame(11), frames[1])
+            self.assertIsNone(reader.read_frame(99))
+            self.assertTrue(reader.get_result(11)["have_target"])
+            self.assertEqual(reader.metadata["recorded_frames"], 3)
+            self.assertEqual(reader.metadata["recorded_results"], 3)
+            self.assertEqual(reader.metadata["dropped_results"], 0)
+
+            source = ReplayFrameSource(path, mode="max")
+            self.assertTrue(source.preprocessed)
+            np.testing.assert_array_equal(source.grab(), frames[0])
+
+    def test_full_queue_counts_dropped_results(self):
+        """
+        При переполненной очереди результаты отбрасываются и учитываются в счетчике, как и кадры.
+        """
+        with tempfile.TemporaryDirectory() as path:
+            recorder = SessionRecorder(path, queue_size=1)
+            recorder.stopped = False  # Поток записи не запущен: очередь не разбирается
+            recorder.submit_result(1, {"have_target": True})
+            recorder.submit_result(2, {"have_target": False})
+            recorder.submit_frame(3, 0.0, np.zeros((4, 4, 3), dtype=np.uint8))
+            self.assertEqual(recorder.dropped_results, 1)
+            self.assertEqual(recorder.dropped_frames, 1)
+
+            recorder.write_metadata()
+            with open(os.path.join(path, SESSION_FILE), encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["dropped_results"], 1)
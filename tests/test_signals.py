@@ -0,0 +1,39 @@
+import unittest
+
+from lib.signals import SignalRegistry, consecutive, hysteresis, n_of_m
+
+
+class TestSignalRegistry(unittest.TestCase):
+    def test_policies(self):
+        """
+        Каждая политика переключает сигнал только при выполнении своего условия.
+        """
+        registry = SignalRegistry()
+        registry.register("consecutive", consecutive(3))
+        registry.register("n_of_m", n_of_m(2, 3))
+        registry.register("hysteresis", hysteresis(1, 2))
+
+        expected = [
+            # raw, [consecutive, n_of_m, hysteresis]
+            (True, [False, False, True]),
+            (True, [False, False, True]),
+            (True, [True, True, True]),
+            (False, [True, True, True]),
+            (False, [True, False, False]),
+            (False, [False, False, False]),
+        ]
+        for raw, states in expected:
+            registry.update([raw] * 3)
+            self.assertEqual(list(registry.values().values()), states)
+
+    def test_initial_value_kept_until_history_full(self):
+        """
+        Пока история не заполнена, сохраняется начальное значение.
+        """
+        registry = SignalRegistry()
+        registry.register("enough_hp", consecutive(3), initial=True)
+        registry.update([False])
+        registry.update([False])
+        self.assertTrue(registry.values()["enough_hp"])
+        registry.update([False])
+        self.assertFalse(registry.values()["enough_hp"])
@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+
+from lib.mobstore import MobStore
+from lib.snapshot import DetectionSnapshot, predict_centers
+
+
+class TestDetectionSnapshot(unittest.TestCase):
+    def setUp(self):
+        store = MobStore()
+        slots = store.add([(100, 200, 40, 10)], timestamp=1.5)
+        store.frames_detected[slots] = 3
+        store.set_distance(slots, (120, 300))
+        self.snapshot = DetectionSnapshot(
+            frame_id=5,
+            timestamp=1.5,
+            flags={"have_target": True, "have_buffs": True},
+            mobs=store.to_array(),
+            probe_names=("myhp", "mymp"),
+            probe_colors=np.array([[1, 2, 3], [4, 5, 6]], dtype=np.uint8),
+        )
+
+    def test_immutable(self):
+        """
+        Снимок нельзя изменить: ни атрибуты, ни массив мобов.
+        """
+        with self.assertRaises(AttributeError):
+            self.snapshot.have_target = False
+        with self.assertRaises(AttributeError):
+            self.snapshot.extra = 1
+        with self.assertRaises(ValueError):
+            self.snapshot.mobs["x"][0] = 0
+
+    def test_fields(self):
+        """
+        Флаги, мобы и цвета контрольных точек относятся к одному кадру.
+        """
+        self.assertEqual(self.snapshot.frame_id, 5)
+        self.assertTrue(self.snapshot.have_target)
+        self.assertTrue(self.snapshot.target_full_hp)  # Значение по умолчанию
+        mob = self.snapshot.mobs[0]
+        self.assertEqual((mob["id"], mob["cx"], mob["cy"], mob["frames_detected"]), (1, 120, 205, 3))
+        self.assertAlmostEqual(float(mob["distance"]), 95.0)
+        self.assertEqual(self.snapshot.probe_color("mymp"), [4, 5, 6])
+
+    def test_predict_centers(self):
+        """
+        Прогноз центров по скорости из снимка ограничен горизонтом экстраполяции.
+        """
+        store = MobStore()
+        slots = store.add([(100, 200, 40, 10)], timestamp=10.0)
+        store.vx[slots], store.vy[slots] = 50.0, -20.0
+        mobs = store.to_array()
+        x, y = predict_centers(mobs, 10.2, max_seconds=0.5)
+        self.assertEqual((x.tolist(), y.tolist()), ([130], [201]))
+        x, y = predict_centers(mobs[0], 20.0, max_seconds=0.5)
+        self.assertEqual((int(x), int(y)), (145, 195))
@@ -0,0 +1,89 @@
+import unittest
+
+import cv2 as cv
+import numpy as np
+
+from lib.templates import TemplateMatcher, masked_match_score, match_score
+
+
+class TestTemplateMatcher(unittest.TestCase):
+    def setUp(self):
+        """
+        Шаблон - узор с перепадами яркости, чтобы TM_CCOEFF_NORMED был определен.
+        """
+        rng = np.random.default_rng(0)
+        self.template = rng.integers(0, 256, (24, 32, 3), dtype=np.uint8)
+        self.frame = np.zeros((200, 300, 3), dtype=np.uint8)
+        self.frame[100:124, 150:182] = self.template
+
+        self.matcher = TemplateMatcher(frame_scale=1.0, levels=0, scales=(1.0,), margin=2)
+        self.matcher.add_template("inside", self.template, [[140, 90], [200, 140]])
+        self.matcher.add_template("elsewhere", self.template, [[0, 0], [80, 60]])
+
+    def test_found_only_in_area(self):
+        """
+        Шаблон находится в своей области и не находится в чужой.
+        """
+        self.assertEqual(self.matcher.match_all(self.frame), {"inside": True, "elsewhere": False})
+
+    def test_absent(self):
+        """
+        На пустом кадре совпадений нет.
+        """
+        self.frame.fill(0)
+        self.assertFalse(self.matcher.contains(self.frame, "inside"))
+
+    def test_scaled_template(self):
+        """
+        Шаблон снят в исходном размере, кадр уменьшен вдвое.
+        """
+        large = cv.resize(self.template, (64, 48), interpolation=cv.INTER_NEAREST)
+        matcher = TemplateMatcher(frame_scale=0.5, levels=0, scales=(1.0,), margin=2)
+        matcher.add_template("inside", large, [[140, 90], [200, 140]])
+        self.assertTrue(matcher.contains(self.frame, "inside"))
+
+    def test_coarse_level_only_for_smooth_templates(self):
+        """
+        Мелкоузорному шаблону грубый уровень не строится; гладкий шаблон находится через грубый уровень
+        и при нечетном положении в кадре.
+        """
+        self.assertIsNone(self.matcher.templates["inside"][2][0].coarse)
+
+        rng = np.random.default_rng(1)
+        smooth = cv.resize(rng.integers(0, 256, (6, 8, 3), dtype=np.uint8), (32, 24), interpolation=cv.INTER_CUBIC)
+        frame = np.zeros((200, 300, 3), dtype=np.uint8)
+        frame[101:125, 151:183] = smooth
+        matcher = TemplateMatcher(frame_scale=1.0, levels=0, scales=(1.0,), margin=2)
+        matcher.add_template("smooth", smooth, [[140, 90], [200, 140]])
+        self.assertIsNotNone(matcher.templates["smooth"][2][0].coarse)
+        self.assertTrue(matcher.contains(frame, "smooth"))
+        frame.fill(0)
+        self.assertFalse(matcher.contains(frame, "smooth"))
+
+
+class TestMaskedMatchScore(unittest.TestCase):
+    def test_black_background_is_transparent(self):
+        """
+        Однотонный значок на черном фоне находится на плашке любого размера под ним:
+        TM_CCOEFF_NORMED для такого шаблона не определен, маскированная оценка - точная.
+        """
+        template = np.zeros((20, 20), dtype=np.uint8)
+        template[5:15, 5:15] = 200
+        image = np.zeros((60, 80), dtype=np.uint8)
+        image[10:40, 30:60] = 200
+
+        score, loc = masked_match_score(image, template)
+        self.assertAlmostEqual(score, 1.0, places=5)
+        x, y = loc
+        self.assertTrue(30 <= x + 5 and x + 15 <= 60 and 10 <= y + 5 and y + 15 <= 40)
+        self.assertLess(match_score(image, template)[0], 0.8)
+
+    def test_missing_or_degenerate(self):
+        """
+        На пустом изображении совпадения нет; слишком большой или целиком черный шаблон - (0.0, None).
+        """
+        template = np.zeros((20, 20), dtype=np.uint8)
+        template[5:15, 5:15] = 200
+        self.assertLess(masked_match_score(np.zeros((60, 80), np.uint8), template)[0], 0.5)
+        self.assertEqual(masked_match_score(np.zeros((10, 10), np.uint8), template), (0.0, None))
+        self.assertEqual(masked_match_score(np.zeros((60, 80), np.uint8), np.zeros((20, 20), np.uint8)), (0.0, None))
@@ -28,8 +28,9 @@ class TestWindowCapture(TestCase):
                 start_time = time.time()
 
                 # Получаем текущий кадр
+                # Кадр - read-only представление слота буфера: рисуем на копии
                 with wincap.lock:
-                    screenshot = wincap.screenshot
+                    screenshot = wincap.screenshot.copy() if wincap.screenshot is not None else None
 
                 if screenshot is not None:
                     # Рассчитываем средний FPS